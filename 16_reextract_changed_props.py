@@ -0,0 +1,243 @@
+import os
+import re
+import time
+import random
+import atexit
+import fcntl
+import argparse
+from datetime import datetime
+import httpx
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from extracters import n28hse, midland, house730
+from models.prop import Prop, PropBulkWriter
+from models.prop_change_event import ChangeFeedConsumer
+
+load_dotenv()
+
+MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER")
+
+dir = os.path.dirname(os.path.abspath(__file__))
+artifacts = os.path.join(dir, ARTIFACTS_FOLDER)
+folder = os.path.join(artifacts, 'extract_data')
+os.makedirs(folder, exist_ok=True)
+LOCK_FILE_PATH = os.path.join(folder, '.16_reextract_changed_props.lock')
+
+batch_size = int(os.getenv("REEXTRACT_BATCH_SIZE", "200"))
+
+# Changes the monitor snapshot already carries the new value for; anything else
+# (title, status, unknown fingerprint change) needs the LLM to read the page again.
+PATCHABLE_REASONS = {'price_changed', 'posted_date_changed', 'updated_date_changed'}
+
+# Props in these statuses carry on through the pipeline after re-extraction; any later
+# status is put back once the new data is in, so photos, summary and matching don't rerun.
+RERUN_STATUSES = {'pending_extraction', 'data_extracted', 'photo_analysing'}
+
+EXTRACTERS = {
+    '28hse': n28hse,
+    'midland': midland,
+    'house730': house730,
+}
+
+
+def acquire_lock(lock_file_path):
+    lock_file = open(lock_file_path, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+
+    atexit.register(lock_file.close)
+    return lock_file
+
+
+def parse_price(price_norm):
+    text = (price_norm or '').replace(' ', '')
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)(萬)?', text)
+    if not match:
+        return None
+    value = float(match.group(1)) * (10000 if match.group(2) else 1)
+    return int(value) if value.is_integer() else value
+
+
+def build_patch(prop):
+    # Returns the $set for a price/date-only change, or None when the LLM has to re-extract.
+    reasons = [reason for reason in (prop.get('reextract_reason') or '').split(',') if reason]
+    if not reasons or not set(reasons) <= PATCHABLE_REASONS or not prop.get('v1_extracted_data'):
+        return None
+
+    monitor = prop.get('source_monitor') or {}
+    patch = {}
+    if 'price_changed' in reasons:
+        price = parse_price(monitor.get('price_norm'))
+        if price is None:
+            return None
+        price_field = 'sell_price' if prop.get('post_type') == 'sell' else 'rent_price'
+        patch[f'v1_extracted_data.{price_field}'] = price
+    if 'posted_date_changed' in reasons:
+        patch['v1_extracted_data.posted_date'] = monitor.get('posted_date_raw') or None
+    if 'updated_date_changed' in reasons:
+        patch['v1_extracted_data.post_updated_date'] = monitor.get('updated_date_raw') or None
+    return patch
+
+
+def request_llm_reextract(db, client, prop, writer):
+    # Re-fetch the page so the extract_data batch stage has fresh HTML to send.
+    # Returns False when the extracter already produced structured data from the page.
+    extracter = EXTRACTERS.get(prop.get('source_channel'))
+    if not extracter:
+        raise ValueError(f"No extracter for channel {prop.get('source_channel')}")
+    # Structured extracters only apply page data to props waiting for extraction;
+    # the previous status is put back if the page cannot be re-read. extract_data
+    # restores reextract_restore_status instead of moving the prop to data_extracted.
+    restore_status = prop.get('status') if prop.get('status') not in RERUN_STATUSES else None
+    db['props'].update_one(
+        { 'source_id': prop['source_id'] },
+        { '$set': { 'status': 'pending_extraction', 'reextract_restore_status': restore_status } },
+    )
+    try:
+        extracter.extract_details_http(db, client, prop['source_url'], check_freshness=False, writer=writer, exists=True)
+        writer.flush()
+        refreshed = db['props'].find_one(
+            { 'source_id': prop['source_id'] },
+            { 'status': 1, 'source_html_content': 1, 'source_html_ref': 1 },
+        ) or {}
+        if refreshed.get('status') == 'data_extracted':
+            db['props'].update_one(
+                { 'source_id': prop['source_id'] },
+                {
+                    '$set': { 'status': restore_status or 'data_extracted' },
+                    '$unset': { 'reextract_restore_status': '' },
+                },
+            )
+            return False
+        if not refreshed.get('source_html_content') and not refreshed.get('source_html_ref'):
+            raise ValueError(f"No page HTML stored for {prop['source_id']}")
+    except Exception:
+        db['props'].update_one(
+            { 'source_id': prop['source_id'] },
+            {
+                '$set': { 'status': prop.get('status') },
+                '$unset': { 'reextract_restore_status': '' },
+            },
+        )
+        raise
+    db['props'].update_one(
+        { 'source_id': prop['source_id'] },
+        { '$unset': { 'v1_data_extracting_code': '' } },
+    )
+    return True
+
+
+def process(db, client, props, writer):
+    # Failed props keep reextract_needed and get reextract_error, so the next run
+    # retries them even though the feed checkpoint has moved past their events.
+    patched = 0
+    queued = 0
+    now = datetime.now().timestamp()
+    for prop in props:
+        try:
+            patch = build_patch(prop)
+            if patch is not None:
+                Prop(db, prop).update({
+                    **patch,
+                    'reextract_needed': False,
+                    'reextract_candidate': False,
+                    'reextract_error': None,
+                    'reextract_patched_at': now,
+                }, writer)
+                patched += 1
+                print(f"Patched {prop['source_id']} ({prop.get('reextract_reason')}).")
+                continue
+
+            if request_llm_reextract(db, client, prop, writer):
+                Prop(db, prop).update({
+                    'reextract_needed': False,
+                    'reextract_candidate': False,
+                    'reextract_error': None,
+                    'reextract_requested_at': now,
+                }, writer)
+                queued += 1
+                print(f"Queued {prop['source_id']} for LLM re-extraction ({prop.get('reextract_reason')}).")
+            else:
+                Prop(db, prop).update({
+                    'reextract_needed': False,
+                    'reextract_candidate': False,
+                    'reextract_error': None,
+                    'reextract_patched_at': now,
+                }, writer)
+                patched += 1
+                print(f"Re-extracted {prop['source_id']} from structured page data ({prop.get('reextract_reason')}).")
+            time.sleep(random.uniform(0.8, 1.8))
+        except Exception as e:
+            print(f"Error re-extracting {prop['source_id']}: {e}")
+            Prop(db, prop).update({
+                'reextract_error': f"{e}",
+                'reextract_failed_at': now,
+            }, writer)
+    return patched, queued
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply monitor-detected changes to extracted prop data.")
+    parser.add_argument('--backfill', action='store_true',
+                        help="also scan props flagged reextract_needed before the change feed existed")
+    args = parser.parse_args()
+
+    lock_file = acquire_lock(LOCK_FILE_PATH)
+    if not lock_file:
+        print("Another instance is running, skipping this execution.")
+        return
+
+    client = MongoClient(MONGODB_CONNECTION_STRING)
+    db = client['prop_main']
+    consumer = ChangeFeedConsumer(db, 'reextract')
+    headers = {
+        "User-Agent": n28hse.HTTP_USER_AGENT,
+        "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+    }
+
+    patched = 0
+    queued = 0
+    with httpx.Client(headers=headers, follow_redirects=True, timeout=30) as http_client, \
+            PropBulkWriter(db) as writer:
+        if args.backfill:
+            props = list(db['props'].find({ 'reextract_needed': True, 'status': { '$ne': 'archived' } }))
+        else:
+            # Props that failed on an earlier run; their feed events are already committed.
+            props = list(db['props'].find({
+                'reextract_needed': True,
+                'reextract_error': { '$ne': None },
+                'status': { '$ne': 'archived' },
+            }))
+        if props:
+            counts = process(db, http_client, props, writer)
+            patched += counts[0]
+            queued += counts[1]
+            writer.flush()
+
+        while True:
+            events = consumer.read(limit=batch_size, types={'changed'})
+            source_ids = list({ event['source_id'] for event in events })
+            if source_ids:
+                # reextract_needed guards against events for props that were handled already.
+                props = list(db['props'].find({
+                    'source_id': { '$in': source_ids },
+                    'reextract_needed': True,
+                    'status': { '$ne': 'archived' },
+                }))
+                counts = process(db, http_client, props, writer)
+                patched += counts[0]
+                queued += counts[1]
+                writer.flush()
+            if consumer.last_read_seq == consumer.checkpoint:
+                break
+            consumer.commit()
+
+    print(f"Re-extraction done: {patched} patched in place, {queued} queued for the LLM.")
+    client.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,70 @@
+import os
+import sys
 import threading
-from extracters import n28hse #, midland, house730
+import time
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from extracters import n28hse, midland, house730
+from utils.crawl_progress import CrawlProgress
+
+load_dotenv()
+
+MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
+
+# Each extractor applies its own rate limits (N28HSE_HTTP_RATE_PER_SECOND, per-link delays, ...).
+SOURCES = {
+    "28hse": n28hse.extract,
+    "midland": midland.extract,
+    "house730": house730.extract,
+}
+PROGRESS_INTERVAL_SECONDS = int(os.getenv("EXTRACT_PROGRESS_INTERVAL_SECONDS", "60"))
+
+
+def run_source(name, db, progresses):
+    progress = progresses[name]
+    progress.start()
+    try:
+        SOURCES[name](db=db, progress=progress)
+        progress.finish()
+    except Exception as e:
+        progress.finish(error=e)
+        print(f"[{name}] extraction failed: {e}, stopping other sources")
+        for other in progresses.values():
+            other.stop()
+
 
 def main():
-    n28hse.extract()
-    #thread_n28hse_i = threading.Thread(target=n28hse.extract, args=())
-    #thread_midland_i = threading.Thread(target=midland.extract, args=())
-    #thread_house730_i = threading.Thread(target=house730.extract, args=())
-    
-    #thread_n28hse_i.start()
-    #thread_midland_i.start()
-    #thread_house730_i.start()
-
-    #thread_n28hse_i.join()
-    #thread_midland_i.join()
-    #thread_house730_i.join()
+    names = [name.strip() for name in os.getenv("EXTRACT_SOURCES", ",".join(SOURCES)).split(",") if name.strip()]
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown extract sources: {', '.join(unknown)}")
+
+    # One client (and connection pool) shared by every source thread.
+    client = MongoClient(MONGODB_CONNECTION_STRING, maxPoolSize=int(os.getenv("EXTRACT_MONGO_POOL_SIZE", "20")))
+    db = client['prop_main']
+
+    progresses = {name: CrawlProgress(name) for name in names}
+    threads = [
+        threading.Thread(target=run_source, args=(name, db, progresses), name=f"extract-{name}")
+        for name in names
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Print on a fixed monotonic schedule, however many threads have finished.
+    next_print = time.monotonic() + PROGRESS_INTERVAL_SECONDS
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=max(0, next_print - time.monotonic()))
+        if time.monotonic() >= next_print or not any(thread.is_alive() for thread in threads):
+            for progress in progresses.values():
+                print(progress.summary())
+            next_print += PROGRESS_INTERVAL_SECONDS
+
+    client.close()
+
+    if any(progress.state == 'failed' for progress in progresses.values()):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
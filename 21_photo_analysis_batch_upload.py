@@ -1,125 +0,0 @@
-import os
-import json
-import atexit
-import fcntl
-from openai import AzureOpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_ENDPOINT = os.getenv("OPENAI_API_ENDPOINT")
-OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
-ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER")
-
-dir = os.path.dirname(os.path.abspath(__file__))
-artifacts = os.path.join(dir, ARTIFACTS_FOLDER)
-folder = os.path.join(artifacts, 'photo_analysis')
-LOCK_FILE_PATH = os.path.join(folder, '.21_photo_analysis_batch_upload.lock')
-
-
-def acquire_lock(lock_file_path):
-    lock_file = open(lock_file_path, 'w')
-    try:
-        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-    except BlockingIOError:
-        lock_file.close()
-        return None
-
-    atexit.register(lock_file.close)
-    return lock_file
-
-def get_all_files(folder_path):
-    files = []
-    for root, dirs, filenames in os.walk(folder_path):
-        for filename in filenames:
-            if filename.endswith('.jsonl'):
-                files.append(os.path.join(root, filename))
-    return files
-
-def remove_file(file_path):
-    try:
-        os.remove(file_path)
-        print(f"Removed file: {file_path}")
-    except Exception as e:
-        print(f"Error removing file {file_path}: {e}")
-
-
-def has_batch_requests(file_path):
-    # Batch JSONL must contain at least one non-empty line.
-    try:
-        if os.path.getsize(file_path) == 0:
-            return False
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    return True
-        return False
-    except Exception as e:
-        print(f"Error validating file {file_path}: {e}")
-        return False
-
-def main():
-    lock_file = acquire_lock(LOCK_FILE_PATH)
-    if not lock_file:
-        print("Another instance is running, skipping this execution.")
-        return
-
-    client = AzureOpenAI(
-        azure_endpoint = OPENAI_API_ENDPOINT, 
-        api_key=OPENAI_API_KEY, 
-        api_version=OPENAI_API_VERSION
-    )
-    
-    files = get_all_files(os.path.join(folder, 'batch_files'))
-    if not files:
-        print("No batch files found to upload.")
-        return
-    
-    for file_path in files:
-        print(f"Processing file: {file_path}")
-
-        if not has_batch_requests(file_path):
-            print(f"Skip empty batch file: {file_path}")
-            remove_file(file_path)
-            continue
-        
-        # Upload file to Azure OpenAI
-        file = client.files.create(
-            file=open(file_path, "rb"), 
-            purpose="batch"
-        )
-        
-        # Create batch job
-        batch_response = client.batches.create(
-            input_file_id=file.id,
-            endpoint="/chat/completions",
-            completion_window="24h"
-        )
-        
-        batch_code = file_path.split('/')[-1].split('.')[0].replace('batch-', '')
-        uploaded_batch_file_path = os.path.join(folder, 'upload_batches', f"batch-{batch_code}.json")
-        
-        with open(uploaded_batch_file_path, 'w', encoding='utf-8') as uploaded_batch_file:
-            content = {
-                "batch_id": batch_response.id,
-                "status": batch_response.status,
-                "created_at": batch_response.created_at,
-                "input_file_id": file.id,
-                "input_file_name": file.filename,
-                "input_file_size": file.bytes,
-            }
-            uploaded_batch_file.write(json.dumps(content, indent=2))
-        
-        print(f"Batch uploaded: {batch_response.id}")
-        print(f"Status: {batch_response.status}")
-        print(f"Tracking file created: {uploaded_batch_file_path}\n")
-        
-        # Remove the uploaded batch file
-        remove_file(file_path)
-    
-    print("All batches uploaded successfully!")
-    print("Next step: Run python 22_photo_analysis_batch_track.py to monitor batch status")
-
-if __name__ == '__main__':
-    main()
@@ -0,0 +1,71 @@
+import os
+import atexit
+import fcntl
+import argparse
+from openai import AzureOpenAI
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from batchjobs.orchestrator import BatchOrchestrator, BATCH_JOBS_FOLDER, BATCH_JOBS_POLL_SECONDS
+from batchjobs.extract_data import ExtractDataStage
+from batchjobs.photo_analysis import PhotoAnalysisStage
+from batchjobs.property_summary import PropertySummaryStage
+from batchjobs.prop_match import PropMatchStage
+
+load_dotenv()
+
+MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_API_ENDPOINT = os.getenv("OPENAI_API_ENDPOINT")
+OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
+
+os.makedirs(BATCH_JOBS_FOLDER, exist_ok=True)
+LOCK_FILE_PATH = os.path.join(BATCH_JOBS_FOLDER, '.40_batch_jobs.lock')
+
+STAGES = {
+    'extract_data': ExtractDataStage(),
+    'photo_analysis': PhotoAnalysisStage(),
+    'property_summary': PropertySummaryStage(),
+    'prop_match': PropMatchStage(),
+}
+
+
+def acquire_lock(lock_file_path):
+    lock_file = open(lock_file_path, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+
+    atexit.register(lock_file.close)
+    return lock_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare, upload, track and ingest LLM batches for every stage.")
+    parser.add_argument('--stage', action='append', choices=sorted(STAGES),
+                        help="only run these stages (default: all)")
+    parser.add_argument('--loop', action='store_true',
+                        help=f"keep polling every BATCH_JOBS_POLL_SECONDS ({BATCH_JOBS_POLL_SECONDS}s) instead of one pass")
+    args = parser.parse_args()
+
+    lock_file = acquire_lock(LOCK_FILE_PATH)
+    if not lock_file:
+        print("Another instance is running, skipping this execution.")
+        return
+
+    client = MongoClient(MONGODB_CONNECTION_STRING)
+    db = client['prop_main']
+    openai_client = AzureOpenAI(
+        azure_endpoint = OPENAI_API_ENDPOINT,
+        api_key=OPENAI_API_KEY,
+        api_version=OPENAI_API_VERSION
+    )
+    stages = [STAGES[name] for name in (args.stage or STAGES)]
+    try:
+        BatchOrchestrator(db, openai_client, stages).run(loop=args.loop)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
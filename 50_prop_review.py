@@ -1,11 +1,15 @@
 from datetime import datetime
-import time
+import asyncio
 import os
-import undetected_chromedriver as uc
-from pymongo import MongoClient
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ASCENDING, MongoClient
 from dotenv import load_dotenv
+from models.prop import PropBulkWriter
 from reviewers import n28hse, house730, midland
-from utils.uc_driver import create_uc_driver
+from reviewers.monitor import MonitorEngine
+from utils.async_http import TokenBucket
+from utils.uc_driver import LazyDriver
 
 load_dotenv()
 
@@ -13,53 +17,146 @@ MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
 
 batch_size = 300
 
-def check_batch(db, driver, filter, skip=0, limit=batch_size):
-    properties = db['props'].find(filter).skip(skip).limit(limit)
-    count = 0
-    sleep_counter = 0
-    result = list(properties)
-    for prop in result:
-        sleep_counter += 1
-        if sleep_counter >= 30:
-            time.sleep(5)
-            sleep_counter = 0
-        if prop['source_channel'] == 'house730':
-            house730.review(db, driver, prop)
-        elif prop['source_channel'] == '28hse':
-            n28hse.review(db, driver, prop)
-        elif prop['source_channel'] == 'midland':
-            midland.review(db, driver, prop)
-        count += 1
-    if count < limit:
-        return False
-    return True
+REVIEW_WINDOW_SECONDS = 6 * 3600
+
+# Each channel is reviewed by its own worker pool so a slow browser-backed channel
+# never holds up the HTTP-only ones.
+CHANNELS = {
+    '28hse': {
+        'review': n28hse.review,
+        'workers': int(os.getenv("REVIEW_N28HSE_WORKERS", "4")),
+        'rate_per_second': float(os.getenv("REVIEW_N28HSE_RATE_PER_SECOND", "3")),
+    },
+    'midland': {
+        'review': midland.review,
+        'workers': int(os.getenv("REVIEW_MIDLAND_WORKERS", "4")),
+        'rate_per_second': float(os.getenv("REVIEW_MIDLAND_RATE_PER_SECOND", "3")),
+    },
+    'house730': {
+        'review': house730.review,
+        'workers': int(os.getenv("REVIEW_HOUSE730_WORKERS", "2")),
+        'rate_per_second': float(os.getenv("REVIEW_HOUSE730_RATE_PER_SECOND", "0.5")),
+    },
+}
+
+
+class ChannelReviewer:
+    def __init__(self, channel, review, workers, rate_per_second):
+        self.channel = channel
+        self.review = review
+        self.workers = workers
+        self.rate_per_second = rate_per_second
+        self.reviewed = 0
+        self.failed = 0
+        # One lazily started browser per worker thread.
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+    def _driver(self):
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            driver = LazyDriver()
+            self._local.driver = driver
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+
+    def _review(self, db, prop, writer, engine):
+        self.review(db, self._driver(), prop, writer, engine)
+
+    def _next_batch(self, db, filter, last):
+        # (next_review_at, _id) keyset paging on the matching compound index: each page
+        # starts where the last one stopped, and reviewed props drop out by moving to the future.
+        query = { **filter, 'source_channel': self.channel }
+        if last is not None:
+            last_at, last_id = last
+            query['$or'] = [
+                { 'next_review_at': { '$gt': last_at } },
+                { 'next_review_at': last_at, '_id': { '$gt': last_id } },
+            ]
+        return list(
+            db['props'].find(query)
+            .sort([('next_review_at', ASCENDING), ('_id', ASCENDING)])
+            .limit(batch_size)
+        )
+
+    async def run(self, db, filter, writer, engine):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"review-{self.channel}")
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        bucket = TokenBucket(self.rate_per_second)
+
+        async def worker():
+            while True:
+                prop = await queue.get()
+                try:
+                    if prop is None:
+                        return
+                    await bucket.acquire()
+                    await loop.run_in_executor(executor, self._review, db, prop, writer, engine)
+                    self.reviewed += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f"[{self.channel}] review failed for {prop['source_id']}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            last = None
+            while True:
+                batch = await loop.run_in_executor(None, self._next_batch, db, filter, last)
+                for prop in batch:
+                    await queue.put(prop)
+                if len(batch) < batch_size:
+                    break
+                last = (batch[-1]['next_review_at'], batch[-1]['_id'])
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            executor.shutdown(wait=True)
+            for driver in self._drivers:
+                driver.quit()
+        print(f"[{self.channel}] reviewed {self.reviewed} props, {self.failed} failed")
+
+
+async def review_all(db, filter, writer, engine):
+    reviewers = [ChannelReviewer(channel, **config) for channel, config in CHANNELS.items()]
+    await asyncio.gather(*(reviewer.run(db, filter, writer, engine) for reviewer in reviewers))
+
 
 def main():
     client = MongoClient(MONGODB_CONNECTION_STRING)
     db = client['prop_main']
 
-    options = uc.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = create_uc_driver(options=options, use_subprocess=True)
     now = datetime.now().timestamp()
-    print(now - 6*3600)
 
+    # Reviewers schedule each prop's next_review_at from its monitor history. Props that
+    # were never scheduled get one from the flat window (0 if never reviewed), so the due
+    # set is a single range on the (source_channel, next_review_at, _id) index.
+    db['props'].create_index([('source_channel', ASCENDING), ('next_review_at', ASCENDING), ('_id', ASCENDING)])
+    db['props'].update_many(
+        { 'next_review_at': { '$exists': False } },
+        [{ '$set': { 'next_review_at': { '$ifNull': [{ '$add': ['$reviewed_at', REVIEW_WINDOW_SECONDS] }, 0] } } }],
+    )
     f = {
-        '$or': [
-            { 'reviewed_at': { '$exists': False } },
-            { 'reviewed_at': { "$lte": now - 6*3600 } },
-        ],
+        'next_review_at': { "$lte": now },
         'status': { "$ne": "archived" },
     }
-    skip = 0
-    while True:
-        if not check_batch(db, driver, f, skip=skip):
-            break
-        skip += batch_size
+    # Monitor updates go through the engine's bulk writes, archives and 304 refreshes through the writer.
+    engine = MonitorEngine(db)
+    with PropBulkWriter(db) as writer:
+        try:
+            asyncio.run(review_all(db, f, writer, engine))
+        finally:
+            engine.flush()
+    for channel, stats in engine.stats().items():
+        print(f"[{channel}] {stats['reviewed']} checked, {stats['changed']} changed, {stats['pending']} pending, "
+              f"{stats['initial']} initial, reasons: {stats['reasons']}")
     print("Review completed.")
-    driver.quit()
     client.close()
 
 if __name__ == '__main__':
-   main()
\ No newline at end of file
+   main()
@@ -1,195 +0,0 @@
-import os
-import json
-import time
-from datetime import datetime
-from bson import ObjectId
-from openai import AzureOpenAI
-from pymongo import MongoClient
-from dotenv import load_dotenv
-
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_ENDPOINT = os.getenv("OPENAI_API_ENDPOINT")
-OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
-MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
-ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER")
-
-dir = os.path.dirname(os.path.abspath(__file__))
-artifacts = os.path.join(dir, ARTIFACTS_FOLDER)
-folder = os.path.join(artifacts, 'prop_match')
-
-
-def get_all_result_files(folder_path):
-    files = []
-    for filename in os.listdir(folder_path):
-        if filename.endswith('-result.json'):
-            files.append(os.path.join(folder_path, filename))
-    return files
-
-
-def move_file(src, dst):
-    try:
-        os.rename(src, dst)
-        print(f"Moved: {src} → {dst}")
-    except Exception as e:
-        print(f"Error moving file {src}: {e}")
-
-# ---------------------------------------------------------------------------
-# Main processing
-# ---------------------------------------------------------------------------
-
-def main():
-    if not MONGODB_CONNECTION_STRING:
-        print("Missing MONGODB_CONNECTION_STRING.")
-        return
-    if not all([OPENAI_API_KEY, OPENAI_API_ENDPOINT, OPENAI_API_VERSION]):
-        print("Missing OpenAI Azure configuration.")
-        return
-
-    openai_client = AzureOpenAI(
-        azure_endpoint=OPENAI_API_ENDPOINT,
-        api_key=OPENAI_API_KEY,
-        api_version=OPENAI_API_VERSION,
-    )
-    mongo_client = MongoClient(MONGODB_CONNECTION_STRING)
-    db = mongo_client['prop_main']
-
-    os.makedirs(os.path.join(folder, 'data'), exist_ok=True)
-    os.makedirs(os.path.join(folder, 'backup'), exist_ok=True)
-
-    result_files = get_all_result_files(os.path.join(folder, 'results'))
-    if not result_files:
-        print("No completed result files found.")
-        mongo_client.close()
-        return
-
-    for result_file_path in result_files:
-        batch_code = os.path.basename(result_file_path).replace('batch-', '').replace('-result.json', '')
-        print(f"\nProcessing batch: {batch_code}")
-
-        with open(result_file_path, 'r', encoding='utf-8') as rf:
-            result_meta = json.load(rf)
-
-        output_file_id = result_meta.get('output_file_id')
-
-        if not output_file_id:
-            print(f"Missing output_file_id in {result_file_path}")
-            move_file(result_file_path, os.path.join(folder, 'backup', os.path.basename(result_file_path)))
-            continue
-
-        # Download raw JSONL results from Azure OpenAI
-        file_response = openai_client.files.content(output_file_id)
-        raw_lines = [l for l in file_response.text.strip().split('\n') if l.strip()]
-
-        # Save raw data for audit
-        data_file_path = os.path.join(folder, 'data', f"batch-{batch_code}-data.jsonl")
-        with open(data_file_path, 'w', encoding='utf-8') as df:
-            for line in raw_lines:
-                df.write(f"{line}\n")
-
-        sent = 0
-        skipped = 0
-        failed = 0
-
-        for raw_line in raw_lines:
-            try:
-                record = json.loads(raw_line)
-            except json.JSONDecodeError:
-                continue
-
-            custom_id = record.get('custom_id', '')
-            if not custom_id.startswith('match-'):
-                continue
-
-            # Extract conv ObjectId
-            conv_id_str = custom_id.replace('match-', '', 1)
-            try:
-                conv_oid = ObjectId(conv_id_str)
-            except Exception:
-                print(f"Invalid conv_id in custom_id: {custom_id}")
-                skipped += 1
-                continue
-
-            # Parse LLM response
-            response_body = record.get('response', {}).get('body', {})
-            choices = response_body.get('choices', [])
-            if not choices:
-                skipped += 1
-                continue
-
-            try:
-                llm_result = json.loads(choices[0]['message']['content'])
-            except (json.JSONDecodeError, KeyError, IndexError):
-                print(f"Failed to parse LLM response for {custom_id}")
-                skipped += 1
-                continue
-
-            matched_ids = llm_result.get('matched_source_ids', [])
-            if not matched_ids:
-                skipped += 1
-                continue  # No matches for this conversation — skip
-
-            # Fetch conv from MongoDB
-            conv = db['conversations-v2'].find_one({'_id': conv_oid})
-            if not conv:
-                print(f"Conversation not found: {conv_id_str}")
-                skipped += 1
-                continue
-
-            # Fetch matched props (up to 2)
-            matched_source_ids = matched_ids[:2]
-            matched_props = [
-                db['props'].find_one({'source_id': sid})
-                for sid in matched_source_ids
-            ]
-            matched_props = [p for p in matched_props if p]  # Filter out None
-
-            push_items = []
-            now_ts = int(time.time())
-            expired_at = now_ts + (2 * 24 * 60 * 60)
-            for prop in matched_props[:1]:  # Only take the first matched property
-                property_id = prop.get('id') or prop.get('source_id') or str(prop.get('_id') or '')
-                if not property_id:
-                    continue
-                push_items.append({
-                    'property_id': property_id,
-                    'status': 'pending',
-                    'createdAt': now_ts,
-                    'expired_at': expired_at,
-                })
-
-            if not push_items:
-                print(f"No valid matched properties for conv {conv_id_str}")
-                skipped += 1
-                continue
-
-            update_result = db['conversations-v2'].update_one(
-                {'_id': conv_oid},
-                {
-                    '$push': {'push_properties': {'$each': push_items}},
-                },
-            )
-
-            if update_result.modified_count > 0:
-                sent += 1
-                print(f"Updated conversation {conv_id_str}: appended {len(push_items)} push_properties item(s)")
-            else:
-                failed += 1
-                print(f"Failed to update conversation {conv_id_str}: no document modified")
-
-        print(f"Batch {batch_code}: sent={sent}, skipped={skipped}, failed={failed}")
-
-        # Clean up
-        openai_client.files.delete(output_file_id)
-        input_file_id = result_meta.get('input_file_id')
-        if input_file_id:
-            openai_client.files.delete(input_file_id)
-
-        move_file(result_file_path, os.path.join(folder, 'backup', os.path.basename(result_file_path)))
-
-    mongo_client.close()
-
-
-if __name__ == '__main__':
-    main()
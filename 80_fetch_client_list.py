@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import re
@@ -5,7 +6,14 @@ import time
 import uuid
 from typing import Iterable
 from urllib.parse import urljoin
-from urllib.request import Request, urlopen
+
+from models.crawl_state import CrawlState
+from utils.async_http import TokenBucket, RateLimitedAsyncClient
+
+try:
+    import httpx
+except Exception:  # noqa: BLE001
+    httpx = None
 
 try:
     from dotenv import load_dotenv
@@ -13,9 +21,10 @@ except Exception:  # noqa: BLE001
     load_dotenv = None
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
 except Exception:  # noqa: BLE001
     MongoClient = None
+    UpdateOne = None
 
 
 BASE_URL = "https://www.28hse.com"
@@ -33,18 +42,23 @@ TEL_HREF_PATTERN = re.compile(r'href="tel:([^"]+)"', re.IGNORECASE)
 MAILTO_PATTERN = re.compile(r'href="mailto:([^"]+)"', re.IGNORECASE)
 WHATSAPP_PATTERN = re.compile(r"whatsapp|wa\.me|api\.whatsapp\.com", re.IGNORECASE)
 
+CRAWL_STATE_SOURCE = "28hse_agencies"
+CONCURRENCY = int(os.getenv("AGENCY_CRAWL_CONCURRENCY", "8"))
+RATE_PER_SECOND = float(os.getenv("AGENCY_CRAWL_RATE_PER_SECOND", "5"))
+BULK_BATCH_SIZE = int(os.getenv("AGENCY_CRAWL_BULK_BATCH_SIZE", "100"))
 
-def fetch_html(url: str, headers: dict[str, str], retries: int = 3) -> str:
+
+async def fetch_html(client: RateLimitedAsyncClient, url: str, retries: int = 3) -> str:
     last_error: Exception | None = None
     for attempt in range(1, retries + 1):
         try:
-            req = Request(url=url, headers=headers)
-            with urlopen(req, timeout=30) as resp:
-                return resp.read().decode("utf-8", errors="replace")
+            resp = await client.get(url)
+            resp.raise_for_status()
+            return resp.text
         except Exception as exc:
             last_error = exc
             if attempt < retries:
-                time.sleep(1.5 * attempt)
+                await asyncio.sleep(1.5 * attempt)
 
     raise RuntimeError(f"Failed to fetch URL after {retries} attempts: {url}") from last_error
 
@@ -161,9 +175,143 @@ def build_company_doc(
     return doc
 
 
+async def fetch_company_op(client: RateLimitedAsyncClient, agency_url: str, agency_id: str) -> UpdateOne:
+    zh_html, en_html = await asyncio.gather(
+        fetch_html(client, agency_url),
+        fetch_html(client, f"{BASE_URL}/en/agent/{agency_id}"),
+    )
+    doc = build_company_doc(agency_id, agency_url, zh_html, en_html)
+    # `code` is only assigned on insert so reruns keep the existing one.
+    return UpdateOne(
+        {"28hse_link": agency_url},
+        {
+            "$set": doc,
+            "$setOnInsert": {"createdAt": int(time.time()), "code": str(uuid.uuid4())},
+        },
+        upsert=True,
+    )
+
+
+async def fetch_company_ops(
+    client: RateLimitedAsyncClient,
+    links: list[tuple[str, str]],
+    failed_links: list[tuple[str, str]],
+) -> list[UpdateOne]:
+    results = await asyncio.gather(
+        *(fetch_company_op(client, agency_url, agency_id) for agency_url, agency_id in links),
+        return_exceptions=True,
+    )
+    ops = []
+    for link, result in zip(links, results):
+        if isinstance(result, Exception):
+            failed_links.append(link)
+            print(f"Failed to process {link[0]}: {result}")
+        else:
+            ops.append(result)
+    return ops
+
+
+def backfill_codes(collection) -> int:
+    # Companies saved before `code` moved to $setOnInsert may still lack one.
+    ops = [
+        UpdateOne({"_id": doc["_id"], "code": {"$in": [None, ""]}}, {"$set": {"code": str(uuid.uuid4())}})
+        for doc in collection.find({"28hse_link": {"$exists": True}, "code": {"$in": [None, ""]}}, {"_id": 1})
+    ]
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def write_companies(collection, ops: list[UpdateOne]) -> tuple[int, int]:
+    if not ops:
+        return 0, 0
+    result = await asyncio.to_thread(collection.bulk_write, ops, ordered=False)
+    return result.upserted_count, result.matched_count
+
+
+async def crawl(db, headers: dict[str, str]) -> None:
+    collection = db["companies"]
+
+    # Ensure uniqueness by 28hse_link and keep behavior deterministic across reruns.
+    collection.create_index("28hse_link", unique=True)
+    backfilled = backfill_codes(collection)
+    if backfilled:
+        print(f"Assigned codes to {backfilled} existing companies")
+
+    # Pages are recorded once all their companies are written, so a rerun resumes after the last one.
+    # Agencies that failed to fetch are queued in `failed_agencies` and retried first on the next run.
+    state = CrawlState.get(db, CRAWL_STATE_SOURCE)
+    start_page = (state.data.get("last_completed_page") or 0) + 1
+    retry_links = [tuple(link) for link in state.data.get("failed_agencies") or []]
+
+    async with httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=30) as async_client:
+        client = RateLimitedAsyncClient(async_client, TokenBucket(RATE_PER_SECOND), per_host_limit=CONCURRENCY)
+
+        first_html = await fetch_html(client, START_URL)
+        total_pages = parse_total_pages(first_html)
+        print(f"Detected total pages: {total_pages}")
+        if start_page > total_pages:
+            start_page = 1
+        if start_page > 1:
+            print(f"Resuming from page {start_page}")
+
+        global_seen: set[str] = set()
+        pending_ops: list[UpdateOne] = []
+        failed_links: list[tuple[str, str]] = []
+        processed = 0
+        inserted = 0
+        updated = 0
+
+        if retry_links:
+            print(f"Retrying {len(retry_links)} agencies that failed last run")
+            global_seen.update(agency_url for agency_url, _ in retry_links)
+            counts = await write_companies(collection, await fetch_company_ops(client, retry_links, failed_links))
+            inserted += counts[0]
+            updated += counts[1]
+            processed += len(retry_links)
+            state.update({"failed_agencies": [list(link) for link in failed_links]})
+
+        for page in range(start_page, total_pages + 1):
+            page_url = START_URL if page == 1 else PAGE_URL_TEMPLATE.format(page=page)
+            page_html = first_html if page == 1 else await fetch_html(client, page_url)
+
+            page_links = []
+            for agency_url, agency_id in extract_agency_links(page_html):
+                if agency_url in global_seen:
+                    continue
+                global_seen.add(agency_url)
+                page_links.append((agency_url, agency_id))
+
+            pending_ops.extend(await fetch_company_ops(client, page_links, failed_links))
+            processed += len(page_links)
+
+            if len(pending_ops) >= BULK_BATCH_SIZE or page == total_pages:
+                counts = await write_companies(collection, pending_ops)
+                inserted += counts[0]
+                updated += counts[1]
+                pending_ops = []
+                state.update({
+                    "last_completed_page": page,
+                    "total_pages": total_pages,
+                    "failed_agencies": [list(link) for link in failed_links],
+                })
+
+            print(
+                f"Page {page}/{total_pages}: processed {len(page_links)} links "
+                f"(inserted={inserted}, updated={updated}, failed={len(failed_links)})"
+            )
+
+    # A finished sweep starts from the first page next time.
+    state.update({"last_completed_page": 0, "completed_at": int(time.time())})
+    print(
+        f"Done. processed={processed}, inserted={inserted}, "
+        f"updated={updated}, failed={len(failed_links)}."
+    )
+
+
 def main() -> None:
-    if load_dotenv is None or MongoClient is None:
-        print("Missing dependencies. Please install: pymongo python-dotenv")
+    if load_dotenv is None or MongoClient is None or httpx is None:
+        print("Missing dependencies. Please install: pymongo python-dotenv httpx")
         return
 
     load_dotenv()
@@ -181,78 +329,10 @@ def main() -> None:
 
     mongo_client = MongoClient(mongodb_connection_string)
     db = mongo_client["prop_main"]
-    collection = db["companies"]
-
-    # Ensure uniqueness by 28hse_link and keep behavior deterministic across reruns.
-    collection.create_index("28hse_link", unique=True)
-
-    first_html = fetch_html(START_URL, headers=headers)
-    total_pages = parse_total_pages(first_html)
-    print(f"Detected total pages: {total_pages}")
-
-    global_seen: set[str] = set()
-    processed = 0
-    inserted = 0
-    updated = 0
-    failed = 0
-
-    for page in range(1, total_pages + 1):
-        page_url = START_URL if page == 1 else PAGE_URL_TEMPLATE.format(page=page)
-        page_html = first_html if page == 1 else fetch_html(page_url, headers=headers)
-
-        page_processed = 0
-        for agency_url, agency_id in extract_agency_links(page_html):
-            if agency_url in global_seen:
-                continue
-            global_seen.add(agency_url)
-
-            page_processed += 1
-            processed += 1
-
-            try:
-                zh_html = fetch_html(agency_url, headers=headers)
-                en_html = fetch_html(f"{BASE_URL}/en/agent/{agency_id}", headers=headers)
-                doc = build_company_doc(agency_id, agency_url, zh_html, en_html)
-
-                existing = collection.find_one({"28hse_link": agency_url}, {"code": 1})
-                company_code = (existing or {}).get("code") or str(uuid.uuid4())
-                doc["code"] = company_code
-
-                now_ts = int(time.time())
-                result = collection.update_one(
-                    {"28hse_link": agency_url},
-                    {
-                        "$set": doc,
-                        "$setOnInsert": {"createdAt": now_ts},
-                    },
-                    upsert=True,
-                )
-
-                if result.upserted_id is not None:
-                    inserted += 1
-                else:
-                    updated += 1
-
-            except Exception as exc:
-                failed += 1
-                print(f"Failed to process {agency_url}: {exc}")
-
-            time.sleep(0.2)
-
-        print(
-            f"Page {page}/{total_pages}: processed {page_processed} links "
-            f"(inserted={inserted}, updated={updated}, failed={failed})"
-        )
-
-        if page < total_pages:
-            time.sleep(0.35)
-
-    print(
-        f"Done. processed={processed}, inserted={inserted}, "
-        f"updated={updated}, failed={failed}."
-    )
-
-    mongo_client.close()
+    try:
+        asyncio.run(crawl(db, headers))
+    finally:
+        mongo_client.close()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
+import asyncio
 import os
 import time
 import trafilatura
-from urllib.request import Request, urlopen
+
+from models.crawl_state import CrawlState
+from utils.async_http import TokenBucket, RateLimitedAsyncClient
+
+try:
+	import httpx
+except Exception:  # noqa: BLE001
+	httpx = None
 
 try:
 	from bs4 import BeautifulSoup
@@ -14,22 +22,30 @@ except Exception:  # noqa: BLE001
 	load_dotenv = None
 
 try:
-	from pymongo import MongoClient
+	from pymongo import MongoClient, UpdateOne
 except Exception:  # noqa: BLE001
 	MongoClient = None
+	UpdateOne = None
 
 
-def fetch_html(url: str, headers: dict[str, str], retries: int = 3) -> str:
+CRAWL_STATE_SOURCE = "28hse_agents"
+CONCURRENCY = int(os.getenv("AGENT_CRAWL_CONCURRENCY", "8"))
+RATE_PER_SECOND = float(os.getenv("AGENT_CRAWL_RATE_PER_SECOND", "5"))
+# Companies fetched and written per page; the crawl checkpoints after each one.
+PAGE_SIZE = int(os.getenv("AGENT_CRAWL_PAGE_SIZE", "50"))
+
+
+async def fetch_html(client: RateLimitedAsyncClient, url: str, retries: int = 3) -> str:
 	last_error: Exception | None = None
 	for attempt in range(1, retries + 1):
 		try:
-			req = Request(url=url, headers=headers)
-			with urlopen(req, timeout=30) as resp:
-				return resp.read().decode("utf-8", errors="replace")
+			resp = await client.get(url)
+			resp.raise_for_status()
+			return resp.text
 		except Exception as exc:
 			last_error = exc
 			if attempt < retries:
-				time.sleep(1.5 * attempt)
+				await asyncio.sleep(1.5 * attempt)
 	raise RuntimeError(f"Failed to fetch URL after {retries} attempts: {url}") from last_error
 
 
@@ -104,27 +120,38 @@ def parse_agents_from_company_html(html: str) -> list[dict[str, str]]:
 	return result
 
 
-def main() -> None:
-	if load_dotenv is None or MongoClient is None or BeautifulSoup is None:
-		print("Missing dependencies. Please install: pymongo python-dotenv beautifulsoup4")
-		return
-
-	load_dotenv()
-	mongodb_connection_string = os.getenv("MONGODB_CONNECTION_STRING")
-	if not mongodb_connection_string:
-		print("Missing MONGODB_CONNECTION_STRING in environment.")
-		return
-
-	headers = {
-		"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-		"AppleWebKit/537.36 (KHTML, like Gecko) "
-		"Chrome/126.0.0.0 Safari/537.36",
-		"Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+async def fetch_company_agents(client: RateLimitedAsyncClient, company: dict) -> list[dict[str, str]]:
+	link = clean_text(company.get("28hse_link"))
+	if not link:
+		return []
+	html = await fetch_html(client, link)
+	agents = parse_agents_from_company_html(html)
+	for agent in agents:
+		agent["companyId"] = company.get("_id")
+		agent["type"] = "agent"
+	return agents
+
+
+def build_profile_ops(agent_collection, agents: list[dict[str, str]]) -> list[UpdateOne]:
+	# One lookup per page instead of per agent; the last company listing a license wins.
+	by_license = {agent["licenseNumber"]: agent for agent in agents}
+	claimed = {
+		doc["licenseNumber"]
+		for doc in agent_collection.find(
+			{"licenseNumber": {"$in": list(by_license)}},
+			{"licenseNumber": 1, "adminIds": 1},
+		)
+		if len(doc.get("adminIds", [])) > 0
 	}
+	# Profiles with admins are managed by the agent themselves and left untouched.
+	return [
+		UpdateOne({"licenseNumber": license_number}, {"$set": agent}, upsert=True)
+		for license_number, agent in by_license.items()
+		if license_number not in claimed
+	]
 
-	mongo_client = MongoClient(mongodb_connection_string)
-	db = mongo_client["prop_main"]
 
+async def crawl(db, headers: dict[str, str]) -> None:
 	company_collection = db["companies"]
 	if company_collection.estimated_document_count() == 0:
 		company_collection = db["companise"]
@@ -138,10 +165,12 @@ def main() -> None:
 
 	# agent_collection.create_index("licenseNumber", unique=True)
 
-	companies = company_collection.find(
-		{"28hse_link": {"$exists": True, "$ne": ""}},
-		{"28hse_link": 1, "code": 1},
-	)
+	# Companies are walked in _id order so a rerun resumes after the last completed page.
+	state = CrawlState.get(db, CRAWL_STATE_SOURCE)
+	company_filter = {"28hse_link": {"$exists": True, "$ne": ""}}
+	if state.data.get("last_company_id") is not None:
+		company_filter["_id"] = {"$gt": state.data["last_company_id"]}
+		print(f"Resuming after company {state.data['last_company_id']}")
 
 	total_companies = 0
 	total_agents_found = 0
@@ -149,52 +178,77 @@ def main() -> None:
 	updated = 0
 	failed_companies = 0
 
-	for company in companies:
-		link = clean_text(company.get("28hse_link"))
-		company_id = company.get("_id")
-		if not link:
-			continue
+	async with httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=30) as async_client:
+		client = RateLimitedAsyncClient(async_client, TokenBucket(RATE_PER_SECOND), per_host_limit=CONCURRENCY)
 
-		total_companies += 1
+		while True:
+			companies = list(
+				company_collection.find(company_filter, {"28hse_link": 1, "code": 1}).sort("_id", 1).limit(PAGE_SIZE)
+			)
+			if not companies:
+				break
 
-		try:
-			html = fetch_html(link, headers=headers)
-			agents = parse_agents_from_company_html(html)
+			results = await asyncio.gather(
+				*(fetch_company_agents(client, company) for company in companies),
+				return_exceptions=True,
+			)
+			agents: list[dict[str, str]] = []
+			for company, result in zip(companies, results):
+				if isinstance(result, Exception):
+					failed_companies += 1
+					print(f"Failed company link: {company.get('28hse_link')} | error: {result}")
+					continue
+				agents.extend(result)
+			total_companies += len(companies)
 			total_agents_found += len(agents)
 
-			for agent in agents:
-				agent["companyId"] = company_id
-				agent["type"] = "agent"
-				existing_agent = agent_collection.find_one({"licenseNumber": agent["licenseNumber"]})
-				if not existing_agent:
-					result = agent_collection.insert_one(agent)
-					if result.inserted_id is not None:
-						inserted += 1
-				elif len(existing_agent.get("adminIds", [])) == 0:
-					result = agent_collection.update_one(
-						{"licenseNumber": agent["licenseNumber"]},
-						{"$set": agent},
-					)
-					updated += result.modified_count
+			ops = await asyncio.to_thread(build_profile_ops, agent_collection, agents) if agents else []
+			if ops:
+				result = await asyncio.to_thread(agent_collection.bulk_write, ops, ordered=False)
+				inserted += result.upserted_count
+				updated += result.modified_count
 
-		except Exception as exc:
-			failed_companies += 1
-			print(f"Failed company link: {link} | error: {exc}")
+			last_company_id = companies[-1]["_id"]
+			state.update({"last_company_id": last_company_id})
+			company_filter["_id"] = {"$gt": last_company_id}
 
-		if total_companies % 20 == 0:
 			print(
 				f"Processed companies={total_companies}, agents_found={total_agents_found}, "
 				f"inserted={inserted}, updated={updated}, failed_companies={failed_companies}"
 			)
 
-		time.sleep(0.2)
-
+	# A finished sweep starts from the first company next time.
+	state.update({"last_company_id": None, "completed_at": int(time.time())})
 	print(
 		f"Done. companies={total_companies}, agents_found={total_agents_found}, "
 		f"inserted={inserted}, updated={updated}, failed_companies={failed_companies}"
 	)
 
-	mongo_client.close()
+
+def main() -> None:
+	if load_dotenv is None or MongoClient is None or BeautifulSoup is None or httpx is None:
+		print("Missing dependencies. Please install: pymongo python-dotenv beautifulsoup4 httpx")
+		return
+
+	load_dotenv()
+	mongodb_connection_string = os.getenv("MONGODB_CONNECTION_STRING")
+	if not mongodb_connection_string:
+		print("Missing MONGODB_CONNECTION_STRING in environment.")
+		return
+
+	headers = {
+		"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+		"AppleWebKit/537.36 (KHTML, like Gecko) "
+		"Chrome/126.0.0.0 Safari/537.36",
+		"Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+	}
+
+	mongo_client = MongoClient(mongodb_connection_string)
+	db = mongo_client["prop_main"]
+	try:
+		asyncio.run(crawl(db, headers))
+	finally:
+		mongo_client.close()
 
 
 if __name__ == "__main__":
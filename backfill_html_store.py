@@ -0,0 +1,52 @@
+import os
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from utils.html_store import HtmlStore
+
+load_dotenv()
+
+MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
+
+BATCH_SIZE = int(os.getenv("HTML_STORE_BACKFILL_BATCH_SIZE", "200"))
+
+INLINE_HTML_FILTER = {"source_html_content": {"$nin": [None, ""]}}
+
+
+def run() -> int:
+    if not MONGODB_CONNECTION_STRING:
+        raise RuntimeError("MONGODB_CONNECTION_STRING is not set")
+    client = MongoClient(MONGODB_CONNECTION_STRING)
+    try:
+        properties = client["prop_main"]["props"]
+        store = HtmlStore()
+        moved = 0
+        last_id = None
+        while True:
+            query = dict(INLINE_HTML_FILTER)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            docs = list(properties.find(query, {"source_html_content": 1}).sort("_id", 1).limit(BATCH_SIZE))
+            if not docs:
+                break
+            ops = [
+                UpdateOne(
+                    {"_id": doc["_id"], "source_html_content": doc["source_html_content"]},
+                    {"$set": {
+                        "source_html_ref": store.put(doc["source_html_content"]),
+                        "source_html_content": None,
+                    }},
+                )
+                for doc in docs
+            ]
+            moved += properties.bulk_write(ops, ordered=False).modified_count
+            last_id = docs[-1]["_id"]
+            print(f"Moved {moved} HTML bodies to {store.root}")
+        return moved
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,34 +1,59 @@
 import json
 import os
-import random
 import sys
-from typing import Optional
+from typing import List, Optional
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.collection import Collection
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import BulkWriteError
+
+from models.prop import ShortIdAllocator, is_short_id_collision
 
 load_dotenv()
 
 MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
 
-SHORT_ID_LENGTH = 8
-SHORT_ID_ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnpqrstuvwxyz"
 MAX_ATTEMPTS = 20
+BATCH_SIZE = int(os.getenv("SHORT_ID_BACKFILL_BATCH_SIZE", "500"))
+
+MISSING_SHORT_ID_FILTER = {
+    "$or": [
+        {"short_id": {"$exists": False}},
+        {"short_id": ""},
+    ]
+}
 
 
-def random_short_id(length: int = SHORT_ID_LENGTH) -> str:
-    return "".join(random.choice(SHORT_ID_ALPHABET) for _ in range(length))
+def assign_short_ids(collection: Collection, doc_ids: List, allocator: ShortIdAllocator) -> int:
+    pending_ids = list(doc_ids)
+    updated_count = 0
 
+    for _ in range(MAX_ATTEMPTS):
+        if not pending_ids:
+            return updated_count
 
-def generate_unique_short_id(collection: Collection, max_attempts: int = MAX_ATTEMPTS) -> str:
-    for _ in range(max_attempts):
-        candidate = random_short_id()
-        exists = collection.find_one({"short_id": candidate}, {"_id": 1}) is not None
-        if not exists:
-            return candidate
-    raise RuntimeError("Failed to generate unique short_id after maximum attempts")
+        short_ids = allocator.take(len(pending_ids))
+        ops = [
+            UpdateOne(
+                {"_id": doc_id, **MISSING_SHORT_ID_FILTER},
+                {"$set": {"short_id": short_id}},
+            )
+            for doc_id, short_id in zip(pending_ids, short_ids)
+        ]
+        try:
+            result = collection.bulk_write(ops, ordered=False)
+            updated_count += result.modified_count
+            pending_ids = []
+        except BulkWriteError as error:
+            write_errors = error.details.get("writeErrors", [])
+            if not all(is_short_id_collision(write_error) for write_error in write_errors):
+                raise
+            # Race-safe retry: only rows whose short_id was already claimed are retried.
+            updated_count += error.details.get("nModified", 0)
+            pending_ids = [pending_ids[write_error["index"]] for write_error in write_errors]
+
+    raise RuntimeError(f"Could not assign unique short_id for {len(pending_ids)} documents")
 
 
 def get_mongo_client() -> MongoClient:
@@ -52,42 +77,14 @@ def run() -> int:
             sparse=True,
         )
 
-        docs = list(
-            properties.find(
-                {
-                    "$or": [
-                        {"short_id": {"$exists": False}},
-                        {"short_id": ""},
-                    ]
-                },
-                {"_id": 1, "id": 1, "short_id": 1},
-            )
-        )
+        docs = list(properties.find(MISSING_SHORT_ID_FILTER, {"_id": 1}))
 
+        allocator = ShortIdAllocator(block_size=BATCH_SIZE)
         updated_count = 0
 
-        for doc in docs:
-            for _ in range(MAX_ATTEMPTS):
-                short_id = generate_unique_short_id(properties)
-                try:
-                    result = properties.update_one(
-                        {
-                            "_id": doc["_id"],
-                            "$or": [
-                                {"short_id": {"$exists": False}},
-                                {"short_id": ""},
-                            ],
-                        },
-                        {"$set": {"short_id": short_id}},
-                    )
-                    if result.modified_count == 1:
-                        updated_count += 1
-                    break
-                except DuplicateKeyError:
-                    # Race-safe retry if another writer claimed the same short_id.
-                    continue
-            else:
-                raise RuntimeError(f"Could not assign unique short_id for document _id={doc['_id']}")
+        for start in range(0, len(docs), BATCH_SIZE):
+            batch_ids = [doc["_id"] for doc in docs[start:start + BATCH_SIZE]]
+            updated_count += assign_short_ids(properties, batch_ids, allocator)
 
         print(
             json.dumps(
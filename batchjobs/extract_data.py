@@ -0,0 +1,239 @@
+import json
+import os
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from extracters.pre_extract import pre_extract
+from utils.html_store import load_prop_html
+from utils.llm_cache import cached_result_line, get_llm_cache
+from utils.llm_html import compact_html_for_llm
+
+load_dotenv()
+
+EXTRACT_DATA_BATCH_SIZE = int(os.getenv("EXTRACT_DATA_BATCH_SIZE", "200"))
+EXTRACT_DATA_MAX_OPEN_BATCHES = int(os.getenv("EXTRACT_DATA_MAX_OPEN_BATCHES", "4"))
+EXTRACT_RESULT_BULK_SIZE = int(os.getenv("EXTRACT_RESULT_BULK_SIZE", "1000"))
+EXTRACT_MAX_TOKENS = int(os.getenv("EXTRACT_MAX_TOKENS", "1200"))
+EXTRACT_MIN_TOKENS = int(os.getenv("EXTRACT_MIN_TOKENS", "300"))
+EXTRACT_RULES_ENABLED = os.getenv("EXTRACT_RULES_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+
+PENDING_FILTER = {
+    'status': "pending_extraction",
+    'type': "apartment",
+    'post_type': "rent",
+    'v1_data_extracting_code': { '$exists': False },
+}
+
+
+# v1_extracted_data fields and how the prompt describes each one.
+FIELD_SCHEMA = {
+    "title": '"string"',
+    "description": '"string"',
+    "estate_or_building_name": '"string"|null (need to be specified if it\'s an estate or building, otherwise it should be null)',
+    "district": '"string"',
+    "floor": '"string"',
+    "features": '[ "string", ... ]',
+    "photo_urls": '[ "string", ... ]',
+    "rent_price": 'number|null',
+    "sell_price": 'number|null',
+    "net_size_sqft": 'number|null',
+    "gross_size_sqft": 'number|null',
+    "number_of_bedrooms": 'number|null',
+    "number_of_bathrooms": 'number|null',
+    "maid_rooms": 'number|null',
+    "storerooms": 'number|null',
+    "has_balcony": 'boolean|null',
+    "has_terrace": 'boolean|null',
+    "kitchen_type": '"open"|"closed"|null',
+    "building_age": 'number|null',
+    "is_village_house": 'boolean|null',
+    "allow_pets": 'boolean|null',
+    "is_direct_owner_listing": 'boolean|null',
+    "accept_short_term_rental": 'boolean|null',
+    "with_car_park": 'boolean|null',
+    "nearby_places": '[ "string", ... ]',
+    "transportation_options": '[ "string", ... ]',
+    "additional_notes": '"string"',
+    "information_updated_date": '"string"',
+    "posted_date": '"string"',
+    "post_updated_date": '"string"',
+}
+
+
+def system_prompt(body, fields=None):
+    fields = fields or list(FIELD_SCHEMA)
+    schema = ",\n".join(f'    "{field}": {FIELD_SCHEMA[field]}' for field in fields)
+    return f"""
+Extract structured property data from the listing page below.
+The page is reduced to text: table rows as "label: value", images as [img url], links as [text](url).
+Use only evidence in the page. If unsure, use null or an empty array.
+
+PAGE:
+{body}
+Return only valid JSON in this format:
+{{
+{schema}
+}}
+"""
+
+def create_prompt(body, source_channel=None, fields=None):
+    return [{
+        "role": "system",
+        "content": system_prompt(compact_html_for_llm(body, source_channel), fields)
+    }]
+
+
+def max_tokens_for(fields):
+    # The full schema needs EXTRACT_MAX_TOKENS; a partial one proportionally less.
+    return max(EXTRACT_MIN_TOKENS, -(-EXTRACT_MAX_TOKENS * len(fields) // len(FIELD_SCHEMA)))
+
+
+def build_batch_rows(db, batch_code, limit=EXTRACT_DATA_BATCH_SIZE):
+    # Claims the props it returns rows for by tagging them with the batch code.
+    # Fields the scraper already parsed are kept in v1_rule_extracted_data and left
+    # out of the prompt. Location (district, estate) is never in the scraped fields,
+    # so every prop still goes to the LLM; prompts the LLM cache has answered before
+    # are ingested without a batch row.
+    collection = db['props']
+    cache = get_llm_cache()
+    rows = []
+    claims = []
+    cached_lines = []
+    for property in collection.find(PENDING_FILTER).sort("created_at", -1).limit(limit):
+        rule_data = pre_extract(property) if EXTRACT_RULES_ENABLED else {}
+        body = load_prop_html(property)
+        if not body:
+            print(f"No html body found for property {property['source_id']}.")
+            continue
+        fields = [field for field in FIELD_SCHEMA if field not in rule_data]
+        custom_id = f"task-{property['source_id']}"
+        request_body = {
+            "model": "gpt-4.1-nano",
+            "messages": create_prompt(body, property.get('source_channel'), fields),
+            "max_tokens": max_tokens_for(fields),
+            "response_format": { "type": "json_object" }
+        }
+        cached = cache.lookup(request_body) if cache else None
+        if cached is not None:
+            cached_lines.append(json.dumps(cached_result_line(custom_id, cached)))
+            claims.append(UpdateOne(
+                { 'source_id': property['source_id'] },
+                { '$set': { 'v1_rule_extracted_data': rule_data } }
+            ))
+            continue
+        if cache:
+            cache.track(custom_id, request_body)
+        rows.append({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": request_body,
+        })
+        claims.append(UpdateOne(
+            { 'source_id': property['source_id'] },
+            { '$set': { 'v1_data_extracting_code': batch_code, 'v1_rule_extracted_data': rule_data } }
+        ))
+    if claims:
+        collection.bulk_write(claims, ordered=False)
+    if cached_lines:
+        # After the claims, so the merge in build_result_op sees v1_rule_extracted_data.
+        print(f"Answered {len(cached_lines)} props from the LLM cache.")
+        ingest_results(collection, cached_lines)
+    return rows
+
+
+def build_result_op(content):
+    # One UpdateOne per output line: the extracted data, or the error for that prop.
+    source_id = (content.get('custom_id') or '').replace('task-', '')
+    try:
+        if content.get('error'):
+            raise Exception(f"Error in content: {content['error']}")
+        if not source_id:
+            raise Exception(f"No source_id found in content: {content}")
+        res_str = content['response']['body']['choices'][0]['message']['content']
+        res_json = json.loads(res_str)
+        if not isinstance(res_json, dict):
+            raise Exception(f"Expected a JSON object, got: {res_str[:200]}")
+        # Pipeline update so the LLM answer is merged with the rule fields in the same op;
+        # rule fields win, and $literal keeps "$..." strings in the answer from being read as paths.
+        # Re-extracted props go back to the status they had (reextract_restore_status).
+        return UpdateOne(
+            { 'source_id': source_id },
+            [{
+                '$set': {
+                    'v1_extracted_data': { '$mergeObjects': [
+                        { '$literal': res_json },
+                        { '$ifNull': ['$v1_rule_extracted_data', {}] },
+                    ] },
+                    'extraction_method': 'llm',
+                    'status': { '$ifNull': ['$reextract_restore_status', 'data_extracted'] },
+                    'source_html_content': None,
+                },
+            }, {
+                '$unset': 'reextract_restore_status',
+            }]
+        ), None
+    except Exception as e:
+        return UpdateOne(
+            { 'source_id': source_id },
+            { '$set': { 'v1_extract_data_error': f"{e}" } }
+        ), f"Error processing content for source {source_id}: {e}"
+
+
+def ingest_results(collection, lines, bulk_size=EXTRACT_RESULT_BULK_SIZE):
+    """Applies batch output lines as unordered bulk_writes of `bulk_size` updates.
+
+    `lines` can be an open file, so a batch is streamed rather than loaded whole.
+    Returns (extracted, failed) counts.
+    """
+    cache = get_llm_cache()
+    ops = []
+    extracted = 0
+    failed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            content = json.loads(line)
+            op, error = build_result_op(content)
+        except Exception as e:
+            print(f"Skipping unparseable result line: {e}")
+            failed += 1
+            continue
+        if error:
+            print(error)
+            failed += 1
+        else:
+            extracted += 1
+            if cache:
+                cache.record_result(content)
+        ops.append(op)
+        if len(ops) >= bulk_size:
+            collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    print(f"Ingested results: {extracted} extracted, {failed} failed")
+    return extracted, failed
+
+
+class ExtractDataStage:
+    name = 'extract_data'
+    endpoint = '/chat/completions'
+    max_open = EXTRACT_DATA_MAX_OPEN_BATCHES
+
+    def build_requests(self, db, batch_code):
+        return build_batch_rows(db, batch_code)
+
+    def handle_results(self, db, lines):
+        return sum(ingest_results(db['props'], lines))
+
+    def release(self, db, batch_code):
+        # Props the batch returned nothing for go back to the pending pool.
+        db['props'].update_many(
+            {
+                'v1_data_extracting_code': batch_code,
+                'status': 'pending_extraction',
+                'v1_extract_data_error': { '$exists': False },
+            },
+            { '$unset': { 'v1_data_extracting_code': '' } },
+        )
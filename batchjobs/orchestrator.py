@@ -0,0 +1,196 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from models.batch_job import BatchJob, REMOTE_FAILED_STATUSES, REMOTE_RUNNING_STATUSES
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+BATCH_JOBS_FOLDER = os.getenv(
+    "BATCH_JOBS_FOLDER",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_FOLDER, "batch_jobs"),
+)
+BATCH_JOBS_POLL_WORKERS = int(os.getenv("BATCH_JOBS_POLL_WORKERS", "8"))
+BATCH_JOBS_POLL_SECONDS = int(os.getenv("BATCH_JOBS_POLL_SECONDS", "60"))
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+# A job still `preparing` after this long belongs to a crashed run.
+BATCH_PREPARE_TIMEOUT_SECONDS = int(os.getenv("BATCH_PREPARE_TIMEOUT_SECONDS", "3600"))
+
+
+class BatchOrchestrator:
+    """Drives every stage's LLM batches through preparing -> prepared -> uploaded
+    -> in_progress -> completed -> ingested, with state in the `batch_jobs` collection.
+
+    A stage is any object with `name`, `endpoint`, `max_open` and:
+      build_requests(db, batch_code) -> request rows (and claims the items they cover)
+      handle_results(db, lines)      -> applies an iterable of output/error lines, returns a count
+      release(db, batch_code)        -> returns unanswered items to the pending pool
+    Each `step()` tops up every stage to `max_open` open batches, uploads what was
+    prepared and polls all open batches at once, ingesting the ones that finished.
+    """
+
+    def __init__(self, db, client, stages, folder=BATCH_JOBS_FOLDER, poll_workers=BATCH_JOBS_POLL_WORKERS):
+        self.db = db
+        self.client = client
+        self.stages = { stage.name: stage for stage in stages }
+        self.folder = folder
+        self.poll_workers = poll_workers
+        os.makedirs(folder, exist_ok=True)
+        BatchJob.ensure_indexes(db)
+
+    def prepare(self, stage):
+        if BatchJob.count_open(self.db, stage.name) >= stage.max_open:
+            return None
+        batch_code = str(uuid.uuid4())
+        # The job exists before build_requests claims items, so they are always released
+        # if anything after the claim fails.
+        job = BatchJob.create(self.db, batch_code, stage.name)
+        request_path = os.path.join(self.folder, f"{stage.name}-{batch_code}.jsonl")
+        try:
+            rows = stage.build_requests(self.db, batch_code)
+            if not rows:
+                stage.release(self.db, batch_code)
+                job.delete()
+                return None
+            with open(request_path, 'w', encoding='utf-8') as request_file:
+                for row in rows:
+                    request_file.write(f"{json.dumps(row, ensure_ascii=False)}\n")
+            job.transition('preparing', 'prepared', { 'request_path': request_path, 'request_count': len(rows) })
+        except Exception as e:
+            self.abandon(job, stage, e)
+            if os.path.exists(request_path):
+                os.remove(request_path)
+            raise
+        print(f"[{stage.name}] prepared batch {batch_code} with {len(rows)} requests")
+        return job
+
+    def abandon(self, job, stage, error):
+        if job.transition('preparing', 'failed', { 'error': f"{error}" }):
+            stage.release(self.db, job.data['code'])
+
+    def recover(self):
+        # Jobs left `preparing` by a run that died between claiming and writing the batch file.
+        cutoff = time.time() - BATCH_PREPARE_TIMEOUT_SECONDS
+        for job in BatchJob.find(self.db, ['preparing'], updated_before=cutoff):
+            stage = self.stages.get(job.data['stage'])
+            if stage is None:
+                continue
+            try:
+                self.abandon(job, stage, "Abandoned while preparing")
+                print(f"[{stage.name}] released items of abandoned batch {job.data['code']}")
+            except Exception as e:
+                print(f"[{stage.name}] error releasing abandoned batch {job.data['code']}: {e}")
+
+    def upload(self, job):
+        stage = self.stages[job.data['stage']]
+        request_path = job.data['request_path']
+        if not os.path.exists(request_path):
+            # Prepared on another host or the file was lost; nothing to upload.
+            if job.transition('prepared', 'failed', { 'error': f"Missing request file {request_path}" }):
+                stage.release(self.db, job.data['code'])
+            return
+        with open(request_path, 'rb') as request_file:
+            file = self.client.files.create(file=request_file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=file.id,
+            endpoint=stage.endpoint,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        if job.transition('prepared', 'uploaded', {
+            'batch_id': batch.id,
+            'remote_status': batch.status,
+            'input_file_id': file.id,
+            'uploaded_at': time.time(),
+        }):
+            os.remove(request_path)
+            print(f"[{stage.name}] uploaded batch {job.data['code']} as {batch.id}")
+
+    def track(self, job):
+        stage = self.stages[job.data['stage']]
+        status = job.data['status']
+        batch = self.client.batches.retrieve(job.data['batch_id'])
+        if batch.status == 'completed':
+            job.transition(status, 'completed', {
+                'remote_status': batch.status,
+                'output_file_id': batch.output_file_id,
+                'error_file_id': batch.error_file_id,
+            })
+        elif batch.status in REMOTE_FAILED_STATUSES:
+            if job.transition(status, 'failed', { 'remote_status': batch.status, 'error': str(batch.errors) }):
+                stage.release(self.db, job.data['code'])
+                print(f"[{stage.name}] batch {job.data['code']} {batch.status}, items released")
+        elif batch.status in REMOTE_RUNNING_STATUSES and status == 'uploaded':
+            job.transition('uploaded', 'in_progress', { 'remote_status': batch.status })
+        elif batch.status != job.data.get('remote_status'):
+            job.update({ 'remote_status': batch.status })
+
+    def download(self, file_id, path):
+        # Streamed to disk so a large output file never sits in memory.
+        with self.client.files.with_streaming_response.content(file_id) as response:
+            response.stream_to_file(path)
+
+    def ingest(self, job):
+        stage = self.stages[job.data['stage']]
+        result_count = 0
+        for file_id in (job.data.get('output_file_id'), job.data.get('error_file_id')):
+            if not file_id:
+                continue
+            path = os.path.join(self.folder, f"{stage.name}-{job.data['code']}-{file_id}.jsonl")
+            self.download(file_id, path)
+            with open(path, 'r', encoding='utf-8') as result_file:
+                result_count += stage.handle_results(self.db, result_file)
+            os.remove(path)
+        stage.release(self.db, job.data['code'])
+        if job.transition('completed', 'ingested', { 'result_count': result_count }):
+            for file_id in (job.data.get('output_file_id'), job.data.get('error_file_id'), job.data.get('input_file_id')):
+                if file_id:
+                    try:
+                        self.client.files.delete(file_id)
+                    except Exception as e:
+                        print(f"Error deleting file {file_id}: {e}")
+            print(f"[{stage.name}] ingested {result_count} results from batch {job.data['code']}")
+
+    def advance(self, job):
+        try:
+            if job.data['status'] in ('uploaded', 'in_progress'):
+                self.track(job)
+            if job.data['status'] == 'completed':
+                self.ingest(job)
+        except Exception as e:
+            print(f"[{job.data['stage']}] error advancing batch {job.data['code']}: {e}")
+
+    def step(self):
+        self.recover()
+        for stage in self.stages.values():
+            try:
+                while self.prepare(stage):
+                    pass
+            except Exception as e:
+                print(f"[{stage.name}] error preparing batch: {e}")
+        for job in BatchJob.find(self.db, ['prepared']):
+            if job.data['stage'] not in self.stages:
+                continue
+            try:
+                self.upload(job)
+            except Exception as e:
+                print(f"[{job.data['stage']}] error uploading batch {job.data['code']}: {e}")
+
+        jobs = [
+            job for job in BatchJob.find(self.db, ['uploaded', 'in_progress', 'completed'])
+            if job.data['stage'] in self.stages
+        ]
+        if jobs:
+            with ThreadPoolExecutor(max_workers=self.poll_workers) as executor:
+                list(executor.map(self.advance, jobs))
+        return jobs
+
+    def run(self, loop=False, poll_seconds=BATCH_JOBS_POLL_SECONDS):
+        while True:
+            jobs = self.step()
+            print(f"{len(jobs)} batches open")
+            if not loop:
+                return
+            time.sleep(poll_seconds)
@@ -0,0 +1,293 @@
+import json
+import os
+import uuid
+from datetime import datetime
+import cloudscraper
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from utils.llm_cache import get_llm_cache
+
+load_dotenv()
+
+PHOTO_ANALYSIS_BATCH_SIZE = int(os.getenv("PHOTO_ANALYSIS_BATCH_SIZE", "200"))
+PHOTO_ANALYSIS_MAX_OPEN_BATCHES = int(os.getenv("PHOTO_ANALYSIS_MAX_OPEN_BATCHES", "4"))
+PHOTO_RESULT_BULK_SIZE = int(os.getenv("PHOTO_RESULT_BULK_SIZE", "1000"))
+
+scraper = cloudscraper.create_scraper()
+
+
+def create_photo_analysis_prompt(photo_url):
+    """Create a compact prompt for GPT-4o mini photo analysis."""
+    system_content = """Analyze one property photo and return only valid JSON.
+
+Return these fields:
+- image_description: short but specific description
+- is_photo_of_property: true if the image is part of the listing
+- is_indoor: true if taken indoors
+- is_human_in_photo: true if people are visible
+- is_violating_policy: true if inappropriate content is present
+- have_watermark: true if a watermark is present
+- quality_score: 0-100 score for clarity and property appeal
+- room_type: one of living_room, bedroom, kitchen, bathroom, exterior, view, other"""
+
+    # Build content array with text and images using low detail mode
+    user_content = [
+        {
+            "type": "text",
+            "text": f"Analyze this property photo and provide detailed information."
+        },
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": photo_url,
+                "detail": "low"
+            }
+        }
+    ]
+
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_content}
+    ]
+
+
+def cached_analysis(cache, body):
+    """Analysis a previous batch returned for the same prompt, or None."""
+    if not cache:
+        return None
+    cached = cache.lookup(body)
+    if not cached:
+        return None
+    try:
+        analysis = json.loads(cached['choices'][0]['message']['content'])
+    except Exception:
+        return None
+    return analysis if isinstance(analysis, dict) else None
+
+
+def target_photo_count(candidate_count):
+    if candidate_count <= 1:
+        return candidate_count
+    if candidate_count <= 3:
+        return 2
+    return 1
+
+
+def build_batch_rows(db, batch_code, limit=PHOTO_ANALYSIS_BATCH_SIZE):
+    # Claims props by moving them to photo_analysing; their photos are inserted
+    # as batch_created with the batch code, or analysed straight from the LLM cache.
+    collection = db['props']
+    photo_collection = db['prop_photos']
+    cache = get_llm_cache()
+    rows = []
+    cached_count = 0
+    for prop in collection.find({ 'status': 'data_extracted' }).sort("created_at", -1).limit(limit):
+        links = prop.get('image_links')
+        if not isinstance(links, list):
+            links = []
+
+        extracted_data = prop.get('v1_extracted_data')
+        if not isinstance(extracted_data, dict):
+            extracted_data = {}
+
+        photo_urls = extracted_data.get('photo_urls')
+        if not isinstance(photo_urls, list):
+            photo_urls = []
+
+        for l in photo_urls:
+            if l not in links:
+                links.append(l)
+        links = list(dict.fromkeys(links))
+        photo_limit = target_photo_count(len(links))
+        prop_photo_count = 0
+        for link in links[:photo_limit]:
+            existing_photo = photo_collection.find_one({ 'prop_source_id': prop.get('source_id'), 'photo_url': link })
+            if existing_photo:
+                print(f"Photo already exists in collection, skipping: {link}")
+                continue
+            try:
+                response = scraper.get(link, stream=True)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Error accessing photo: {link} : {e}")
+                continue
+
+            photo_id = str(uuid.uuid4())
+            body = {
+                "model": "gpt-4o-mini-batch",
+                "messages": create_photo_analysis_prompt(link),
+                "max_tokens": 300,
+                "temperature": 0.3,
+                "response_format": { "type": "json_object" }
+            }
+            photo_doc = {
+                'photo_id': photo_id,
+                'prop_type': prop.get('type'),
+                'prop_id': prop.get('id'),
+                'prop_source_id': prop.get('source_id'),
+                'prop_source_channel': prop.get('source_channel'),
+                'prop_estate_or_building_name': extracted_data.get('estate_or_building_name'),
+                'prop_estate_or_building_id': prop.get('estate_or_building_id'),
+                'prop_estate_or_building_regions': prop.get('estate_building_regions', []),
+                'prop_rent_price': extracted_data.get('rent_price'),
+                'prop_sell_price': extracted_data.get('sell_price'),
+                'prop_bedrooms': extracted_data.get('number_of_bedrooms'),
+                'prop_district': extracted_data.get('district'),
+                'keywords': extracted_data.get('features', []),
+                'photo_url': link,
+                'created_at': datetime.now().timestamp(),
+            }
+
+            analysis = cached_analysis(cache, body)
+            if analysis is not None:
+                photo_collection.insert_one({
+                    **photo_doc,
+                    **analysis,
+                    'status': 'photo_analysed',
+                })
+                cached_count += 1
+                print(f"Analysed photo for property {prop.get('source_id')} ({photo_id}) from cache: {link}")
+                continue
+
+            row = {
+                "custom_id": f"photo-{photo_id}",
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": body,
+            }
+            if cache:
+                cache.track(row['custom_id'], body)
+            rows.append(row)
+
+            photo_collection.insert_one({
+                **photo_doc,
+                'photo_analysis_batch_code': batch_code,
+                'status': 'batch_created',
+            })
+            prop_photo_count += 1
+            print(f"Processed photo for property {prop.get('source_id')} ({photo_id}): {link}")
+
+        collection.update_one(
+            { 'source_id': prop.get('source_id') },
+            { '$set': { 'status': 'photo_analysing' if prop_photo_count > 0 else 'photo_analysed' } }
+        )
+        if prop_photo_count == 0:
+            print(f"No photos to batch for {prop.get('source_id')}, marked as photo_analysed.")
+
+    if cached_count > 0:
+        print(f"Answered {cached_count} photos from the LLM cache.")
+    return rows
+
+
+def build_result_op(content):
+    # One UpdateOne per output or error line: the analysis, or the API error for that photo.
+    photo_id = (content.get('custom_id') or '').replace('photo-', '', 1)
+    response = content.get('response') or {}
+    if content.get('error') or response.get('status_code', 200) != 200:
+        error_info = content.get('error') or (response.get('body') or {}).get('error') or {}
+        return UpdateOne(
+            { 'photo_id': photo_id },
+            { '$set': { 'status': 'photo_analysis_failed', 'api_error': error_info } }
+        ), f"✗ photo {photo_id} failed: {error_info.get('code')} - {error_info.get('message', 'unknown')}"
+    try:
+        choices = (response.get('body') or {}).get('choices', [])
+        if not choices:
+            raise Exception("No choices found")
+        analysis_result = json.loads(choices[0].get('message', {}).get('content', '{}'))
+        if not isinstance(analysis_result, dict):
+            raise Exception("Expected a JSON object")
+    except Exception as e:
+        return UpdateOne(
+            { 'photo_id': photo_id },
+            { '$set': { 'status': 'photo_analysis_failed', 'api_error': { 'message': f"{e}" } } }
+        ), f"Error parsing JSON response for photo {photo_id}: {e}"
+    return UpdateOne(
+        { 'photo_id': photo_id },
+        { '$set': { **analysis_result, 'status': 'photo_analysed' } }
+    ), None
+
+
+def ingest_results(photo_collection, lines, bulk_size=PHOTO_RESULT_BULK_SIZE):
+    """Applies photo batch output and error lines as unordered bulk_writes.
+
+    Returns (analysed, failed) counts; props are resolved afterwards by `release_batch`.
+    """
+    cache = get_llm_cache()
+    ops = []
+    analysed = 0
+    failed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            content = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping unparseable result line: {e}")
+            failed += 1
+            continue
+        if not (content.get('custom_id') or '').startswith('photo-'):
+            continue
+        op, error = build_result_op(content)
+        if error:
+            print(error)
+            failed += 1
+        else:
+            analysed += 1
+            if cache:
+                cache.record_result(content)
+        ops.append(op)
+        if len(ops) >= bulk_size:
+            photo_collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        photo_collection.bulk_write(ops, ordered=False)
+    print(f"Ingested results: {analysed} photos analysed, {failed} failed")
+    return analysed, failed
+
+
+def release_batch(db, batch_code):
+    # Photos the batch never answered are dropped and their props go back to
+    # data_extracted, so the next batch asks for just those photos again. The
+    # other props are photo_analysed if any photo was, else photo_analysis_failed.
+    collection = db['props']
+    photo_collection = db['prop_photos']
+    batch_filter = { 'photo_analysis_batch_code': batch_code }
+    unanswered_ids = set(photo_collection.distinct('prop_source_id', { **batch_filter, 'status': 'batch_created' }))
+    batch_ids = set(photo_collection.distinct('prop_source_id', batch_filter))
+    if unanswered_ids:
+        photo_collection.delete_many({ **batch_filter, 'status': 'batch_created' })
+        collection.update_many(
+            { 'source_id': { '$in': list(unanswered_ids) }, 'status': 'photo_analysing' },
+            { '$set': { 'status': 'data_extracted' } }
+        )
+    answered_ids = batch_ids - unanswered_ids
+    analysed_ids = set(photo_collection.distinct('prop_source_id', {
+        'prop_source_id': { '$in': list(answered_ids) },
+        'status': 'photo_analysed',
+    })) if answered_ids else set()
+    if analysed_ids:
+        collection.update_many(
+            { 'source_id': { '$in': list(analysed_ids) }, 'status': 'photo_analysing' },
+            { '$set': { 'status': 'photo_analysed' } }
+        )
+    failed_only_ids = answered_ids - analysed_ids
+    if failed_only_ids:
+        collection.update_many(
+            { 'source_id': { '$in': list(failed_only_ids) }, 'status': 'photo_analysing' },
+            { '$set': { 'status': 'photo_analysis_failed' } }
+        )
+
+
+class PhotoAnalysisStage:
+    name = 'photo_analysis'
+    endpoint = '/chat/completions'
+    max_open = PHOTO_ANALYSIS_MAX_OPEN_BATCHES
+
+    def build_requests(self, db, batch_code):
+        return build_batch_rows(db, batch_code)
+
+    def handle_results(self, db, lines):
+        return sum(ingest_results(db['prop_photos'], lines))
+
+    def release(self, db, batch_code):
+        release_batch(db, batch_code)
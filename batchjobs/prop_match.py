@@ -1,35 +1,20 @@
 import os
-import uuid
 import json
-import requests
+import time
 import math
-from bson import ObjectId
+import requests
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from bson import ObjectId
 from dotenv import load_dotenv
-from bson.objectid import ObjectId
-import send_prop_matched_wtsapp_msg
+from models.crawl_state import CrawlState
+from utils.llm_cache import cached_result_line, get_llm_cache
 
 load_dotenv()
 
-MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
-ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER")
-
-dir = os.path.dirname(os.path.abspath(__file__))
-artifacts = os.path.join(dir, ARTIFACTS_FOLDER)
-folder = os.path.join(artifacts, 'prop_match')
-
-os.makedirs(os.path.join(folder, 'batch_files'), exist_ok=True)
-os.makedirs(os.path.join(folder, 'upload_batches'), exist_ok=True)
-os.makedirs(os.path.join(folder, 'results'), exist_ok=True)
-os.makedirs(os.path.join(folder, 'data'), exist_ok=True)
-
-user_batch_size = 100
-conv_batch_size = 100
-
-
-def gen_batch_code():
-    return str(uuid.uuid4())
+# Matching sends every active conversation at once, for yesterday's listings only.
+PROP_MATCH_MAX_OPEN_BATCHES = int(os.getenv("PROP_MATCH_MAX_OPEN_BATCHES", "1"))
+PROP_MATCH_STATE = 'prop_match'
+max_listings_per_prompt = 6
 
 
 def get_yesterday_timestamps():
@@ -50,14 +35,6 @@ def get_yesterday_props(db):
     return list(db['props'].find(f))
 
 
-def get_all_result_files(folder_path):
-    files = []
-    for filename in os.listdir(folder_path):
-        if filename.endswith('-result.json'):
-            files.append(os.path.join(folder_path, filename))
-    return files
-
-
 def is_push_true_for_last_10_messages(conv):
     messages = conv.get('messages', [])
     if len(messages) < 10:
@@ -275,80 +252,194 @@ def active_conversation(db):
     }
     return db['conversations-v2'].find(query)
 
-def move_file(src, dst):
+def append_match(db, record):
+    """Appends the matched property of one result line to its conversation.
+
+    Returns 'sent', 'skipped' or 'failed', or None for lines that are not matches.
+    """
+    custom_id = record.get('custom_id', '')
+    if not custom_id.startswith('match-'):
+        return None
+
+    # Extract conv ObjectId
+    conv_id_str = custom_id.replace('match-', '', 1)
     try:
-        os.rename(src, dst)
-        print(f"Moved: {src} → {dst}")
-    except Exception as e:
-        print(f"Error moving file {src}: {e}")
+        conv_oid = ObjectId(conv_id_str)
+    except Exception:
+        print(f"Invalid conv_id in custom_id: {custom_id}")
+        return 'skipped'
 
+    # Parse LLM response
+    response_body = record.get('response', {}).get('body', {})
+    choices = response_body.get('choices', [])
+    if not choices:
+        return 'skipped'
 
-def main():
-    result_files = get_all_result_files(os.path.join(folder, 'results'))
-    if result_files:
-        for file_path in result_files:
-            print(f"Backup previous result file: {file_path}")
-            move_file(file_path, os.path.join(folder, 'backup', os.path.basename(file_path)))
+    try:
+        llm_result = json.loads(choices[0]['message']['content'])
+    except (json.JSONDecodeError, KeyError, IndexError):
+        print(f"Failed to parse LLM response for {custom_id}")
+        return 'skipped'
+
+    cache = get_llm_cache()
+    if cache:
+        cache.record_result(record)
+
+    matched_ids = llm_result.get('matched_source_ids', [])
+    if not matched_ids:
+        return 'skipped'  # No matches for this conversation — skip
+
+    # Fetch conv from MongoDB
+    conv = db['conversations-v2'].find_one({'_id': conv_oid})
+    if not conv:
+        print(f"Conversation not found: {conv_id_str}")
+        return 'skipped'
+
+    # Fetch matched props (up to 2)
+    matched_source_ids = matched_ids[:2]
+    matched_props = [
+        db['props'].find_one({'source_id': sid})
+        for sid in matched_source_ids
+    ]
+    matched_props = [p for p in matched_props if p]  # Filter out None
+
+    push_items = []
+    now_ts = int(time.time())
+    expired_at = now_ts + (2 * 24 * 60 * 60)
+    for prop in matched_props[:1]:  # Only take the first matched property
+        property_id = prop.get('id') or prop.get('source_id') or str(prop.get('_id') or '')
+        if not property_id:
+            continue
+        push_items.append({
+            'property_id': property_id,
+            'status': 'pending',
+            'createdAt': now_ts,
+            'expired_at': expired_at,
+        })
+
+    if not push_items:
+        print(f"No valid matched properties for conv {conv_id_str}")
+        return 'skipped'
+
+    update_result = db['conversations-v2'].update_one(
+        {'_id': conv_oid},
+        {
+            '$push': {'push_properties': {'$each': push_items}},
+        },
+    )
 
-    mongo_client = MongoClient(MONGODB_CONNECTION_STRING)
-    db = mongo_client['prop_main']
+    if update_result.modified_count > 0:
+        print(f"Updated conversation {conv_id_str}: appended {len(push_items)} push_properties item(s)")
+        return 'sent'
+    print(f"Failed to update conversation {conv_id_str}: no document modified")
+    return 'failed'
+
+
+def append_matches(db, raw_lines):
+    counts = {'sent': 0, 'skipped': 0, 'failed': 0}
+    for raw_line in raw_lines:
+        try:
+            record = json.loads(raw_line)
+        except json.JSONDecodeError:
+            continue
+        outcome = append_match(db, record)
+        if outcome:
+            counts[outcome] += 1
+    return counts['sent'], counts['skipped'], counts['failed']
+
+
+def build_batch_rows(db, batch_code):
+    # Runs once per day. The day is recorded in crawl_states as matched only once its
+    # batch is ingested (or nothing needed a batch), so a failed batch is built again.
+    # Cached answers are appended to their conversations here instead of going into the
+    # batch; the ones already appended for the day are not appended again on a rebuild.
+    yesterday_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    state = CrawlState.get(db, PROP_MATCH_STATE)
+    if state.data.get('matched_date') == yesterday_date:
+        return []
 
     props = get_yesterday_props(db)
     if not props:
         print("No new indexed properties found for yesterday.")
-        mongo_client.close()
-        return
+        state.update({ 'matched_date': yesterday_date, 'total_new_props': 0 })
+        return []
 
     print(f"Found {len(props)} new properties from yesterday.")
     sorted_listings = sorted(props, key=lambda x: x.get('v1_summary_data', {}).get('confidence_score', 0), reverse=True)
-    
-    batch_code = gen_batch_code()
-    batch_file_path = os.path.join(folder, 'batch_files', f"batch-{batch_code}.jsonl")
-    meta_file_path = os.path.join(folder, 'batch_files', f"batch-{batch_code}-meta.json")
-
-    processed_count = 0
-    with open(batch_file_path, 'w', encoding='utf-8') as batch_file:
-        for conv in active_conversation(db):
-            if is_push_true_for_last_10_messages(conv):
-                print(f"Conversation {conv['_id']} has push=True for last 10 messages, skipping.")
-                continue
-            filtered_listings = prematch_by_search_criteria(conv, sorted_listings)
-            if not filtered_listings:
-                print(f"No listings match search criteria for conversation {conv['_id']}, skipping.")
-                continue
-            print(f"Creating match prompt for conversation {conv['_id']} with {len(filtered_listings)} candidate listings.: {[p['source_id'] for p in filtered_listings[:6]]}")
-            messages = create_match_prompt(conv, [sanitize_prop(p) for p in filtered_listings[:6]])
-            row = {
-                'custom_id': f"match-{conv['_id']}",
-                'method': 'POST',
-                'url': '/chat/completions',
-                'body': {
-                    'model': 'gpt-4.1-nano',
-                    'messages': messages,
-                    'max_tokens': 500,
-                    'response_format': {'type': 'json_object'},
-                },
-            }
-            batch_file.write(f"{json.dumps(row, ensure_ascii=False)}\n")
-            processed_count += 1
-
-    if processed_count == 0:
-        print("No subscribers with phone numbers found.")
-        os.remove(batch_file_path)
-        mongo_client.close()
-        return
-
-    # Save metadata so later scripts know total new prop count and date
-    yesterday_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-    with open(meta_file_path, 'w', encoding='utf-8') as meta_file:
-        meta_file.write(json.dumps({
-            'date': yesterday_date,
-            'total_new_props': len(props),
-        }, ensure_ascii=False))
-
-    print(f"Batch file created: {batch_file_path} ({processed_count} user requests)")
-    mongo_client.close()
-
 
-if __name__ == '__main__':
-    main()
\ No newline at end of file
+    appended_ids = set(state.data.get('cached_custom_ids') or []) if state.data.get('pending_date') == yesterday_date else set()
+    rows = []
+    cached_lines = []
+    cache = get_llm_cache()
+    for conv in active_conversation(db):
+        if is_push_true_for_last_10_messages(conv):
+            print(f"Conversation {conv['_id']} has push=True for last 10 messages, skipping.")
+            continue
+        custom_id = f"match-{conv['_id']}"
+        if custom_id in appended_ids:
+            continue
+        filtered_listings = prematch_by_search_criteria(conv, sorted_listings)
+        if not filtered_listings:
+            print(f"No listings match search criteria for conversation {conv['_id']}, skipping.")
+            continue
+        listings = filtered_listings[:max_listings_per_prompt]
+        print(f"Creating match prompt for conversation {conv['_id']} with {len(filtered_listings)} candidate listings.: {[p['source_id'] for p in listings]}")
+        body = {
+            'model': 'gpt-4.1-nano',
+            'messages': create_match_prompt(conv, [sanitize_prop(p) for p in listings]),
+            'max_tokens': 500,
+            'response_format': {'type': 'json_object'},
+        }
+        cached = cache.lookup(body) if cache else None
+        if cached is not None:
+            cached_lines.append(json.dumps(cached_result_line(custom_id, cached), ensure_ascii=False))
+            appended_ids.add(custom_id)
+            continue
+        if cache:
+            cache.track(custom_id, body)
+        rows.append({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': '/chat/completions',
+            'body': body,
+        })
+
+    state.update({
+        'pending_date': yesterday_date,
+        'cached_custom_ids': sorted(appended_ids),
+        'total_new_props': len(props),
+    })
+    if cached_lines:
+        sent, skipped, failed = append_matches(db, cached_lines)
+        print(f"Answered {len(cached_lines)} conversations from the LLM cache: sent={sent}, skipped={skipped}, failed={failed}")
+    if not rows:
+        state.update({ 'matched_date': yesterday_date })
+    print(f"Prepared {len(rows)} match requests for {yesterday_date}.")
+    return rows
+
+
+def mark_matched(db):
+    # The batch for the pending day is in, so the day is not matched again.
+    state = CrawlState.get(db, PROP_MATCH_STATE)
+    if state.data.get('pending_date'):
+        state.update({ 'matched_date': state.data['pending_date'] })
+
+
+class PropMatchStage:
+    name = 'prop_match'
+    endpoint = '/chat/completions'
+    max_open = PROP_MATCH_MAX_OPEN_BATCHES
+
+    def build_requests(self, db, batch_code):
+        return build_batch_rows(db, batch_code)
+
+    def handle_results(self, db, lines):
+        # Only called for a completed batch, once per output/error file.
+        sent, skipped, failed = append_matches(db, lines)
+        mark_matched(db)
+        print(f"Ingested results: sent={sent}, skipped={skipped}, failed={failed}")
+        return sent + skipped + failed
+
+    def release(self, db, batch_code):
+        # Conversations are not claimed by a batch, so there is nothing to hand back.
+        pass
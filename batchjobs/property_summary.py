@@ -0,0 +1,310 @@
+import json
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from utils.llm_cache import get_llm_cache
+
+load_dotenv()
+
+PROPERTY_SUMMARY_BATCH_SIZE = int(os.getenv("PROPERTY_SUMMARY_BATCH_SIZE", "200"))
+PROPERTY_SUMMARY_MAX_OPEN_BATCHES = int(os.getenv("PROPERTY_SUMMARY_MAX_OPEN_BATCHES", "4"))
+max_photos_per_property = 2
+
+PENDING_FILTER = {
+    "v1_extracted_data": {"$exists": True},
+    "status": {"$in": ["photo_analysed", "summary_failed"]},
+    "summary_batch_code": {"$exists": False},
+}
+
+
+def create_system_prompt():
+    return """
+You are a senior Hong Kong property analyst.
+
+Produce one concise property summary in English only, based only on structured listing data and photo observations.
+Do not translate.
+
+Rules:
+- Use only evidence in the input. Do not invent facts.
+- If information is missing, use null or an empty array.
+- Keep the writing concise and practical for home seekers.
+- Mention both strengths and potential concerns.
+- Use photo evidence in the narrative.
+- Output only valid JSON.
+
+Return JSON with this schema:
+{
+  "headline_en": "string",
+	"executive_summary_en": "string",
+  "key_highlights": ["string", "..."],
+  "possible_concerns": ["string", "..."],
+  "price_analysis": {
+	  "value_comment": "string|null"
+  },
+  "layout_and_space": {
+	  "space_comment": "string|null"
+  },
+  "location_and_transport": {
+	  "location_comment": "string|null"
+  },
+  "photo_insights": {
+    "overall_condition": "string",
+    "cleanliness_comment": "string|null",
+    "brightness_comment": "string|null",
+  },
+  "recommended_for": ["string", "..."],
+  "confidence_score": number (0-100)
+}
+""".strip()
+
+
+def sanitize_prop_data(prop):
+    extracted = prop.get("v1_extracted_data", {})
+    return {
+        "source_id": prop.get("source_id"),
+        "source_channel": prop.get("source_channel"),
+        "source_url": prop.get("source_url"),
+        "title": extracted.get("title"),
+        "description": extracted.get("description"),
+        "estate_or_building_name": extracted.get("estate_or_building_name"),
+        "district": extracted.get("district"),
+        "floor": extracted.get("floor"),
+        "features": extracted.get("features", []),
+        "rent_price": extracted.get("rent_price"),
+        "sell_price": extracted.get("sell_price"),
+        "net_size_sqft": extracted.get("net_size_sqft"),
+        "gross_size_sqft": extracted.get("gross_size_sqft"),
+        "number_of_bedrooms": extracted.get("number_of_bedrooms"),
+        "number_of_bathrooms": extracted.get("number_of_bathrooms"),
+        "building_age": extracted.get("building_age"),
+        "nearby_places": extracted.get("nearby_places", []),
+        "transportation_options": extracted.get("transportation_options", []),
+        "additional_notes": extracted.get("additional_notes"),
+    }
+
+
+def sanitize_photo_data(photo):
+    return {
+        "photo_id": photo.get("photo_id"),
+        "room_type": photo.get("room_type"),
+        "image_description": photo.get("image_description"),
+        "detected_objects": photo.get("detected_objects", []),
+        "quality_score": photo.get("quality_score"),
+        "is_indoor": photo.get("is_indoor"),
+    }
+
+
+def compact_photo_payload(photo):
+    return {
+        "room": photo.get("room_type"),
+        "desc": photo.get("image_description"),
+        "q": photo.get("quality_score"),
+        "indoor": photo.get("is_indoor"),
+    }
+
+
+def create_summary_prompt(prop_payload, photo_payloads):
+    user_content = {
+        "property_data": prop_payload,
+        "photo_analyses": photo_payloads,
+    }
+    return [
+        {"role": "system", "content": create_system_prompt()},
+        {
+            "role": "user",
+            "content": f"Generate one complete property summary JSON for this listing data:\n{json.dumps(user_content, ensure_ascii=False)}",
+        },
+    ]
+
+
+def normalize_summary(summary_json):
+    if "headline" not in summary_json and summary_json.get("headline_en"):
+        summary_json["headline"] = summary_json["headline_en"]
+    if "executive_summary" not in summary_json and summary_json.get("executive_summary_en"):
+        summary_json["executive_summary"] = summary_json["executive_summary_en"]
+    return summary_json
+
+
+def cached_summary(cache, body):
+    """Summary a previous batch returned for the same prompt, normalized like a batch result, or None."""
+    if not cache:
+        return None, None
+    cached = cache.lookup(body)
+    if not cached:
+        return None, None
+    try:
+        summary_json = json.loads(cached["choices"][0]["message"]["content"])
+    except Exception:
+        return None, None
+    if not isinstance(summary_json, dict):
+        return None, None
+    return normalize_summary(summary_json), cached.get("created")
+
+
+def parse_source_id(custom_id):
+    if not custom_id:
+        return None
+    if custom_id.startswith("summary-"):
+        return custom_id.replace("summary-", "", 1)
+    return None
+
+
+def build_batch_rows(db, batch_code, limit=PROPERTY_SUMMARY_BATCH_SIZE):
+    # Claims props by tagging them with the batch code; cached answers are written
+    # straight away and tagged too, so the pending filter skips them either way.
+    prop_collection = db["props"]
+    photo_collection = db["prop_photos"]
+    cache = get_llm_cache()
+    rows = []
+    skipped_count = 0
+    cached_count = 0
+    for prop in prop_collection.find(PENDING_FILTER).sort("created_at", -1).limit(limit):
+        source_id = prop.get("source_id")
+
+        photo_filter = {
+            "prop_source_id": source_id,
+            "status": "photo_analysed",
+            "is_photo_of_property": True,
+            "is_violating_policy": False,
+            "is_human_in_photo": False,
+        }
+        photo_docs = list(
+            photo_collection.find(photo_filter)
+            .sort("quality_score", -1)
+            .limit(max_photos_per_property)
+        )
+
+        if not photo_docs:
+            skipped_count += 1
+            print(f"Skip {source_id}: no eligible analyzed photos.")
+            continue
+
+        prop_payload = sanitize_prop_data(prop)
+        photo_payloads = [compact_photo_payload(sanitize_photo_data(p)) for p in photo_docs]
+        body = {
+            "model": "gpt-4o-mini-batch",
+            "messages": create_summary_prompt(prop_payload, photo_payloads),
+            "temperature": 0.3,
+            "max_tokens": 1200,
+            "response_format": {"type": "json_object"},
+        }
+
+        summary_json, generated_at = cached_summary(cache, body)
+        if summary_json is not None:
+            prop_collection.update_one(
+                {"source_id": source_id},
+                {
+                    "$set": {
+                        "v1_summary_data": summary_json,
+                        "summary_status": "summary_ready",
+                        "summary_generated_at": generated_at,
+                        "summary_batch_code": batch_code,
+                    }
+                },
+            )
+            cached_count += 1
+            print(f"Updated summary for {source_id} from cache.")
+            continue
+
+        row = {
+            "custom_id": f"summary-{source_id}",
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": body,
+        }
+        if cache:
+            cache.track(row["custom_id"], body)
+        rows.append(row)
+
+        prop_collection.update_one(
+            {"source_id": source_id},
+            {
+                "$set": {
+                    "summary_batch_code": batch_code,
+                    "summary_status": "batch_created",
+                    "summary_batch_created_at": datetime.now().timestamp(),
+                }
+            },
+        )
+        print(f"Prepared summary task for {source_id} with {len(photo_payloads)} photos.")
+
+    if cached_count > 0:
+        print(f"Answered {cached_count} summaries from the LLM cache.")
+    if skipped_count > 0:
+        print(f"Skipped {skipped_count} properties without eligible photos.")
+    return rows
+
+
+def ingest_results(prop_collection, lines):
+    """Applies summary output and error lines; returns (success, failed) counts."""
+    cache = get_llm_cache()
+    success = 0
+    failed = 0
+    for raw_line in lines:
+        if not raw_line.strip():
+            continue
+        source_id = None
+        try:
+            row = json.loads(raw_line)
+            source_id = parse_source_id(row.get("custom_id"))
+            if not source_id:
+                raise Exception("Invalid custom_id, cannot parse source_id")
+
+            if row.get("error"):
+                raise Exception(f"Batch row error: {row['error']}")
+
+            choices = (row.get("response") or {}).get("body", {}).get("choices", [])
+            if not choices:
+                raise Exception("No choices in response")
+
+            content = choices[0].get("message", {}).get("content", "{}")
+            summary_json = normalize_summary(json.loads(content))
+
+            prop_collection.update_one(
+                {"source_id": source_id},
+                {
+                    "$set": {
+                        "v1_summary_data": summary_json,
+                        "summary_status": "summary_ready",
+                        "summary_generated_at": row.get("response", {}).get("body", {}).get("created"),
+                    }
+                },
+            )
+            if cache:
+                cache.record_result(row)
+            print(f"Updated summary for {source_id}")
+            success += 1
+        except Exception as e:
+            failed += 1
+            if source_id:
+                prop_collection.update_one(
+                    {"source_id": source_id},
+                    {
+                        "$set": {
+                            "summary_status": "summary_failed",
+                            "summary_error": str(e),
+                        }
+                    },
+                )
+            print(f"Error processing summary row for {source_id}: {e}")
+    print(f"Ingested results: {success} summaries, {failed} failed")
+    return success, failed
+
+
+class PropertySummaryStage:
+    name = 'property_summary'
+    endpoint = '/chat/completions'
+    max_open = PROPERTY_SUMMARY_MAX_OPEN_BATCHES
+
+    def build_requests(self, db, batch_code):
+        return build_batch_rows(db, batch_code)
+
+    def handle_results(self, db, lines):
+        return sum(ingest_results(db["props"], lines))
+
+    def release(self, db, batch_code):
+        # Props the batch returned nothing for go back to the pending pool.
+        db["props"].update_many(
+            {"summary_batch_code": batch_code, "summary_status": "batch_created"},
+            {"$unset": {"summary_batch_code": "", "summary_status": "", "summary_batch_created_at": ""}},
+        )
@@ -0,0 +1,98 @@
+import argparse
+import glob
+import os
+import sqlite3
+import time
+import zlib
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+from reviewers.monitor import extract_monitor_snapshot_from_tree
+from utils.http_cache import HTTP_CACHE_PATH
+from utils.lxml_parser import parse_html, extract_28hse_detail
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+
+dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_FOLDER = os.path.join(dir, ARTIFACTS_FOLDER, 'fixtures', 'html')
+
+HOST_CHANNELS = {
+    '28hse.com': '28hse',
+    'midland.com.hk': 'midland',
+    'house730.com': 'house730',
+}
+
+
+def load_fixtures(folder):
+    # Fixture pages are saved as <source_channel>-<anything>.html
+    fixtures = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(folder, '*.html'))):
+        channel = os.path.basename(path).split('-', 1)[0]
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures[channel].append(f.read())
+    return fixtures
+
+
+def export_from_http_cache(folder, limit_per_channel):
+    os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(HTTP_CACHE_PATH)
+    counts = defaultdict(int)
+    for url, body in conn.execute("SELECT url, body FROM http_cache ORDER BY fetched_at DESC"):
+        host = urlparse(url).netloc.lower()
+        host = host[4:] if host.startswith('www.') else host
+        channel = HOST_CHANNELS.get(host)
+        if not channel or counts[channel] >= limit_per_channel:
+            continue
+        counts[channel] += 1
+        with open(os.path.join(folder, f"{channel}-{counts[channel]:04d}.html"), 'w', encoding='utf-8') as f:
+            f.write(zlib.decompress(body).decode('utf-8'))
+    conn.close()
+    print(f"Exported fixtures: {dict(counts)}")
+
+
+def time_per_page(func, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    return (time.perf_counter() - started) * 1000 / (len(pages) * repeat)
+
+
+def single_pass(channel, html):
+    tree = parse_html(html)
+    if channel == '28hse':
+        extract_28hse_detail(tree)
+    extract_monitor_snapshot_from_tree(channel, tree)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page CPU cost of detail page parsing.")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_FOLDER)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--export-from-cache', type=int, metavar='N',
+                        help="write N cached pages per source into the fixtures folder first")
+    args = parser.parse_args()
+
+    if args.export_from_cache:
+        export_from_http_cache(args.fixtures, args.export_from_cache)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixture pages found in {args.fixtures}")
+        return
+
+    print(f"{'source':<10} {'pages':>5} {'bs4 parse':>12} {'lxml parse':>12} {'meta+snapshot':>15}")
+    for channel, pages in sorted(fixtures.items()):
+        bs4_ms = time_per_page(lambda html: BeautifulSoup(html, 'lxml'), pages, args.repeat)
+        lxml_ms = time_per_page(parse_html, pages, args.repeat)
+        total_ms = time_per_page(lambda html: single_pass(channel, html), pages, args.repeat)
+        print(f"{channel:<10} {len(pages):>5} {bs4_ms:>10.2f}ms {lxml_ms:>10.2f}ms {total_ms:>13.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
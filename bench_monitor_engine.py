@@ -0,0 +1,80 @@
+import argparse
+import random
+import time
+
+from reviewers.monitor import MonitorEngine, build_monitor_fingerprint
+
+CHANNELS = ['28hse', 'midland', 'house730']
+
+
+def synthetic_pairs(count, change_ratio, seed):
+    # Props carry a monitor from a previous check; a share of the new snapshots differ in price.
+    rng = random.Random(seed)
+    now = time.time()
+    pairs = []
+    for index in range(count):
+        channel = CHANNELS[index % len(CHANNELS)]
+        source_id = f"{channel}-{100000 + index}"
+        price = rng.randint(8, 80) * 1000
+        previous = {
+            'price_raw': f"HK${price:,}",
+            'price_norm': str(price),
+            'posted_date_raw': '2025-01-01',
+            'posted_date_norm': '2025-01-01',
+            'updated_date_raw': '2025-01-02',
+            'updated_date_norm': '2025-01-02',
+            'status_raw': 'active',
+            'title_raw': f"Listing {index}",
+            'title_norm': f"Listing {index}",
+            'confidence': 'high' if channel == '28hse' else 'medium',
+        }
+        previous['fingerprint'] = build_monitor_fingerprint(source_id, channel, previous)
+        previous['first_checked_at'] = now - rng.randint(1, 60) * 86400
+        prop = {
+            'source_id': source_id,
+            'source_channel': channel,
+            'created_at': previous['first_checked_at'],
+            'source_monitor': previous,
+        }
+
+        snapshot = {key: previous[key] for key in previous if key.endswith(('_raw', '_norm')) or key == 'confidence'}
+        if rng.random() < change_ratio:
+            new_price = price + 1000
+            snapshot['price_raw'] = f"HK${new_price:,}"
+            snapshot['price_norm'] = str(new_price)
+        pairs.append((prop, snapshot))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-prop CPU cost of MonitorEngine on synthetic snapshots.")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--change-ratio', type=float, default=0.05)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    pairs = synthetic_pairs(args.count, args.change_ratio, args.seed)
+    engine = MonitorEngine(db=None, batch_size=args.batch_size)
+    now = time.time()
+
+    # compute() is everything except the bulk_write round trip.
+    started = time.perf_counter()
+    op_count = 0
+    totals = {}
+    for start in range(0, len(pairs), args.batch_size):
+        _, ops, _, stats = engine.compute(pairs[start:start + args.batch_size], now)
+        op_count += len(ops)
+        for channel, channel_stats in stats.items():
+            total = totals.setdefault(channel, {'reviewed': 0, 'changed': 0, 'pending': 0})
+            for key in total:
+                total[key] += channel_stats[key]
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.count} snapshots, {op_count} ops in {elapsed:.2f}s ({elapsed * 1e6 / args.count:.1f}us per prop)")
+    for channel, total in sorted(totals.items()):
+        print(f"{channel:<10} {total['reviewed']:>7} checked {total['changed']:>6} changed {total['pending']:>6} pending")
+
+
+if __name__ == '__main__':
+    main()
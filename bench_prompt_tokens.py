@@ -0,0 +1,77 @@
+import argparse
+import re
+import statistics
+
+from bs4 import BeautifulSoup
+
+from batchjobs.extract_data import EXTRACT_DATA_BATCH_SIZE
+from bench_html_parse import DEFAULT_FIXTURES_FOLDER, export_from_http_cache, load_fixtures
+from utils.llm_html import EXTRACT_HTML_MAX_TOKENS, compact_html_for_llm, count_tokens, tiktoken
+
+LEGACY_MAX_CHARS = 12000
+# Present in the output means the rent/price survived trimming.
+PRICE_RE = re.compile(r'\$\s*[\d,]{3,}|[\d,.]+\s*萬')
+
+
+def legacy_trim_html(body, max_chars=LEGACY_MAX_CHARS):
+    # The character-truncating trim the extraction prompt used before compact_html_for_llm.
+    soup = BeautifulSoup(body, "lxml")
+    for tag_name in ["script", "style", "noscript", "svg", "iframe", "aside", "footer", "header", "nav", "form"]:
+        for tag in soup.find_all(tag_name):
+            tag.decompose()
+    for selector in ["main", "article", '[role="main"]', '#pc-services-detail', '.content_body', 'body']:
+        node = soup.select_one(selector)
+        if node:
+            return str(node)[:max_chars]
+    return str(soup)[:max_chars]
+
+
+def summarize(label, token_counts, price_hits):
+    ordered = sorted(token_counts)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"  {label:<8} mean {statistics.mean(ordered):>7.0f}  p50 {statistics.median(ordered):>7.0f}"
+        f"  p95 {p95:>7}  max {ordered[-1]:>7}  price kept {price_hits}/{len(ordered)}"
+    )
+    return statistics.mean(ordered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt input tokens per listing: legacy HTML trim vs compact text.")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_FOLDER)
+    parser.add_argument('--export-from-cache', type=int, default=0, metavar='N',
+                        help="first export up to N pages per channel from the HTTP cache into --fixtures")
+    parser.add_argument('--max-tokens', type=int, default=EXTRACT_HTML_MAX_TOKENS)
+    args = parser.parse_args()
+
+    if args.export_from_cache:
+        export_from_http_cache(args.fixtures, args.export_from_cache)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures}; run with --export-from-cache N first.")
+        return
+
+    print(f"Token counts via {'tiktoken' if tiktoken else 'estimate (tiktoken not installed)'}")
+    for channel, pages in sorted(fixtures.items()):
+        legacy_counts, compact_counts = [], []
+        legacy_hits, compact_hits = 0, 0
+        for page in pages:
+            legacy = legacy_trim_html(page)
+            compact = compact_html_for_llm(page, channel, args.max_tokens)
+            legacy_counts.append(count_tokens(legacy))
+            compact_counts.append(count_tokens(compact))
+            legacy_hits += bool(PRICE_RE.search(BeautifulSoup(legacy, "lxml").get_text(' ')))
+            compact_hits += bool(PRICE_RE.search(compact))
+
+        print(f"{channel} ({len(pages)} pages)")
+        legacy_mean = summarize('legacy', legacy_counts, legacy_hits)
+        compact_mean = summarize('compact', compact_counts, compact_hits)
+        print(
+            f"  per {EXTRACT_DATA_BATCH_SIZE}-listing batch: {legacy_mean * EXTRACT_DATA_BATCH_SIZE:,.0f} -> "
+            f"{compact_mean * EXTRACT_DATA_BATCH_SIZE:,.0f} input tokens "
+            f"({1 - compact_mean / max(1, legacy_mean):.0%} fewer)"
+        )
+
+
+if __name__ == '__main__':
+    main()
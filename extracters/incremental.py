@@ -0,0 +1,83 @@
+import os
+import re
+from datetime import datetime
+
+from models.crawl_state import CrawlState
+
+FULL_SWEEP_INTERVAL_HOURS = float(os.getenv("CRAWL_FULL_SWEEP_INTERVAL_HOURS", "24"))
+INCREMENTAL_STOP_AFTER_PAGES = int(os.getenv("CRAWL_INCREMENTAL_STOP_AFTER_PAGES", "3"))
+
+
+def _numeric_id(source_id):
+    match = re.search(r'-(\d+)$', source_id or '')
+    return int(match.group(1)) if match else None
+
+
+class IncrementalCrawl:
+    """Decides when a newest-first listing crawl can stop paginating.
+
+    `<PREFIX>_CRAWL_MODE` is `full`, `incremental` or `auto` (default): auto runs a
+    full sweep once the last one is older than CRAWL_FULL_SWEEP_INTERVAL_HOURS and
+    an incremental crawl otherwise. An incremental crawl stops after
+    CRAWL_INCREMENTAL_STOP_AFTER_PAGES consecutive pages whose listings are all at or
+    below the source's high-water id and fresh in Mongo.
+
+    A full sweep records the last finished listing page, so a crashed sweep resumes
+    from there on the next run instead of starting again at page 1.
+    """
+
+    def __init__(self, db, source, env_prefix):
+        self.source = source
+        self.state = CrawlState.get(db, source)
+        self.high_water_id = self.state.data.get('high_water_id')
+        self.max_seen_id = self.high_water_id
+        self.known_pages = 0
+
+        mode = os.getenv(f"{env_prefix}_CRAWL_MODE", "auto").strip().lower()
+        if mode == "auto":
+            last_full_sweep_at = self.state.data.get('last_full_sweep_at') or 0
+            due = datetime.now().timestamp() - last_full_sweep_at >= FULL_SWEEP_INTERVAL_HOURS * 3600
+            mode = "full" if due else "incremental"
+        # An interrupted full sweep takes precedence over the configured mode.
+        self.page_cursor = self.state.data.get('page_cursor')
+        if self.page_cursor:
+            mode = "full"
+        self.mode = mode
+        # Without a high-water mark every page would look new, so the first run is a full sweep.
+        self.incremental = mode == "incremental" and self.high_water_id is not None
+        print(f"[{source}] crawl mode: {'incremental' if self.incremental else 'full'}")
+        if self.page_cursor:
+            print(f"[{source}] resuming full sweep after page {self.page_cursor}")
+
+    def start_page(self):
+        return self.page_cursor + 1 if self.page_cursor else 1
+
+    def page_finished(self, page_number):
+        if not self.incremental:
+            self.page_cursor = page_number
+            self.state.update({'page_cursor': page_number})
+
+    def observe_page(self, source_ids, stale_count):
+        # Returns True once enough consecutive pages held nothing new.
+        page_known = stale_count == 0
+        for source_id in source_ids:
+            numeric_id = _numeric_id(source_id)
+            if numeric_id is None:
+                continue
+            if self.max_seen_id is None or numeric_id > self.max_seen_id:
+                self.max_seen_id = numeric_id
+            if self.high_water_id is None or numeric_id > self.high_water_id:
+                page_known = False
+
+        self.known_pages = self.known_pages + 1 if page_known else 0
+        return self.incremental and self.known_pages >= INCREMENTAL_STOP_AFTER_PAGES
+
+    def finish(self, completed):
+        data = {}
+        if self.max_seen_id is not None:
+            data['high_water_id'] = self.max_seen_id
+        if completed and not self.incremental:
+            data['last_full_sweep_at'] = datetime.now().timestamp()
+            data['page_cursor'] = None
+        if data:
+            self.state.update(data)
@@ -5,6 +5,7 @@ import uuid
 import time
 import re
 import random
+import functools
 from urllib.parse import urlparse
 import trafilatura
 from trafilatura.utils import trim
@@ -17,10 +18,16 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchWindowException
-from models.prop import Prop
+from models.prop import Prop, PropBulkWriter, content_fingerprint
+from models.crawl_frontier import CrawlFrontier
 # from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from utils.uc_driver import create_uc_driver
+from utils.uc_driver import create_uc_driver, default_chrome_options, BrowserPool
+from utils.http_cache import get_http_cache, HTTP_CACHE_EXTRACT
+from utils.crawl_progress import CrawlProgress
+from extracters.incremental import IncrementalCrawl, INCREMENTAL_STOP_AFTER_PAGES
+from extracters.midland_json import extract_midland_listing, is_complete
+from utils.lxml_parser import parse_html, first, node_html, XP_MIDLAND_MAIN
 
 load_dotenv()
 
@@ -41,6 +48,9 @@ HTTP_USER_AGENT = (
 )
 HTTP_TIMEOUT_SECONDS = 20
 HTTP_RETRY_ATTEMPTS = 3
+# Take listing fields from the page's JSON state and skip the LLM stage when they are complete.
+STRUCTURED_EXTRACTION = os.getenv("MIDLAND_STRUCTURED_EXTRACTION", "1").strip().lower() not in {"0", "false", "no"}
+STRUCTURED_FIELDS = ("v1_extracted_data", "extraction_method", "status")
 
 
 def _is_valid_midland_property_link(link):
@@ -94,11 +104,18 @@ def _get_source_fields(link):
     }
 
 
-def _fetch_html_with_retries(client, url, retries=HTTP_RETRY_ATTEMPTS):
+def _fetch_html_with_retries(client, url, retries=HTTP_RETRY_ATTEMPTS, cache=None, conditional=False):
+    # With a cache, validators are held until the caller commits them, and a conditional
+    # request returns None when the server answers 304 Not Modified.
     for attempt in range(1, retries + 1):
         try:
-            response = client.get(url)
+            headers = cache.conditional_headers(url) if cache and conditional else {}
+            response = client.get(url, headers=headers)
+            if cache and conditional and response.status_code == 304:
+                return None
             response.raise_for_status()
+            if cache:
+                cache.defer_store(url, response)
             return response.text
         except Exception as e:
             if attempt == retries:
@@ -137,56 +154,124 @@ def _extract_prop_meta_from_detail_html(link, html):
     if not source_fields:
         return None
 
-    soup = BeautifulSoup(html, 'lxml')
-    content_body_div = soup.select_one('main')
-    if content_body_div is None:
-        raise ValueError(f"Failed to locate detail content for {link}")
-
-    return {
+    tree = parse_html(html)
+    meta = {
         "source_channel": "midland",
         "source_id": source_fields["source_id"],
         "source_url": link,
         "type": "apartment",
         "post_type": "rent",
         "updated_at": datetime.datetime.now().timestamp(),
-        "source_html_content": str(content_body_div),
+    }
+
+    if STRUCTURED_EXTRACTION:
+        listing_id = source_fields["prop_id"].split('-')[-1]
+        extracted_data = extract_midland_listing(tree, listing_id, post_type=meta["post_type"])
+        if is_complete(extracted_data):
+            return {
+                **meta,
+                "v1_extracted_data": extracted_data,
+                "extraction_method": "midland_state",
+                "status": "data_extracted",
+                # No LLM body needed, but the raw page is archived for replay and parser tests.
+                "source_html_content": html,
+            }
+
+    content_body_div = first(XP_MIDLAND_MAIN, tree)
+    if content_body_div is None:
+        raise ValueError(f"Failed to locate detail content for {link}")
+
+    return {
+        **meta,
+        "source_html_content": node_html(content_body_div),
     }
 
 
-def _upsert_prop(db, meta):
-    source_id = meta["source_id"]
-    prop = Prop.get_by_id(db, source_id)
-    if prop:
-        prop.update(meta)
-        print(f"Updated prop {source_id}")
-    else:
-        create_meta = {**meta}
-        create_meta['status'] = "pending_extraction"
-        Prop.create(db, create_meta)
-        print(f"Created prop {source_id}")
+def _upsert_prop(db, meta, writer=None, on_written=None):
+    if writer is None:
+        with PropBulkWriter(db) as writer:
+            return _upsert_prop(db, meta, writer, on_written)
 
+    if 'status' not in meta:
+        writer.upsert(meta, on_insert={ 'status': "pending_extraction" }, on_written=on_written)
+        return
 
-def extract_details_http(db, client, link):
+    # Structured results only apply to new props and ones still waiting for the LLM stage,
+    # so a re-crawl never resets a prop that has moved on (photos, summary, archived).
+    extracted = {field: meta[field] for field in STRUCTURED_FIELDS if field in meta}
+    crawl = {field: value for field, value in meta.items() if field not in extracted}
+    # The archived page is the full document, which varies between fetches; the listing
+    # changed only when the structured fields did.
+    fingerprint = content_fingerprint({ **crawl, **extracted })
+    writer.upsert(crawl, on_insert=extracted, on_written=on_written, fingerprint=fingerprint)
+    writer.update(meta['source_id'], extracted, where={ 'status': "pending_extraction" })
+
+
+def _mark_unchanged(db, source_id, writer=None):
+    # A 304 still counts as a fresh crawl, so the link is not picked again next run.
+    if writer is None:
+        with PropBulkWriter(db) as writer:
+            return _mark_unchanged(db, source_id, writer)
+
+    writer.update(source_id, { 'updated_at': datetime.datetime.now().timestamp() })
+
+
+def _select_links_to_fetch(db, links):
+    source_ids = {}
+    for link in links:
+        source_fields = _get_source_fields(link)
+        if source_fields:
+            source_ids[link] = source_fields["source_id"]
+    # Also returns which of the links already have a prop, so detail fetches know
+    # whether a 304 is safe without another lookup.
+    stale_ids, existing_ids = Prop.split_stale_ids(db, source_ids.values())
+    links_to_fetch = [link for link, source_id in source_ids.items() if source_id in stale_ids]
+    existing_links = {link for link in links_to_fetch if source_ids[link] in existing_ids}
+    return links_to_fetch, existing_links
+
+
+def extract_details_http(db, client, link, check_freshness=True, writer=None, exists=None):
     source_fields = _get_source_fields(link)
     if not source_fields:
         return
 
     source_id = source_fields["source_id"]
-    prop = Prop.get_by_id(db, source_id)
-    now = datetime.datetime.now().timestamp()
-    if prop and 'updated_at' in prop.data:
-        if now - prop.data['updated_at'] < 3 * 24 * 60 * 60:
+    if check_freshness:
+        stale_ids, existing_ids = Prop.split_stale_ids(db, [source_id])
+        if not stale_ids:
             print(f"Skip existing prop {source_id}")
             return
-
-    html = _fetch_html_with_retries(client, link)
-    meta = _extract_prop_meta_from_detail_html(link, html)
+        exists = source_id in existing_ids
+
+    cache = get_http_cache(HTTP_CACHE_EXTRACT)
+    # Only a prop known to be in Mongo can be left alone on a 304; a missing one,
+    # or one whose existence the caller did not pass, needs the page.
+    conditional = bool(exists) and bool(cache and cache.conditional_headers(link))
+    html = _fetch_html_with_retries(client, link, cache=cache, conditional=conditional)
+    if html is None:
+        print(f"Not modified since last fetch {source_id}")
+        _mark_unchanged(db, source_id, writer)
+        return
+    try:
+        meta = _extract_prop_meta_from_detail_html(link, html)
+    except Exception:
+        # Drop the validators so the next crawl re-downloads instead of getting a 304.
+        if cache:
+            cache.discard(link)
+            cache.invalidate(link)
+        raise
     if not meta:
         return
-    _upsert_prop(db, meta)
+    _upsert_prop(db, meta, writer, on_written=functools.partial(cache.commit, link) if cache else None)
 
 
-def extract_rent_http(db):
+def _fetch_detail_http(db, client, writer, link, exists=None):
+    extract_details_http(db, client, link, check_freshness=False, writer=writer, exists=exists)
+    time.sleep(random.uniform(0.8, 1.8))
+
+
+def extract_rent_http(db, progress=None):
+    progress = progress or CrawlProgress("midland")
     headers = {
         "User-Agent": HTTP_USER_AGENT,
         "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
@@ -194,42 +279,75 @@ def extract_rent_http(db):
 
     processed_count = 0
     previous_page_links = None
-    with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as client:
-        page_number = 1
-        max_pages = int(os.getenv("MIDLAND_HTTP_MAX_PAGES", "1000"))
-
-        while page_number <= max_pages:
-            page_url = settings["RENT_URL"] if page_number == 1 else f"{settings['RENT_URL']}/page-{page_number}"
-            page_html = _fetch_html_with_retries(client, page_url)
-            links = _extract_midland_links_from_listing_html(page_html)
-
-            if not links:
-                if page_number == 1:
-                    raise RuntimeError("No listing links found on first rent page")
-                print(f"No links found on page {page_number}, stopping rent HTTP extraction")
-                break
-
-            links_signature = tuple(links)
-            if previous_page_links == links_signature:
-                print(f"Links repeated on page {page_number}, stopping rent HTTP extraction")
-                break
-            previous_page_links = links_signature
-
-            print(f"Rent page {page_number}: found {len(links)} links")
-
-            for link in links:
-                try:
-                    extract_details_http(db, client, link)
-                    processed_count += 1
-                    time.sleep(random.uniform(0.8, 1.8))
-                except Exception as e:
-                    print(f"Error extracting details for {link}: {e}")
-
-            page_number += 1
-            time.sleep(random.uniform(1.2, 2.2))
+    crawl = IncrementalCrawl(db, "midland", "MIDLAND")
+    frontier = CrawlFrontier(db, "midland")
+    completed = False
+    try:
+        with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as client, \
+                PropBulkWriter(db) as writer:
+            fetch_detail = functools.partial(_fetch_detail_http, db, client, writer)
+            page_number = crawl.start_page()
+            max_pages = int(os.getenv("MIDLAND_HTTP_MAX_PAGES", "1000"))
+
+            while page_number <= max_pages and not progress.should_stop():
+                page_url = settings["RENT_URL"] if page_number == 1 else f"{settings['RENT_URL']}/page-{page_number}"
+                page_html = _fetch_html_with_retries(client, page_url)
+                links = _extract_midland_links_from_listing_html(page_html)
+
+                if not links:
+                    if page_number == 1:
+                        raise RuntimeError("No listing links found on first rent page")
+                    print(f"No links found on page {page_number}, stopping rent HTTP extraction")
+                    break
+
+                links_signature = tuple(links)
+                if previous_page_links == links_signature:
+                    print(f"Links repeated on page {page_number}, stopping rent HTTP extraction")
+                    break
+                previous_page_links = links_signature
+
+                links_to_fetch, existing_links = _select_links_to_fetch(db, links)
+                print(f"Rent page {page_number}: found {len(links)} links, {len(links_to_fetch)} stale or new")
+                progress.page_done(len(links))
+
+                # Queued in the shared frontier first so a crash or another worker can pick them up.
+                frontier.enqueue(links_to_fetch, existing_links)
+                processed_count += frontier.drain(fetch_detail, progress)
+                crawl.page_finished(page_number)
+
+                page_source_ids = [fields["source_id"] for fields in map(_get_source_fields, links) if fields]
+                if crawl.observe_page(page_source_ids, len(links_to_fetch)):
+                    print(f"No new listings on the last {INCREMENTAL_STOP_AFTER_PAGES} pages, stopping incremental crawl")
+                    break
+
+                page_number += 1
+                time.sleep(random.uniform(1.2, 2.2))
+
+            # Pick up retries whose backoff has expired during this run.
+            processed_count += frontier.drain(fetch_detail, progress)
+            completed = not progress.should_stop()
+    finally:
+        crawl.finish(completed)
 
     print(f"HTTP rent extraction processed {processed_count} listing detail URLs")
 
+
+def drain_frontier_http(db, progress=None):
+    # Only works the queued detail URLs, so extra processes can share one crawl.
+    progress = progress or CrawlProgress("midland")
+    headers = {
+        "User-Agent": HTTP_USER_AGENT,
+        "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+    }
+
+    with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as client, \
+            PropBulkWriter(db) as writer:
+        fetch_detail = functools.partial(_fetch_detail_http, db, client, writer)
+        processed_count = CrawlFrontier(db, "midland").drain(fetch_detail, progress)
+
+    print(f"Frontier worker processed {processed_count} listing detail URLs")
+
+
 def extract_details(db, driver, link):
     link_parts = link.split('/')
     if len(link_parts) < 6:
@@ -302,14 +420,10 @@ def extract_details(db, driver, link):
         #"is_markdown": True,
     }
 
-    if prop:
-        prop.update(meta)
-        print(f"Updated prop {source_id}")
-    else:
-        meta['source_html_content'] = content_body_div.get_attribute('outerHTML')
-        meta['status'] = "pending_extraction"
-        prop = Prop.create(db, meta)
-        print(f"Created prop {source_id}")
+    # Same write path as the HTTP crawl, so created/changed events reach the change feed.
+    meta['source_html_content'] = content_body_div.get_attribute('outerHTML')
+    _upsert_prop(db, meta)
+    print(f"{'Updated' if prop else 'Created'} prop {source_id}")
     
     random_number = random.randint(2, 10)
 
@@ -378,30 +492,28 @@ def _open_listing_page(driver, url):
 
     return driver
 
-def extract_rent(db, driver1, driver2):
+
+def _extract_details_with_pool(db, pool, links):
+    def run(driver, link):
+        try:
+            extract_details(db, driver, link)
+        except Exception as e:
+            print(f"Error extracting details for {link}: {e}")
+
+    pool.map(run, links)
+
+def extract_rent(db, driver1, pool, progress=None):
     driver1 = _open_listing_page(driver1, settings["RENT_URL"])
     
     def fetch_link():
-        nonlocal driver2
         # with open(file_path, "a") as of:
         #     writer = csv.writer(of)
         content = driver1.find_element(By.CSS_SELECTOR, '.sc-10pgf2f-3')
         search_results_divs = content.find_elements(By.CSS_SELECTOR, 'a[href*="/property/"]')
         print(f"Found {len(search_results_divs)} properties in rent page.")
-        for div in search_results_divs:
-            link = div.get_attribute('href')
-            # writer.writerow([link])
-            try:
-                extract_details(db, driver2, link)
-            except Exception as e:
-                print(f"Error extracting details for {link}: {e}")
-                if _is_window_closed_error(e):
-                    print("Recreating detail driver due to closed window")
-                    try:
-                        driver2.quit()
-                    except Exception:
-                        pass
-                    driver2 = _create_driver()
+        links = [div.get_attribute('href') for div in search_results_divs]
+        # writer.writerow([link])
+        _extract_details_with_pool(db, pool, links)
     
     def go_next_page():
         # try:
@@ -419,14 +531,14 @@ def extract_rent(db, driver1, driver2):
         #     return False
         return False
     
-    while True:
+    while not (progress and progress.should_stop()):
         fetch_link()
         time.sleep(3)
         has_next = go_next_page()
         if not has_next:
             break
 
-    return driver1, driver2
+    return driver1
 
 # def extract_sell(db, driver1, driver2):
 #     driver1.get(settings["SELL_URL"])
@@ -469,40 +581,39 @@ def extract_rent(db, driver1, driver2):
 #         if not has_next:
 #             break
 
-def extract():
-    client = MongoClient(MONGODB_CONNECTION_STRING)
-    db = client['prop_main']
+def extract(db=None, progress=None):
+    if db is None:
+        client = MongoClient(MONGODB_CONNECTION_STRING)
+        db = client['prop_main']
 
     mode = os.getenv("MIDLAND_EXTRACT_MODE", "http_first").strip().lower()
+    if mode == "frontier":
+        print("Running Midland extraction as a frontier worker")
+        drain_frontier_http(db, progress)
+        return
     if mode in {"http", "http_first"}:
         try:
             print("Running Midland extraction in HTTP mode")
-            extract_rent_http(db)
+            extract_rent_http(db, progress)
             if mode == "http":
                 return
         except Exception as e:
             if mode == "http":
                 raise
             print(f"HTTP mode failed ({e}), falling back to Selenium")
+        # A stop requested during the HTTP crawl also applies to the Selenium pass.
+        if progress and progress.should_stop():
+            return
 
-    options = uc.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = create_uc_driver(options=options, use_subprocess=True)
-
-    options2 = uc.ChromeOptions()
-    options2.add_argument('--no-sandbox')
-    options2.add_argument('--disable-dev-shm-usage')
-    driver2 = create_uc_driver(options=options2, use_subprocess=True)
-
-    driver, driver2 = extract_rent(db, driver, driver2)
-    # extract_sell(db, driver, driver2)
+    driver = create_uc_driver(options=default_chrome_options(), use_subprocess=True)
+    pool = BrowserPool()
 
     try:
-        driver.quit()
-    except Exception:
-        pass
-    try:
-        driver2.quit()
-    except Exception:
-        pass
\ No newline at end of file
+        driver = extract_rent(db, driver, pool, progress)
+        # extract_sell(db, driver, pool)
+    finally:
+        pool.close()
+        try:
+            driver.quit()
+        except Exception:
+            pass
\ No newline at end of file
@@ -0,0 +1,173 @@
+import json
+import re
+
+from utils.lxml_parser import XP_JSON_SCRIPTS
+
+# Midland's pages embed the listing in their JSON state (__NEXT_DATA__ and friends).
+# The payload shape is not documented, so fields are looked up by the key names the
+# state has used and the listing is found by scoring every object in it.
+FIELD_KEYS = {
+    'title': ['title', 'display_name', 'displayName'],
+    'description': ['description', 'remark', 'remarks', 'feature_desc', 'featureDesc'],
+    'estate_or_building_name': ['estate_name', 'estateName', 'building_name', 'buildingName'],
+    'district': ['district_name', 'districtName', 'district', 'region_name', 'regionName'],
+    'floor': ['floor_level', 'floorLevel', 'floor'],
+    'rent_price': ['rent', 'rent_price', 'rentPrice', 'rental'],
+    'sell_price': ['price', 'sell_price', 'sellPrice'],
+    'net_size_sqft': ['net_area', 'netArea', 'saleable_area', 'saleableArea', 'net_size'],
+    'gross_size_sqft': ['area', 'gross_area', 'grossArea', 'gross_size'],
+    'number_of_bedrooms': ['bedroom', 'bedrooms', 'bedroom_count', 'bedroomCount'],
+    'number_of_bathrooms': ['bathroom', 'bathrooms', 'bathroom_count', 'bathroomCount'],
+    'building_age': ['building_age', 'buildingAge'],
+    'posted_date': ['post_date', 'postDate', 'created_date', 'createdDate', 'created_at', 'createdAt'],
+    'post_updated_date': ['update_date', 'updateDate', 'last_update', 'lastUpdate', 'updated_at', 'updatedAt'],
+    'photo_urls': ['photos', 'photo_list', 'photoList', 'images', 'image_list', 'imageList'],
+    'features': ['features', 'facilities', 'tags'],
+}
+NUMBER_FIELDS = {
+    'rent_price', 'sell_price', 'net_size_sqft', 'gross_size_sqft',
+    'number_of_bedrooms', 'number_of_bathrooms', 'building_age',
+}
+LIST_FIELDS = {'photo_urls', 'features'}
+# Fields the LLM schema has that the state never carries.
+EMPTY_FIELDS = {
+    'maid_rooms': None,
+    'storerooms': None,
+    'has_balcony': None,
+    'has_terrace': None,
+    'kitchen_type': None,
+    'is_village_house': None,
+    'allow_pets': None,
+    'is_direct_owner_listing': None,
+    'accept_short_term_rental': None,
+    'with_car_park': None,
+    'nearby_places': [],
+    'transportation_options': [],
+    'additional_notes': '',
+    'information_updated_date': None,
+}
+
+MIN_LISTING_SCORE = 4
+_KNOWN_KEYS = {key for keys in FIELD_KEYS.values() for key in keys}
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def _iter_states(tree):
+    for script in XP_JSON_SCRIPTS(tree):
+        raw = (script.text or '').strip()
+        if not raw:
+            continue
+        try:
+            yield json.loads(raw)
+        except Exception:
+            continue
+
+
+def _iter_objects(value):
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _find_listing(states, listing_id):
+    best = None
+    best_score = 0
+    for state in states:
+        for obj in _iter_objects(state):
+            score = len(_KNOWN_KEYS.intersection(obj))
+            if listing_id and str(obj.get('id', obj.get('_id', ''))).endswith(listing_id):
+                score += 10
+            if score > best_score:
+                best, best_score = obj, score
+    return best if best_score >= MIN_LISTING_SCORE else None
+
+
+def _text(value):
+    # Localised values come as {'zh-hk': ..., 'en': ...} or {'name': ...}.
+    if isinstance(value, dict):
+        for key in ('zh-hk', 'zh_hk', 'tc', 'name', 'value', 'en'):
+            if value.get(key) not in (None, ''):
+                return _text(value[key])
+        return None
+    if isinstance(value, (list, tuple)):
+        return None
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def parse_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = _text(value)
+    if not text:
+        return None
+    match = _NUMBER_RE.search(text.replace(',', ''))
+    if not match:
+        return None
+    number = float(match.group(0))
+    if '萬' in text:
+        number *= 10000
+    return int(number) if number.is_integer() else number
+
+
+def _list(value):
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            item = item.get('url') or item.get('src') or item.get('path') or _text(item)
+        else:
+            item = _text(item)
+        if item and item not in items:
+            items.append(item)
+    return items
+
+
+def _lookup(listing, keys):
+    for key in keys:
+        if listing.get(key) not in (None, '', [], {}):
+            return listing[key]
+    return None
+
+
+def extract_midland_listing(tree, listing_id=None, post_type='rent'):
+    """Maps the listing in the page's JSON state to the v1_extracted_data schema, or None."""
+    listing = _find_listing(_iter_states(tree), listing_id)
+    if listing is None:
+        return None
+
+    data = dict(EMPTY_FIELDS)
+    for field, keys in FIELD_KEYS.items():
+        value = _lookup(listing, keys)
+        if field in NUMBER_FIELDS:
+            data[field] = parse_number(value)
+        elif field in LIST_FIELDS:
+            data[field] = _list(value)
+        else:
+            data[field] = _text(value)
+
+    if post_type == 'rent' and data['rent_price'] is None:
+        # Rent listings often expose the monthly rent as plain `price`.
+        data['rent_price'], data['sell_price'] = data['sell_price'], None
+    return data
+
+
+def is_complete(data):
+    # Enough for matching without the LLM: a price, a size or room count, and a location.
+    if not data:
+        return False
+    has_price = data.get('rent_price') is not None or data.get('sell_price') is not None
+    has_size = data.get('net_size_sqft') is not None or data.get('gross_size_sqft') is not None \
+        or data.get('number_of_bedrooms') is not None
+    has_location = bool(data.get('estate_or_building_name') or data.get('district'))
+    return has_price and has_size and has_location
@@ -7,19 +7,28 @@ import re
 import random
 import json
 import hashlib
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from pymongo import MongoClient
 import undetected_chromedriver as uc
 import httpx
-from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchWindowException
-from models.prop import Prop
+from models.prop import Prop, PropBulkWriter
+from models.crawl_frontier import CrawlFrontier
 # from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from utils.uc_driver import create_uc_driver
+from utils.uc_driver import create_uc_driver, default_chrome_options, BrowserPool
+from utils.http_cache import get_http_cache, HTTP_CACHE_EXTRACT
+from utils.crawl_progress import CrawlProgress
+from extracters.incremental import IncrementalCrawl, INCREMENTAL_STOP_AFTER_PAGES
+from utils.async_http import TokenBucket, RateLimitedAsyncClient, RateLimitedClient, BlockingClient
+from utils.lxml_parser import parse_html, extract_28hse_listing_links, extract_28hse_detail
+from reviewers.monitor import extract_monitor_snapshot_from_tree, build_monitor_fingerprint
 import trafilatura
 from trafilatura.utils import trim
 
@@ -43,6 +52,10 @@ HTTP_USER_AGENT = (
 )
 HTTP_TIMEOUT_SECONDS = 20
 HTTP_RETRY_ATTEMPTS = 3
+HTTP_ASYNC_WORKERS = int(os.getenv("N28HSE_HTTP_WORKERS", "8"))
+# Shared by the sync and async crawls: every listing and detail request takes a token.
+HTTP_RATE_PER_SECOND = float(os.getenv("N28HSE_HTTP_RATE_PER_SECOND", "4"))
+HTTP_ASYNC_PER_HOST_LIMIT = int(os.getenv("N28HSE_HTTP_PER_HOST_LIMIT", "4"))
 
 def _create_driver():
     options = uc.ChromeOptions()
@@ -80,11 +93,18 @@ def _get_source_fields(link):
     }
 
 
-def _fetch_html_with_retries(client, url, retries=HTTP_RETRY_ATTEMPTS):
+def _fetch_html_with_retries(client, url, retries=HTTP_RETRY_ATTEMPTS, cache=None, conditional=False):
+    # With a cache, validators are held until the caller commits them, and a conditional
+    # request returns None when the server answers 304 Not Modified.
     for attempt in range(1, retries + 1):
         try:
-            response = client.get(url)
+            headers = cache.conditional_headers(url) if cache and conditional else {}
+            response = client.get(url, headers=headers)
+            if cache and conditional and response.status_code == 304:
+                return None
             response.raise_for_status()
+            if cache:
+                cache.defer_store(url, response)
             return response.text
         except Exception as e:
             if attempt == retries:
@@ -95,134 +115,44 @@ def _fetch_html_with_retries(client, url, retries=HTTP_RETRY_ATTEMPTS):
 
 
 def _extract_listing_links_from_html(html):
-    soup = BeautifulSoup(html, 'lxml')
+    return extract_28hse_listing_links(parse_html(html))
 
-    links = []
-    seen = set()
 
-    for script in soup.select('script[type="application/ld+json"]'):
-        script_text = script.string or script.get_text() or ""
-        script_text = script_text.strip()
-        if not script_text:
-            continue
-
-        try:
-            payload = json.loads(script_text)
-        except Exception:
-            continue
-
-        payload_items = payload if isinstance(payload, list) else [payload]
-        for item in payload_items:
-            if not isinstance(item, dict):
-                continue
-
-            item_list = item.get('itemListElement')
-            if not isinstance(item_list, list):
-                continue
-
-            for item_entry in item_list:
-                if not isinstance(item_entry, dict):
-                    continue
-                url = item_entry.get('url')
-                if isinstance(url, str) and '/property-' in url and url not in seen:
-                    seen.add(url)
-                    links.append(url)
-
-    if links:
-        return links
-
-    # Fallback to DOM selectors if JSON-LD is unavailable.
-    for anchor in soup.select('a.detail_page[href]'):
-        href = anchor.get('href')
-        if not href:
-            continue
-        if href.startswith('/'):
-            href = f"https://www.28hse.com{href}"
-        if '/property-' in href and href not in seen:
-            seen.add(href)
-            links.append(href)
-
-    return links
-
-
-def _extract_prop_meta_from_detail_html(link, html):
+def _parse_detail_html(link, html):
+    # One lxml parse yields both the prop meta and the monitor snapshot.
     source_fields = _get_source_fields(link)
     if not source_fields:
-        return None
-
-    soup = BeautifulSoup(html, 'lxml')
+        return None, None
 
-    content_body_div = soup.select_one('.content_body .ten')
-    if content_body_div is None:
+    tree = parse_html(html)
+    detail = extract_28hse_detail(tree)
+    if detail is None:
         raise ValueError(f"Failed to locate detail content for {link}")
 
-    breadcrumb_items = soup.select('ol.breadcrumb a span[itemprop="name"]')
-    location_parts = [item.get_text(strip=True) for item in breadcrumb_items[2:]]
-
-    image_links = []
-    for image in soup.select('.slider-block img'):
-        img_src = image.get('src')
-        if img_src and img_src not in image_links:
-            image_links.append(img_src)
-
-    title_node = content_body_div.select_one('.message .header')
-    description_node = content_body_div.select_one('#desc_normal')
-    title = title_node.get_text(strip=True) if title_node else ""
-    description = description_node.get_text("\n", strip=True) if description_node else ""
-
-    labels = [label.get_text(strip=True) for label in content_body_div.select('.labels .label')]
-
-    contacts_data = []
-    for contact in content_body_div.select('.contactsDiv'):
-        header = contact.select_one('.header')
-        name = header.get_text(strip=True) if header else ""
-        license_no = None
-        for span in contact.select('.content span.less_span'):
-            span_text = span.get_text(strip=True)
-            if '牌照號碼' in span_text:
-                license_no = span_text.replace('代理個人牌照號碼:', '').strip()
-        contacts_data.append({
-            "name": name,
-            "license_no": license_no,
-        })
-
-    posted_date = ""
-    updated_date = ""
-    property_dates_div = content_body_div.select_one('.propertyDate')
-    if property_dates_div:
-        property_dates = remove_html_tags(property_dates_div.get_text(" ", strip=True)).split('|')
-        if len(property_dates) > 0:
-            posted_date = property_dates[0].replace('刊登:', '').strip()
-        if len(property_dates) > 1:
-            updated_date = property_dates[1].replace('更新:', '').strip()
-
-    info = {}
-    for pair in content_body_div.select('table.tablePair tr'):
-        name_node = pair.select_one('td.table_left')
-        value_node = pair.select_one('.pairValue')
-        if name_node and value_node:
-            info[remove_html_tags(name_node.get_text(" ", strip=True))] = remove_html_tags(
-                value_node.get_text(" ", strip=True)
-            )
-
-    return {
+    meta = {
         "source_channel": "28hse",
         "source_id": source_fields["source_id"],
         "source_url": link,
         "type": source_fields["prop_type"],
         "post_type": source_fields["prop_post_type"],
-        "location_parts": location_parts,
-        "title": title,
-        "description": description,
-        "labels": labels,
-        "contacts": contacts_data,
-        "source_posted_date": posted_date,
-        "source_updated_date": updated_date,
-        "info": info,
-        "image_links": image_links,
+        "location_parts": detail["location_parts"],
+        "title": detail["title"],
+        "description": detail["description"],
+        "labels": detail["labels"],
+        "contacts": detail["contacts"],
+        "source_posted_date": detail["source_posted_date"],
+        "source_updated_date": detail["source_updated_date"],
+        "info": detail["info"],
+        "image_links": detail["image_links"],
         "updated_at": datetime.datetime.now().timestamp(),
-        "source_html_content": str(content_body_div),
+        "source_html_content": detail["source_html_content"],
     }
+    return meta, extract_monitor_snapshot_from_tree("28hse", tree)
+
+
+def _extract_prop_meta_from_detail_html(link, html):
+    meta, _ = _parse_detail_html(link, html)
+    return meta
 
 
 def _pick_28hse_price_from_info(info):
@@ -277,84 +207,293 @@ def _seed_monitor_from_meta(meta):
     }
 
 
-def _upsert_prop(db, meta):
-    source_id = meta["source_id"]
-    prop = Prop.get_by_id(db, source_id)
-    if prop:
-        update_meta = {**meta}
-        if not prop.data.get('source_monitor'):
-            update_meta['source_monitor'] = _seed_monitor_from_meta(meta)
-        if prop.data.get('reextract_needed') is None:
-            update_meta['reextract_needed'] = False
-        prop.update(update_meta)
-        print(f"Updated prop {source_id}")
+def _seed_monitor_from_snapshot(meta, snapshot):
+    now = datetime.datetime.now().timestamp()
+    return {
+        'price_raw': snapshot.get('price_raw', ''),
+        'price_norm': snapshot.get('price_norm', ''),
+        'posted_date_raw': snapshot.get('posted_date_raw', ''),
+        'posted_date_norm': snapshot.get('posted_date_norm', ''),
+        'updated_date_raw': snapshot.get('updated_date_raw', ''),
+        'updated_date_norm': snapshot.get('updated_date_norm', ''),
+        'status_raw': snapshot.get('status_raw', 'active'),
+        'title_raw': snapshot.get('title_raw', ''),
+        'title_norm': snapshot.get('title_norm', ''),
+        'confidence': snapshot.get('confidence', 'low'),
+        'fingerprint': build_monitor_fingerprint(meta.get('source_id'), '28hse', snapshot),
+        'first_checked_at': now,
+        'last_checked_at': now,
+        'seeded_from': 'extract_28hse',
+    }
+
+
+def _upsert_prop(db, meta, writer=None, snapshot=None, on_written=None):
+    if writer is None:
+        with PropBulkWriter(db) as writer:
+            return _upsert_prop(db, meta, writer, snapshot, on_written)
+
+    if snapshot:
+        source_monitor = _seed_monitor_from_snapshot(meta, snapshot)
     else:
-        create_meta = {**meta}
-        create_meta['status'] = "pending_extraction"
-        create_meta['source_monitor'] = _seed_monitor_from_meta(meta)
-        create_meta['reextract_needed'] = False
-        Prop.create(db, create_meta)
-        print(f"Created prop {source_id}")
+        source_monitor = _seed_monitor_from_meta(meta)
+
+    writer.upsert(
+        meta,
+        on_insert={ 'status': "pending_extraction" },
+        fill_missing={
+            'source_monitor': source_monitor,
+            'reextract_needed': False,
+        },
+        on_written=on_written,
+    )
+
+
+def _mark_unchanged(db, source_id, writer=None):
+    # A 304 still counts as a fresh crawl, so the link is not picked again next run.
+    if writer is None:
+        with PropBulkWriter(db) as writer:
+            return _mark_unchanged(db, source_id, writer)
+
+    writer.update(source_id, { 'updated_at': datetime.datetime.now().timestamp() })
 
 
-def extract_details_http(db, client, link):
+def _select_links_to_fetch(db, links):
+    source_ids = {}
+    for link in links:
+        source_fields = _get_source_fields(link)
+        if source_fields:
+            source_ids[link] = source_fields["source_id"]
+    # Also returns which of the links already have a prop, so detail fetches know
+    # whether a 304 is safe without another lookup.
+    stale_ids, existing_ids = Prop.split_stale_ids(db, source_ids.values())
+    links_to_fetch = [link for link, source_id in source_ids.items() if source_id in stale_ids]
+    existing_links = {link for link in links_to_fetch if source_ids[link] in existing_ids}
+    return links_to_fetch, existing_links
+
+
+def extract_details_http(db, client, link, check_freshness=True, writer=None, exists=None):
     source_fields = _get_source_fields(link)
     if not source_fields:
         return
 
     source_id = source_fields["source_id"]
-    prop = Prop.get_by_id(db, source_id)
-    now = datetime.datetime.now().timestamp()
-    if prop and 'updated_at' in prop.data:
-        if now - prop.data['updated_at'] < 3 * 24 * 60 * 60:
+    if check_freshness:
+        stale_ids, existing_ids = Prop.split_stale_ids(db, [source_id])
+        if not stale_ids:
             print(f"Skip existing prop {source_id}")
             return
-
-    html = _fetch_html_with_retries(client, link)
-    meta = _extract_prop_meta_from_detail_html(link, html)
+        exists = source_id in existing_ids
+
+    cache = get_http_cache(HTTP_CACHE_EXTRACT)
+    # Only a prop known to be in Mongo can be left alone on a 304; a missing one,
+    # or one whose existence the caller did not pass, needs the page.
+    conditional = bool(exists) and bool(cache and cache.conditional_headers(link))
+    html = _fetch_html_with_retries(client, link, cache=cache, conditional=conditional)
+    if html is None:
+        print(f"Not modified since last fetch {source_id}")
+        _mark_unchanged(db, source_id, writer)
+        return
+    try:
+        meta, snapshot = _parse_detail_html(link, html)
+    except Exception:
+        # Drop the validators so the next crawl re-downloads instead of getting a 304.
+        if cache:
+            cache.discard(link)
+            cache.invalidate(link)
+        raise
     if not meta:
         return
-    _upsert_prop(db, meta)
+    _upsert_prop(db, meta, writer, snapshot, on_written=functools.partial(cache.commit, link) if cache else None)
+
+
+def _fetch_detail_http(db, client, writer, link, exists=None):
+    # Pacing comes from the RateLimitedClient the caller passes in.
+    extract_details_http(db, client, link, check_freshness=False, writer=writer, exists=exists)
+
 
+def _rate_limited(client):
+    return RateLimitedClient(client, TokenBucket(HTTP_RATE_PER_SECOND))
 
-def extract_rent_http(db):
+
+def extract_rent_http(db, progress=None):
+    progress = progress or CrawlProgress("28hse")
     headers = {
         "User-Agent": HTTP_USER_AGENT,
         "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
     }
 
     processed_count = 0
-    with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as client:
-        page_number = 1
-        max_pages = int(os.getenv("N28HSE_HTTP_MAX_PAGES", "1000"))
-
-        while page_number <= max_pages:
-            page_url = settings["RENT_URL"] if page_number == 1 else f"{settings['RENT_URL']}/page-{page_number}"
-            page_html = _fetch_html_with_retries(client, page_url)
-            links = _extract_listing_links_from_html(page_html)
-
-            if not links:
-                if page_number == 1:
-                    raise RuntimeError("No listing links found on first rent page")
-                print(f"No links found on page {page_number}, stopping rent HTTP extraction")
-                break
-
-            print(f"Rent page {page_number}: found {len(links)} links")
-
-            for link in links:
-                try:
-                    extract_details_http(db, client, link)
-                    processed_count += 1
-                    time.sleep(random.uniform(0.8, 1.8))
-                except Exception as e:
-                    print(f"Error extracting details for {link}: {e}")
-
-            page_number += 1
-            time.sleep(random.uniform(1.2, 2.2))
+    crawl = IncrementalCrawl(db, "28hse", "N28HSE")
+    frontier = CrawlFrontier(db, "28hse")
+    completed = False
+    try:
+        with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as http_client, \
+                PropBulkWriter(db) as writer:
+            client = _rate_limited(http_client)
+            fetch_detail = functools.partial(_fetch_detail_http, db, client, writer)
+            page_number = crawl.start_page()
+            max_pages = int(os.getenv("N28HSE_HTTP_MAX_PAGES", "1000"))
+
+            while page_number <= max_pages and not progress.should_stop():
+                page_url = settings["RENT_URL"] if page_number == 1 else f"{settings['RENT_URL']}/page-{page_number}"
+                page_html = _fetch_html_with_retries(client, page_url)
+                links = _extract_listing_links_from_html(page_html)
+
+                if not links:
+                    if page_number == 1:
+                        raise RuntimeError("No listing links found on first rent page")
+                    print(f"No links found on page {page_number}, stopping rent HTTP extraction")
+                    break
+
+                links_to_fetch, existing_links = _select_links_to_fetch(db, links)
+                print(f"Rent page {page_number}: found {len(links)} links, {len(links_to_fetch)} stale or new")
+                progress.page_done(len(links))
+
+                # Queued in the shared frontier first so a crash or another worker can pick them up.
+                frontier.enqueue(links_to_fetch, existing_links)
+                processed_count += frontier.drain(fetch_detail, progress)
+                crawl.page_finished(page_number)
+
+                page_source_ids = [fields["source_id"] for fields in map(_get_source_fields, links) if fields]
+                if crawl.observe_page(page_source_ids, len(links_to_fetch)):
+                    print(f"No new listings on the last {INCREMENTAL_STOP_AFTER_PAGES} pages, stopping incremental crawl")
+                    break
+
+                page_number += 1
+
+            # Pick up retries whose backoff has expired during this run.
+            processed_count += frontier.drain(fetch_detail, progress)
+            completed = not progress.should_stop()
+    finally:
+        crawl.finish(completed)
 
     print(f"HTTP rent extraction processed {processed_count} listing detail URLs")
 
 
+def drain_frontier_http(db, progress=None):
+    # Only works the queued detail URLs, so extra processes can share one crawl.
+    progress = progress or CrawlProgress("28hse")
+    headers = {
+        "User-Agent": HTTP_USER_AGENT,
+        "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+    }
+
+    with httpx.Client(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as http_client, \
+            PropBulkWriter(db) as writer:
+        fetch_detail = functools.partial(_fetch_detail_http, db, _rate_limited(http_client), writer)
+        processed_count = CrawlFrontier(db, "28hse").drain(fetch_detail, progress)
+
+    print(f"Frontier worker processed {processed_count} listing detail URLs")
+
+
+
+async def _extract_rent_http_async(db, progress=None):
+    progress = progress or CrawlProgress("28hse")
+    headers = {
+        "User-Agent": HTTP_USER_AGENT,
+        "Accept-Language": "zh-HK,zh;q=0.9,en;q=0.8",
+    }
+    loop = asyncio.get_running_loop()
+    # Detail pages are parsed and upserted by the existing sync helpers on worker
+    # threads; their HTTP calls are routed back onto this loop's AsyncClient.
+    executor = ThreadPoolExecutor(max_workers=HTTP_ASYNC_WORKERS + 1)
+    # Bounded so listing pagination only runs a couple of pages ahead of the workers.
+    queue = asyncio.Queue(maxsize=HTTP_ASYNC_WORKERS * 4)
+    writer = PropBulkWriter(db)
+    crawl = IncrementalCrawl(db, "28hse", "N28HSE")
+    frontier = CrawlFrontier(db, "28hse")
+    completed = False
+    processed_count = 0
+
+    async def queue_claimed():
+        while not progress.should_stop():
+            item = await loop.run_in_executor(executor, frontier.claim)
+            if item is None:
+                return
+            await queue.put(item)
+
+    async def detail_worker(client):
+        nonlocal processed_count
+        while True:
+            item = await queue.get()
+            link = item['_id'] if item else None
+            try:
+                if item is None:
+                    return
+                await loop.run_in_executor(
+                    executor,
+                    functools.partial(
+                        extract_details_http, db, client, link, check_freshness=False, writer=writer,
+                        exists=item.get('prop_exists'),
+                    ),
+                )
+                await loop.run_in_executor(executor, frontier.mark_fetched, link)
+                processed_count += 1
+                progress.detail_done()
+            except Exception as e:
+                await loop.run_in_executor(executor, frontier.mark_failed, link, e)
+                progress.detail_failed()
+                print(f"Error extracting details for {link}: {e}")
+            finally:
+                queue.task_done()
+
+    async with httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=HTTP_TIMEOUT_SECONDS) as async_client:
+        bucket = TokenBucket(HTTP_RATE_PER_SECOND)
+        client = BlockingClient(
+            RateLimitedAsyncClient(async_client, bucket, per_host_limit=HTTP_ASYNC_PER_HOST_LIMIT),
+            loop,
+        )
+        workers = [asyncio.create_task(detail_worker(client)) for _ in range(HTTP_ASYNC_WORKERS)]
+
+        try:
+            page_number = crawl.start_page()
+            max_pages = int(os.getenv("N28HSE_HTTP_MAX_PAGES", "1000"))
+
+            while page_number <= max_pages and not progress.should_stop():
+                page_url = settings["RENT_URL"] if page_number == 1 else f"{settings['RENT_URL']}/page-{page_number}"
+                page_html = await loop.run_in_executor(executor, _fetch_html_with_retries, client, page_url)
+                links = _extract_listing_links_from_html(page_html)
+
+                if not links:
+                    if page_number == 1:
+                        raise RuntimeError("No listing links found on first rent page")
+                    print(f"No links found on page {page_number}, stopping rent HTTP extraction")
+                    break
+
+                links_to_fetch, existing_links = await loop.run_in_executor(executor, _select_links_to_fetch, db, links)
+                print(f"Rent page {page_number}: found {len(links)} links, {len(links_to_fetch)} stale or new")
+                progress.page_done(len(links))
+                await loop.run_in_executor(executor, frontier.enqueue, links_to_fetch, existing_links)
+                await queue_claimed()
+                # Claimed but unfinished links stay leased in the frontier, so the cursor can move on.
+                await loop.run_in_executor(executor, crawl.page_finished, page_number)
+
+                page_source_ids = [fields["source_id"] for fields in map(_get_source_fields, links) if fields]
+                if crawl.observe_page(page_source_ids, len(links_to_fetch)):
+                    print(f"No new listings on the last {INCREMENTAL_STOP_AFTER_PAGES} pages, stopping incremental crawl")
+                    break
+
+                page_number += 1
+
+            await queue.join()
+            await queue_claimed()
+            completed = not progress.should_stop()
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            # Both block, so they run off the loop; the flush waits for the executor first.
+            await asyncio.to_thread(executor.shutdown, wait=True)
+            await asyncio.to_thread(writer.flush)
+            await loop.run_in_executor(None, crawl.finish, completed)
+
+    print(f"HTTP rent extraction processed {processed_count} listing detail URLs")
+
+
+def extract_rent_http_async(db, progress=None):
+    asyncio.run(_extract_rent_http_async(db, progress))
+
+
 def _ensure_driver(driver):
     try:
         _ = driver.current_url
@@ -535,19 +674,25 @@ def extract_details(db, driver, link):
         #"is_markdown": True,
     }
 
-    if prop:
-        prop.update(meta)
-        print(f"Updated prop {source_id}")
-    else:
-        meta['source_html_content'] = content_body_div.get_attribute('outerHTML')
-        meta['status'] = "pending_extraction"
-        prop = Prop.create(db, meta)
-        print(f"Created prop {source_id}")
+    # Same write path as the HTTP crawl, so created/changed events reach the change feed.
+    meta['source_html_content'] = content_body_div.get_attribute('outerHTML')
+    _upsert_prop(db, meta)
+    print(f"{'Updated' if prop else 'Created'} prop {source_id}")
     
     # prop.download_photos()
 
 
-def extract_rent(db, driver1, driver2):
+def _extract_details_with_pool(db, pool, links):
+    def run(driver, link):
+        try:
+            extract_details(db, driver, link)
+        except Exception as e:
+            print(f"Error extracting details for {link}: {e}")
+
+    pool.map(run, links)
+
+
+def extract_rent(db, driver1, pool, progress=None):
     driver1 = _open_listing_page(driver1, settings["RENT_URL"])
     
     # menu = driver.find_element(By.ID, 'mainMenuDiv')
@@ -557,29 +702,20 @@ def extract_rent(db, driver1, driver2):
     # file_path = os.path.join(FOLDER, f"28hse_links.csv")
     
     def fetch_link():
-        nonlocal driver2
         # with open(file_path, "a") as of:
         #     writer = csv.writer(of)
         content = driver1.find_element(By.ID, 'main_content')
         search_results_divs = content.find_elements(By.CSS_SELECTOR, '.property_item')
+        links = []
         for div in search_results_divs:
             try:
                 detail_page_link = div.find_element(By.CSS_SELECTOR, 'a.detail_page')
-                link = detail_page_link.get_attribute('href')
+                links.append(detail_page_link.get_attribute('href'))
                 # writer.writerow([link])
-                try:
-                    extract_details(db, driver2, link)
-                except Exception as e:
-                    print(f"Error extracting details for {link}: {e}")
-                    if _is_window_closed_error(e):
-                        print("Recreating detail driver due to closed window")
-                        try:
-                            driver2.quit()
-                        except Exception:
-                            pass
-                        driver2 = _create_driver()
             except Exception as e:
                 pass
+        _extract_details_with_pool(db, pool, links)
+        return len(links)
     
     def go_next_page(num):
         try:
@@ -595,21 +731,23 @@ def extract_rent(db, driver1, driver2):
         return False
     
     init_page = 1
-    while True:
-        fetch_link()
+    while not (progress and progress.should_stop()):
+        link_count = fetch_link()
+        if progress:
+            progress.page_done(link_count)
         time.sleep(3)
         init_page += 1
         has_next = go_next_page(init_page)
         if not has_next:
             break
 
-    return driver1, driver2
+    return driver1
 
-def extract_sell(db, driver1, driver2):
+def extract_sell(db, driver1, pool, progress=None):
     buy_url = settings.get("BUY_URL")
     if not buy_url:
         print("BUY_URL is not configured, skipping sale extraction")
-        return driver1, driver2
+        return driver1
 
     driver1 = _open_listing_page(driver1, buy_url)
     
@@ -620,29 +758,20 @@ def extract_sell(db, driver1, driver2):
     # file_path = os.path.join(FOLDER, f"28hse_links.csv")
     
     def fetch_link():
-        nonlocal driver2
         # with open(file_path, "a") as of:
         #     writer = csv.writer(of)
         content = driver1.find_element(By.ID, 'main_content')
         search_results_divs = content.find_elements(By.CSS_SELECTOR, '.property_item')
+        links = []
         for div in search_results_divs:
-            # writer.writerow([link])
             try:
                 detail_page_link = div.find_element(By.CSS_SELECTOR, 'a.detail_page')
-                link = detail_page_link.get_attribute('href')
-                try:
-                    extract_details(db, driver2, link)
-                except Exception as e:
-                    print(f"Error extracting details for {link}: {e}")
-                    if _is_window_closed_error(e):
-                        print("Recreating detail driver due to closed window")
-                        try:
-                            driver2.quit()
-                        except Exception:
-                            pass
-                        driver2 = _create_driver()
+                links.append(detail_page_link.get_attribute('href'))
+                # writer.writerow([link])
             except Exception as e:
                 pass
+        _extract_details_with_pool(db, pool, links)
+        return len(links)
     
     def go_next_page(num):
         try:
@@ -658,50 +787,55 @@ def extract_sell(db, driver1, driver2):
         return False
     
     init_page = 1
-    while True:
-        fetch_link()
+    while not (progress and progress.should_stop()):
+        link_count = fetch_link()
+        if progress:
+            progress.page_done(link_count)
         time.sleep(3)
         init_page += 1
         has_next = go_next_page(init_page)
         if not has_next:
             break
 
-    return driver1, driver2
+    return driver1
 
-def extract():
-    client = MongoClient(MONGODB_CONNECTION_STRING)
-    db = client['prop_main']
+def extract(db=None, progress=None):
+    if db is None:
+        client = MongoClient(MONGODB_CONNECTION_STRING)
+        db = client['prop_main']
 
     mode = os.getenv("N28HSE_EXTRACT_MODE", "http_first").strip().lower()
-    if mode in {"http", "http_first"}:
+    if mode == "frontier":
+        print("Running 28hse extraction as a frontier worker")
+        drain_frontier_http(db, progress)
+        return
+    if mode in {"http", "http_first", "http_async"}:
         try:
+            if mode == "http_async":
+                print("Running 28hse extraction in async HTTP mode")
+                extract_rent_http_async(db, progress)
+                return
             print("Running 28hse extraction in HTTP mode")
-            extract_rent_http(db)
+            extract_rent_http(db, progress)
             if mode == "http":
                 return
         except Exception as e:
-            if mode == "http":
+            if mode in {"http", "http_async"}:
                 raise
             print(f"HTTP mode failed ({e}), falling back to Selenium")
+        # A stop requested during the HTTP crawl also applies to the Selenium pass.
+        if progress and progress.should_stop():
+            return
 
-    options = uc.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = create_uc_driver(options=options, use_subprocess=True)
-
-    options2 = uc.ChromeOptions()
-    options2.add_argument('--no-sandbox')
-    options2.add_argument('--disable-dev-shm-usage')
-    driver2 = create_uc_driver(options=options2, use_subprocess=True)
-
-    driver, driver2 = extract_rent(db, driver, driver2)
-    driver, driver2 = extract_sell(db, driver, driver2)
+    driver = create_uc_driver(options=default_chrome_options(), use_subprocess=True)
+    pool = BrowserPool()
 
     try:
-        driver.quit()
-    except Exception:
-        pass
-    try:
-        driver2.quit()
-    except Exception:
-        pass
\ No newline at end of file
+        driver = extract_rent(db, driver, pool, progress)
+        driver = extract_sell(db, driver, pool, progress)
+    finally:
+        pool.close()
+        try:
+            driver.quit()
+        except Exception:
+            pass
\ No newline at end of file
@@ -0,0 +1,96 @@
+import re
+
+from extracters.midland_json import parse_number
+
+# Keys the scrapers' `info` dicts use for each field, per source.
+INFO_KEYS = {
+    'rent_price': ['租金', '月租'],
+    'sell_price': ['售價', '叫價'],
+    'net_size_sqft': ['實用面積', '實用'],
+    'gross_size_sqft': ['建築面積', '建築'],
+    'layout': ['間隔', '房間', '格局'],
+    'floor': ['樓層', '層數'],
+}
+
+_SIZE_RE = re.compile(r'([\d,]+(?:\.\d+)?)\s*(?:呎|平方呎|sq\.?\s*ft)', re.IGNORECASE)
+_BEDROOMS_RE = re.compile(r'(\d+)\s*(?:房|bedrooms?\b)', re.IGNORECASE)
+_BATHROOMS_RE = re.compile(r'(\d+)\s*(?:廁|浴|bathrooms?\b)', re.IGNORECASE)
+_STUDIO_RE = re.compile(r'開放式|studio', re.IGNORECASE)
+
+
+def _info_value(info, field):
+    for key in INFO_KEYS[field]:
+        value = info.get(key)
+        if value not in (None, ''):
+            return str(value).strip()
+    return None
+
+
+def _size(value):
+    if not value:
+        return None
+    match = _SIZE_RE.search(value)
+    return parse_number(match.group(1)) if match else parse_number(value)
+
+
+def _rooms(layout, data):
+    if not layout:
+        return
+    if _STUDIO_RE.search(layout):
+        data['number_of_bedrooms'] = 0
+    match = _BEDROOMS_RE.search(layout)
+    if match:
+        data['number_of_bedrooms'] = int(match.group(1))
+    match = _BATHROOMS_RE.search(layout)
+    if match:
+        data['number_of_bathrooms'] = int(match.group(1))
+
+
+def _from_scraped_meta(prop):
+    # 28hse and House730 store the same parsed fields on the prop (see utils.lxml_parser).
+    data = {}
+    info = prop.get('info') if isinstance(prop.get('info'), dict) else {}
+
+    price_field = 'sell_price' if prop.get('post_type') == 'sell' else 'rent_price'
+    price = parse_number(_info_value(info, price_field))
+    if price:
+        data[price_field] = price
+    for field in ('net_size_sqft', 'gross_size_sqft'):
+        size = _size(_info_value(info, field))
+        if size:
+            data[field] = size
+    _rooms(_info_value(info, 'layout'), data)
+    floor = _info_value(info, 'floor')
+    if floor:
+        data['floor'] = floor
+
+    if prop.get('title'):
+        data['title'] = prop['title']
+    if prop.get('description'):
+        data['description'] = prop['description']
+    if prop.get('labels'):
+        data['features'] = list(prop['labels'])
+    if prop.get('image_links'):
+        data['photo_urls'] = list(prop['image_links'])
+    if prop.get('source_posted_date'):
+        data['posted_date'] = prop['source_posted_date']
+    if prop.get('source_updated_date'):
+        data['post_updated_date'] = prop['source_updated_date']
+    return data
+
+
+RULES = {
+    '28hse': _from_scraped_meta,
+    'house730': _from_scraped_meta,
+}
+
+
+def pre_extract(prop):
+    """v1_extracted_data fields the scraped prop already answers, keyed like the LLM schema.
+
+    Only fields read straight from parsed page structure are returned; anything that
+    needs interpretation (location, amenities, policies) is left to the LLM.
+    """
+    rule = RULES.get(prop.get('source_channel'))
+    return rule(prop) if rule else {}
+
@@ -0,0 +1,70 @@
+from datetime import datetime
+from pymongo import ASCENDING
+
+# preparing -> prepared -> uploaded -> in_progress -> completed -> ingested
+#     \-> failed       \-> failed (upload error, or the batch failed / expired / was cancelled)
+OPEN_STATUSES = ['preparing', 'prepared', 'uploaded', 'in_progress', 'completed']
+TRACKED_STATUSES = ['uploaded', 'in_progress']
+# OpenAI batch statuses that mean the batch is still running.
+REMOTE_RUNNING_STATUSES = {'validating', 'in_progress', 'finalizing', 'cancelling'}
+REMOTE_FAILED_STATUSES = {'failed', 'expired', 'cancelled'}
+
+
+class BatchJob:
+    """One LLM batch of a stage, tracked in the `batch_jobs` collection.
+
+    Every state change goes through `transition`, which only applies when the job is
+    still in the expected state, so two orchestrators never handle the same step twice.
+    """
+
+    def __init__(self, db, data):
+        self.db = db
+        self.data = data
+
+    def ensure_indexes(db):
+        db['batch_jobs'].create_index([('stage', ASCENDING), ('status', ASCENDING)])
+
+    def create(db, code, stage):
+        # Created before the stage claims anything, so a crash mid-prepare leaves a
+        # `preparing` job behind whose claims can still be released.
+        now = datetime.now().timestamp()
+        data = {
+            '_id': code,
+            'code': code,
+            'stage': stage,
+            'status': 'preparing',
+            'created_at': now,
+            'updated_at': now,
+        }
+        db['batch_jobs'].insert_one(data)
+        return BatchJob(db, data)
+
+    def find(db, statuses, stage=None, updated_before=None):
+        query = { 'status': { '$in': statuses } }
+        if stage:
+            query['stage'] = stage
+        if updated_before is not None:
+            query['updated_at'] = { '$lt': updated_before }
+        return [BatchJob(db, job) for job in db['batch_jobs'].find(query).sort('created_at', 1)]
+
+    def count_open(db, stage):
+        return db['batch_jobs'].count_documents({ 'stage': stage, 'status': { '$in': OPEN_STATUSES } })
+
+    def transition(self, from_status, to_status, data=None):
+        data = { **(data or {}), 'status': to_status, 'updated_at': datetime.now().timestamp() }
+        result = self.db['batch_jobs'].update_one(
+            { '_id': self.data['_id'], 'status': from_status },
+            { '$set': data },
+        )
+        if result.modified_count == 0:
+            return False
+        self.data = {**self.data, **data}
+        return True
+
+    def delete(self):
+        self.db['batch_jobs'].delete_one({ '_id': self.data['_id'] })
+
+    def update(self, data):
+        data = { **data, 'updated_at': datetime.now().timestamp() }
+        self.db['batch_jobs'].update_one({ '_id': self.data['_id'] }, { '$set': data })
+        self.data = {**self.data, **data}
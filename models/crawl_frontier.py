@@ -0,0 +1,121 @@
+import os
+import socket
+from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+FRONTIER_LEASE_SECONDS = int(os.getenv("CRAWL_FRONTIER_LEASE_SECONDS", "300"))
+FRONTIER_MAX_ATTEMPTS = int(os.getenv("CRAWL_FRONTIER_MAX_ATTEMPTS", "5"))
+FRONTIER_RETRY_BASE_SECONDS = int(os.getenv("CRAWL_FRONTIER_RETRY_BASE_SECONDS", "60"))
+FRONTIER_RETRY_MAX_SECONDS = int(os.getenv("CRAWL_FRONTIER_RETRY_MAX_SECONDS", str(6 * 3600)))
+
+# queued -> claimed -> fetched
+#                   -> retry_after -> claimed ... -> failed (after FRONTIER_MAX_ATTEMPTS)
+CLAIMABLE_STATUSES = ['queued', 'retry_after']
+FINISHED_STATUSES = ['fetched', 'failed']
+
+
+class CrawlFrontier:
+    """Durable per-source queue of detail URLs in the `crawl_frontier` collection.
+
+    Items are claimed atomically with a lease, so several extractor processes can
+    pull from the same frontier and items held by a crashed process become
+    claimable again once their lease expires.
+    """
+
+    def __init__(self, db, source):
+        self.collection = db['crawl_frontier']
+        self.source = source
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.collection.create_index([('source', ASCENDING), ('status', ASCENDING), ('available_at', ASCENDING)])
+
+    def enqueue(self, urls, existing_urls=()):
+        # existing_urls: the urls whose prop is already in Mongo, handed back by `claim`.
+        if not urls:
+            return
+        now = datetime.now().timestamp()
+        ops = []
+        for url in urls:
+            ops.append(UpdateOne(
+                { '_id': url },
+                {
+                    '$setOnInsert': {
+                        'source': self.source,
+                        'status': 'queued',
+                        'attempts': 0,
+                        'available_at': now,
+                        'created_at': now,
+                    },
+                    '$set': { 'prop_exists': url in existing_urls },
+                },
+                upsert=True,
+            ))
+            # Finished items are re-queued when the listing shows up stale again.
+            ops.append(UpdateOne(
+                { '_id': url, 'status': { '$in': FINISHED_STATUSES } },
+                { '$set': { 'status': 'queued', 'attempts': 0, 'available_at': now, 'error': None } },
+            ))
+        self.collection.bulk_write(ops, ordered=True)
+
+    def claim(self):
+        # Returns the claimed item ({'_id': url, 'prop_exists': ...}) or None.
+        now = datetime.now().timestamp()
+        item = self.collection.find_one_and_update(
+            {
+                'source': self.source,
+                '$or': [
+                    { 'status': { '$in': CLAIMABLE_STATUSES }, 'available_at': { '$lte': now } },
+                    { 'status': 'claimed', 'lease_until': { '$lte': now } },
+                ],
+            },
+            { '$set': {
+                'status': 'claimed',
+                'claimed_by': self.worker_id,
+                'lease_until': now + FRONTIER_LEASE_SECONDS,
+            } },
+            sort=[('available_at', ASCENDING)],
+            projection={ '_id': 1, 'prop_exists': 1 },
+            return_document=ReturnDocument.AFTER,
+        )
+        return item
+
+    def mark_fetched(self, url):
+        self.collection.update_one(
+            { '_id': url },
+            { '$set': { 'status': 'fetched', 'fetched_at': datetime.now().timestamp(), 'error': None } },
+        )
+
+    def mark_failed(self, url, error):
+        item = self.collection.find_one({ '_id': url }, { 'attempts': 1 }) or {}
+        attempts = item.get('attempts', 0) + 1
+        now = datetime.now().timestamp()
+        if attempts >= FRONTIER_MAX_ATTEMPTS:
+            data = { 'status': 'failed' }
+        else:
+            delay = min(FRONTIER_RETRY_BASE_SECONDS * 2 ** (attempts - 1), FRONTIER_RETRY_MAX_SECONDS)
+            data = { 'status': 'retry_after', 'available_at': now + delay }
+        self.collection.update_one(
+            { '_id': url },
+            { '$set': { **data, 'attempts': attempts, 'error': str(error)[:500], 'failed_at': now } },
+        )
+
+    def drain(self, fetch, progress=None):
+        # Claim and fetch(url, prop_exists) until nothing is claimable; returns the number fetched.
+        # prop_exists is None for items queued before it was recorded.
+        fetched_count = 0
+        while not (progress and progress.should_stop()):
+            item = self.claim()
+            if item is None:
+                break
+            url = item['_id']
+            try:
+                fetch(url, item.get('prop_exists'))
+                self.mark_fetched(url)
+                fetched_count += 1
+                if progress:
+                    progress.detail_done()
+            except Exception as e:
+                self.mark_failed(url, e)
+                if progress:
+                    progress.detail_failed()
+                print(f"Error extracting details for {url}: {e}")
+        return fetched_count
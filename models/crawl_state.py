@@ -0,0 +1,20 @@
+from datetime import datetime
+
+
+class CrawlState:
+    def __init__(self, db, data):
+        self.db = db
+        self.data = data
+
+    def get(db, source):
+        state = db['crawl_states'].find_one({ 'source': source })
+        return CrawlState(db, state or { 'source': source })
+
+    def update(self, data):
+        data = { **data, 'updated_at': datetime.now().timestamp() }
+        self.db['crawl_states'].update_one(
+            { 'source': self.data['source'] },
+            { '$set': data },
+            upsert=True,
+        )
+        self.data = {**self.data, **data}
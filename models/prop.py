@@ -1,22 +1,76 @@
 from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
 import uuid
 import requests
 import random
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from utils.azure_blob import upload
+from models.prop_change_event import PropChangeEvents, build_event
+from utils.html_store import externalize_html
 
 SHORT_ID_LENGTH = 8
 SHORT_ID_ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnpqrstuvwxyz"
+SHORT_ID_BLOCK_SIZE = 256
+SHORT_ID_MAX_ATTEMPTS = 20
+FRESH_WINDOW_SECONDS = 3 * 24 * 60 * 60
+BULK_WRITE_BATCH_SIZE = int(os.getenv("PROP_BULK_WRITE_BATCH_SIZE", "100"))
+BULK_WRITE_FLUSH_SECONDS = float(os.getenv("PROP_BULK_WRITE_FLUSH_SECONDS", "10"))
+BULK_WRITE_MAX_ATTEMPTS = 5
+DUPLICATE_KEY_ERROR_CODE = 11000
+# Crawl bookkeeping that changes on every fetch without the listing itself changing;
+# the archived page (inline or as a store ref) changes byte-wise with ads and tokens.
+FINGERPRINT_EXCLUDED_FIELDS = {'updated_at', 'source_html_content', 'source_html_ref', 'content_fingerprint'}
 
 def random_short_id(length: int = SHORT_ID_LENGTH) -> str:
     return "".join(random.choice(SHORT_ID_ALPHABET) for _ in range(length))
-    
-def generate_unique_short_id(collection, max_attempts: int = 20) -> str:
-    for _ in range(max_attempts):
-        candidate = random_short_id()
-        exists = collection.find_one({ 'short_id': candidate }) is not None
-        if not exists:
-            return candidate
-    raise RuntimeError("Failed to generate unique short_id after maximum attempts")
+
+
+def content_fingerprint(data) -> str:
+    content = {key: value for key, value in data.items() if key not in FINGERPRINT_EXCLUDED_FIELDS}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def is_short_id_collision(error_details) -> bool:
+    details = error_details or {}
+    return details.get('code') == DUPLICATE_KEY_ERROR_CODE and 'short_id' in (details.get('keyPattern') or {})
+
+
+class ShortIdAllocator:
+    """Hands out short_id candidates from pre-generated blocks without querying Mongo.
+
+    Uniqueness is enforced by the `short_id_unique_sparse` index: writers insert with a
+    candidate and take another one on DuplicateKeyError.
+    """
+
+    def __init__(self, block_size: int = SHORT_ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._block = []
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        block = set()
+        while len(block) < self.block_size:
+            block.add(random_short_id())
+        self._block = list(block)
+
+    def next(self) -> str:
+        with self._lock:
+            if not self._block:
+                self._refill()
+            return self._block.pop()
+
+    def take(self, count: int) -> list:
+        return [self.next() for _ in range(count)]
+
+
+short_id_allocator = ShortIdAllocator()
+
 
 class Prop:
     def __init__(self, db, data):
@@ -27,6 +81,28 @@ class Prop:
         prop = db['props'].find_one({ 'source_id': id })
         return Prop(db, prop) if prop else None
     
+    def get_stale_ids(db, source_ids, max_age=FRESH_WINDOW_SECONDS):
+        return Prop.split_stale_ids(db, source_ids, max_age)[0]
+
+    def split_stale_ids(db, source_ids, max_age=FRESH_WINDOW_SECONDS):
+        # One $in round trip for a whole listing page: (stale ids, ids already in Mongo).
+        # Unknown ids count as stale.
+        source_ids = list(dict.fromkeys(source_ids))
+        if not source_ids:
+            return set(), set()
+        cursor = db['props'].find(
+            { 'source_id': { '$in': source_ids } },
+            { '_id': 0, 'source_id': 1, 'updated_at': 1 },
+        )
+        now = datetime.now().timestamp()
+        existing_ids = set()
+        fresh_ids = set()
+        for doc in cursor:
+            existing_ids.add(doc['source_id'])
+            if doc.get('updated_at') is not None and now - doc['updated_at'] < max_age:
+                fresh_ids.add(doc['source_id'])
+        return {source_id for source_id in source_ids if source_id not in fresh_ids}, existing_ids
+
     def get_by_short_id(db, short_id):
         prop = db['props'].find_one({ 'short_id': short_id })
         return Prop(db, prop) if prop else None
@@ -38,7 +114,11 @@ class Prop:
         }).skip(skip).limit(limit)
         return [Prop(db, prop) for prop in props_cursor]
 
-    def archive(self):
+    def archive(self, writer=None):
+        if writer:
+            writer.archive(self.data['source_id'], self.data.get('source_channel'))
+            self.data = {**self.data, 'status': 'archived'}
+            return
         self.db['prop_photos'].update_many(
             { 'prop_source_id': self.data['source_id'] },
             { '$set': { 'status': 'archived' } }
@@ -47,6 +127,9 @@ class Prop:
             'status': 'archived',
             "updated_at": datetime.now().timestamp(),
         })
+        PropChangeEvents(self.db).append([
+            build_event('archived', self.data['source_id'], self.data.get('source_channel')),
+        ])
 
     # def download_photos(self):
     #     photo_with_blobs = []
@@ -62,16 +145,255 @@ class Prop:
     #         })
     #     self.update({'analysed_photos': photo_with_blobs, 'status': 'active'})
 
-    def update(self, data):
-        update_data = { '$set': data }
-        self.db['props'].update_one({ 'source_id': self.data['source_id'] }, update_data)
+    def update(self, data, writer=None):
+        data = externalize_html(data)
+        if writer:
+            writer.update(self.data['source_id'], data)
+        else:
+            update_data = { '$set': data }
+            self.db['props'].update_one({ 'source_id': self.data['source_id'] }, update_data)
         self.data = {**self.data, **data}
 
     def create(db, data):
-        short_id = generate_unique_short_id(db['props'])
+        data = externalize_html(data)
         data['id'] = str(uuid.uuid4())
-        data['short_id'] = short_id
         data['created_at'] = datetime.now().timestamp()
-        props_doc = db['props'].insert_one(data)
+        for attempt in range(1, SHORT_ID_MAX_ATTEMPTS + 1):
+            data['short_id'] = short_id_allocator.next()
+            try:
+                props_doc = db['props'].insert_one(data)
+                break
+            except DuplicateKeyError as e:
+                if not is_short_id_collision(e.details) or attempt == SHORT_ID_MAX_ATTEMPTS:
+                    raise
         prop = Prop(db, { '_id': props_doc.inserted_id, **data })
-        return prop
\ No newline at end of file
+        PropChangeEvents(db).append([
+            build_event('created', data['source_id'], data.get('source_channel')),
+        ])
+        return prop
+
+
+class PropBulkWriter:
+    """Buffers prop upserts and writes them as unordered bulk_write batches.
+
+    Rows are flushed once `batch_size` are queued or `flush_interval` seconds have
+    passed since the last flush. `id`/`short_id`/`created_at` only apply on insert;
+    rows that hit a duplicate key (short_id collision) are retried with a new short_id.
+    Plain `update`/`archive` calls on existing props are batched the same way.
+    Inserted, content-changed and archived props are appended to the change feed
+    after each flush; a change is an upsert whose `content_fingerprint` differs from
+    the stored one.
+    Ops rejected by Mongo are logged and dropped; on connection errors the unwritten
+    part of the buffer is re-queued for the next flush.
+    """
+
+    def __init__(self, db, batch_size=BULK_WRITE_BATCH_SIZE, flush_interval=BULK_WRITE_FLUSH_SECONDS):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._updates = []
+        self._photo_updates = []
+        self._events = []
+        self.change_feed = PropChangeEvents(db)
+        self._lock = threading.Lock()
+        self._last_flush_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def upsert(self, data, on_insert=None, fill_missing=None, on_written=None, fingerprint=None):
+        # fill_missing: fields set on insert, or on update only when currently null/missing.
+        # on_written: called once the row is in Mongo; never for a row that was dropped.
+        # fingerprint: overrides the content fingerprint computed from `data`.
+        data = externalize_html(data)
+        row = {
+            'data': {**data, 'content_fingerprint': fingerprint or content_fingerprint(data)},
+            'on_insert': on_insert or {},
+            'fill_missing': fill_missing or {},
+            'on_written': on_written,
+        }
+        with self._lock:
+            self._rows.append(row)
+            self._maybe_flush_locked()
+
+    def update(self, source_id, data, where=None):
+        # where: extra filter fields, e.g. to only touch a prop still in a given status.
+        with self._lock:
+            self._updates.append(UpdateOne({ **(where or {}), 'source_id': source_id }, { '$set': externalize_html(data) }))
+            self._maybe_flush_locked()
+
+    def archive(self, source_id, source_channel=None):
+        with self._lock:
+            self._events.append(build_event('archived', source_id, source_channel))
+            self._updates.append(UpdateOne(
+                { 'source_id': source_id },
+                { '$set': { 'status': 'archived', 'updated_at': datetime.now().timestamp() } },
+            ))
+            self._photo_updates.append(UpdateMany(
+                { 'prop_source_id': source_id },
+                { '$set': { 'status': 'archived' } },
+            ))
+            self._maybe_flush_locked()
+
+    def _maybe_flush_locked(self):
+        if (
+            len(self._rows) + len(self._updates) >= self.batch_size
+            or time.monotonic() - self._last_flush_at >= self.flush_interval
+        ):
+            self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _build_ops(self, row):
+        source_id = row['data']['source_id']
+        on_insert = {
+            **row['on_insert'],
+            **row['fill_missing'],
+            'id': str(uuid.uuid4()),
+            'short_id': short_id_allocator.next(),
+            'created_at': datetime.now().timestamp(),
+        }
+        ops = [UpdateOne(
+            { 'source_id': source_id },
+            { '$set': row['data'], '$setOnInsert': on_insert },
+            upsert=True,
+        )]
+        for field, value in row['fill_missing'].items():
+            # Matches nothing for a row inserted by the upsert above, so op order does not matter.
+            ops.append(UpdateOne(
+                { 'source_id': source_id, field: None },
+                { '$set': { field: value } },
+            ))
+        return ops
+
+    def _created_events(self, upsert_op_rows, upserted_ids):
+        return [
+            build_event('created', upsert_op_rows[index]['data']['source_id'], upsert_op_rows[index]['data'].get('source_channel'))
+            for index in upserted_ids
+            if index in upsert_op_rows
+        ]
+
+    def _log_write_errors(self, error):
+        # Unordered bulk writes apply every op except the ones listed, so only those are lost.
+        write_errors = (error.details or {}).get('writeErrors', [])
+        for write_error in write_errors:
+            print(f"Dropped prop write {(write_error.get('op') or {}).get('q')}: {write_error.get('errmsg')}")
+        return len(write_errors)
+
+    def _requeue_locked(self, rows, updates, photo_updates, events):
+        # Put back whatever a failed flush did not write, ahead of anything queued since.
+        self._rows = rows + self._rows
+        self._updates = updates + self._updates
+        self._photo_updates = photo_updates + self._photo_updates
+        self._events = events + self._events
+
+    def _stored_fingerprints(self, rows):
+        # One $in read per flush; props without a fingerprint yet are never reported as changed.
+        source_ids = [row['data']['source_id'] for row in rows]
+        if not source_ids:
+            return {}
+        cursor = self.db['props'].find(
+            { 'source_id': { '$in': source_ids } },
+            { '_id': 0, 'source_id': 1, 'content_fingerprint': 1 },
+        )
+        return {doc['source_id']: doc.get('content_fingerprint') for doc in cursor}
+
+    def _written(self, rows, stored_fingerprints, events):
+        for row in rows:
+            data = row['data']
+            stored = stored_fingerprints.get(data['source_id'])
+            if stored and stored != data['content_fingerprint']:
+                events.append(build_event('changed', data['source_id'], data.get('source_channel'), ['content']))
+            if row['on_written'] is None:
+                continue
+            try:
+                row['on_written']()
+            except Exception as e:
+                print(f"on_written failed for {data.get('source_id')}: {e}")
+
+    def _flush_locked(self):
+        rows, self._rows = self._rows, []
+        updates, self._updates = self._updates, []
+        photo_updates, self._photo_updates = self._photo_updates, []
+        events, self._events = self._events, []
+        self._last_flush_at = time.monotonic()
+
+        created_count = 0
+        updated_count = 0
+        try:
+            stored_fingerprints = self._stored_fingerprints(rows)
+            for attempt in range(1, BULK_WRITE_MAX_ATTEMPTS + 1):
+                if not rows:
+                    break
+
+                ops = []
+                upsert_op_rows = {}
+                for row in rows:
+                    upsert_op_rows[len(ops)] = row
+                    ops.extend(self._build_ops(row))
+
+                try:
+                    result = self.db['props'].bulk_write(ops, ordered=False)
+                    created_count += result.upserted_count
+                    updated_count += len(rows) - result.upserted_count
+                    events.extend(self._created_events(upsert_op_rows, result.upserted_ids))
+                    self._written(rows, stored_fingerprints, events)
+                    rows = []
+                except BulkWriteError as e:
+                    details = e.details or {}
+                    retry_rows = []
+                    failed_count = 0
+                    unwritten = set()
+                    for error in details.get('writeErrors', []):
+                        row = upsert_op_rows.get(error['index'])
+                        if row is not None:
+                            unwritten.add(error['index'])
+                        if row is not None and error.get('code') == DUPLICATE_KEY_ERROR_CODE \
+                                and attempt < BULK_WRITE_MAX_ATTEMPTS:
+                            retry_rows.append(row)
+                            continue
+                        print(f"Dropped prop write {(row or {}).get('data', {}).get('source_id')}: {error.get('errmsg')}")
+                        if row is not None:
+                            failed_count += 1
+                    created_count += details.get('nUpserted', 0)
+                    upserted_ids = {upserted['index']: upserted['_id'] for upserted in details.get('upserted', [])}
+                    events.extend(self._created_events(upsert_op_rows, upserted_ids))
+                    updated_count += len(rows) - len(retry_rows) - failed_count - details.get('nUpserted', 0)
+                    self._written(
+                        [row for index, row in upsert_op_rows.items() if index not in unwritten],
+                        stored_fingerprints,
+                        events,
+                    )
+                    if retry_rows:
+                        print(f"Retrying {len(retry_rows)} props after duplicate key errors")
+                    rows = retry_rows
+
+            # Written after the upserts so an update queued behind an upsert of the same prop lands last.
+            if updates:
+                try:
+                    self.db['props'].bulk_write(updates, ordered=False)
+                    updated_count += len(updates)
+                except BulkWriteError as e:
+                    updated_count += len(updates) - self._log_write_errors(e)
+                updates = []
+            if photo_updates:
+                try:
+                    self.db['prop_photos'].bulk_write(photo_updates, ordered=False)
+                except BulkWriteError as e:
+                    self._log_write_errors(e)
+                photo_updates = []
+            self.change_feed.append(events)
+            events = []
+        except Exception:
+            # Connection-level failures: nothing below the failing step was written.
+            self._requeue_locked(rows, updates, photo_updates, events)
+            raise
+        finally:
+            if created_count or updated_count:
+                print(f"Flushed props: {created_count} created, {updated_count} updated")
@@ -0,0 +1,163 @@
+import fcntl
+import json
+import os
+import threading
+from datetime import datetime
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+CHANGE_FEED_OFFLINE = os.getenv("CHANGE_FEED_OFFLINE", "0").strip().lower() in {"1", "true", "yes"}
+CHANGE_FEED_LOG_PATH = os.getenv(
+    "CHANGE_FEED_LOG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_FOLDER, "prop_change_events.jsonl"),
+)
+# A hole in the sequence is an append that allocated seqs but has not inserted yet;
+# after this long it is treated as lost and skipped.
+CHANGE_FEED_GAP_SECONDS = int(os.getenv("CHANGE_FEED_GAP_SECONDS", "60"))
+
+EVENT_TYPES = {'created', 'changed', 'archived'}
+
+
+def build_event(event_type, source_id, source_channel=None, reasons=None):
+    return {
+        'type': event_type,
+        'source_id': source_id,
+        'source_channel': source_channel or source_id.split('-', 1)[0],
+        'reasons': reasons or [],
+    }
+
+
+class PropChangeEvents:
+    """Append-only feed of listing changes with a monotonically increasing `seq`.
+
+    Online, events live in the `prop_change_events` collection keyed by seq, with seqs
+    allocated in blocks from the `counters` collection. With CHANGE_FEED_OFFLINE set
+    (or no db), they are appended to a local JSONL file instead.
+    """
+
+    def __init__(self, db=None, log_path=CHANGE_FEED_LOG_PATH):
+        self.db = db
+        self.offline = CHANGE_FEED_OFFLINE or db is None
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        if self.offline:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+
+    def append(self, events):
+        if not events:
+            return
+        now = datetime.now().timestamp()
+        with self._lock:
+            if self.offline:
+                self._append_offline(events, now)
+                return
+            counter = self.db['counters'].find_one_and_update(
+                { '_id': 'prop_change_events' },
+                { '$inc': { 'seq': len(events) } },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            first_seq = counter['seq'] - len(events) + 1
+            docs = [
+                { '_id': first_seq + index, 'seq': first_seq + index, **event, 'created_at': now }
+                for index, event in enumerate(events)
+            ]
+            self.db['prop_change_events'].insert_many(docs, ordered=False)
+
+    def _append_offline(self, events, now):
+        with open(self.log_path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                last_seq = self._last_offline_seq(f)
+                for index, event in enumerate(events, start=1):
+                    f.write(json.dumps({ 'seq': last_seq + index, **event, 'created_at': now }, ensure_ascii=False) + "\n")
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _last_offline_seq(self, f):
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return 0
+        f.seek(max(0, size - 4096))
+        lines = [line for line in f.read().splitlines() if line.strip()]
+        return json.loads(lines[-1])['seq'] if lines else 0
+
+    def read_after(self, seq, limit):
+        if self.offline:
+            events = []
+            if not os.path.exists(self.log_path):
+                return events
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event['seq'] > seq:
+                        events.append(event)
+                        if len(events) >= limit:
+                            break
+            return events
+        return list(self.db['prop_change_events'].find({ '_id': { '$gt': seq } }).sort('_id', 1).limit(limit))
+
+
+class ChangeFeedConsumer:
+    """Reads the change feed from a named, persisted checkpoint.
+
+    Call `read()` for the next events, process them, then `commit()` with the last
+    handled seq. Checkpoints live in `change_feed_checkpoints` (or next to the log
+    file when offline).
+    """
+
+    def __init__(self, db, name, feed=None):
+        self.db = db
+        self.name = name
+        self.feed = feed or PropChangeEvents(db)
+        self.checkpoint = self._load_checkpoint()
+        self.last_read_seq = self.checkpoint
+
+    def _checkpoint_path(self):
+        return f"{self.feed.log_path}.{self.name}.checkpoint"
+
+    def _load_checkpoint(self):
+        if self.feed.offline:
+            if not os.path.exists(self._checkpoint_path()):
+                return 0
+            with open(self._checkpoint_path(), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        doc = self.db['change_feed_checkpoints'].find_one({ '_id': self.name })
+        return doc['seq'] if doc else 0
+
+    def read(self, limit=500, types=None):
+        # Only returns a contiguous run of seqs so an in-flight append is never skipped.
+        events = []
+        expected = self.checkpoint + 1
+        now = datetime.now().timestamp()
+        for event in self.feed.read_after(self.checkpoint, limit):
+            if event['seq'] != expected and now - event['created_at'] < CHANGE_FEED_GAP_SECONDS:
+                break
+            expected = event['seq'] + 1
+            events.append(event)
+        # Events filtered out by `types` still count as read, so commit() moves past them.
+        self.last_read_seq = events[-1]['seq'] if events else self.checkpoint
+        if types:
+            return [event for event in events if event['type'] in types]
+        return events
+
+    def commit(self, seq=None):
+        seq = self.last_read_seq if seq is None else seq
+        if seq <= self.checkpoint:
+            return
+        if self.feed.offline:
+            with open(self._checkpoint_path(), 'w', encoding='utf-8') as f:
+                f.write(str(seq))
+        else:
+            self.db['change_feed_checkpoints'].update_one(
+                { '_id': self.name },
+                { '$set': { 'seq': seq, 'updated_at': datetime.now().timestamp() } },
+                upsert=True,
+            )
+        self.checkpoint = seq
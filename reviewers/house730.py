@@ -2,11 +2,11 @@ import time
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from models.prop import Prop
-from reviewers.monitor import extract_monitor_snapshot, build_monitor_update
+from reviewers.monitor import extract_monitor_snapshot, MonitorEngine
 
 sign_message = ['樓盤已過期', '此樓盤已被隱藏']
 
-def review(db, driver, prop):
+def review(db, driver, prop, writer=None, engine=None):
     try:
         driver.get(prop['source_url'])
 
@@ -31,13 +31,14 @@ def review(db, driver, prop):
             still_accessible = False
     
         if not still_accessible:
-            Prop(db, prop).archive()
+            Prop(db, prop).archive(writer)
             print(f"Archived place {prop['source_id']} due to inaccessible URL.")
         else:
             now = datetime.now().timestamp()
             snapshot = extract_monitor_snapshot(prop['source_channel'], driver.page_source)
-            update_data, reasons = build_monitor_update(prop, snapshot, now)
-            Prop(db, prop).update(update_data)
+            # Without a shared engine, write this prop straight away.
+            engine = engine or MonitorEngine(db, batch_size=1)
+            update_data, reasons = engine.add(prop, snapshot, now)
             if update_data.get('monitor_change_pending'):
                 print(f"Place {prop['source_id']} change candidate: {','.join(reasons)}")
             elif reasons and reasons != ['initial_monitor']:
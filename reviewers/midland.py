@@ -1,18 +1,32 @@
+import functools
 import requests
 from datetime import datetime
 from models.prop import Prop
-from reviewers.monitor import extract_monitor_snapshot, build_monitor_update
+from reviewers.monitor import extract_monitor_snapshot, MonitorEngine, build_not_modified_update
+from utils.http_cache import get_http_cache, HTTP_CACHE_REVIEW
 
-def review(db, driver, prop):
-    response = requests.get(prop['source_url'], allow_redirects=False, timeout=15)
-    if response.status_code != 200:
-        Prop(db, prop).archive()
+def review(db, driver, prop, writer=None, engine=None):
+    cache = get_http_cache(HTTP_CACHE_REVIEW)
+    headers = cache.conditional_headers(prop['source_url']) if cache else {}
+    response = requests.get(prop['source_url'], headers=headers, allow_redirects=False, timeout=15)
+    if response.status_code == 304:
+        Prop(db, prop).update(build_not_modified_update(prop, datetime.now().timestamp()), writer)
+        print(f"Place {prop['source_id']} not modified.")
+    elif response.status_code != 200:
+        Prop(db, prop).archive(writer)
         print(f"Archived place {prop['source_id']} due to inaccessible URL.")
     else:
         now = datetime.now().timestamp()
         snapshot = extract_monitor_snapshot(prop['source_channel'], response.text)
-        update_data, reasons = build_monitor_update(prop, snapshot, now)
-        Prop(db, prop).update(update_data)
+        # Without a shared engine, write this prop straight away.
+        engine = engine or MonitorEngine(db, batch_size=1)
+        # Validators are kept only once the monitor update is written.
+        if cache:
+            cache.defer_store(prop['source_url'], response)
+        update_data, reasons = engine.add(
+            prop, snapshot, now,
+            on_written=functools.partial(cache.commit, prop['source_url']) if cache else None,
+        )
         if update_data.get('monitor_change_pending'):
             print(f"Place {prop['source_id']} change candidate: {','.join(reasons)}")
         elif reasons and reasons != ['initial_monitor']:
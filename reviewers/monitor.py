@@ -1,16 +1,49 @@
 import hashlib
-import json
+import os
 import re
-
-from bs4 import BeautifulSoup
+import threading
+from collections import Counter, defaultdict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.prop_change_event import PropChangeEvents, build_event
+
+from utils.lxml_parser import (
+    XP_28HSE_CONTENT,
+    XP_28HSE_PAIR_NAME,
+    XP_28HSE_PAIR_ROWS,
+    XP_28HSE_PAIR_VALUE,
+    XP_28HSE_PROPERTY_DATE,
+    XP_HOUSE730_DETAIL,
+    XP_HOUSE730_PRICE_NODES,
+    XP_MIDLAND_MAIN,
+    XP_MIDLAND_PRICE_NODES,
+    XP_TITLE,
+    first,
+    iter_ld_json,
+    node_text,
+    parse_html,
+)
 
 TWO_HIT_SOURCES = {'midland', 'house730'}
+MONITOR_ENGINE_BATCH_SIZE = int(os.getenv("MONITOR_ENGINE_BATCH_SIZE", "500"))
+_WHITESPACE_RE = re.compile(r'\s+')
+
+REVIEW_MIN_INTERVAL_SECONDS = int(os.getenv("REVIEW_MIN_INTERVAL_SECONDS", str(3600)))
+REVIEW_DEFAULT_INTERVAL_SECONDS = int(os.getenv("REVIEW_DEFAULT_INTERVAL_SECONDS", str(6 * 3600)))
+REVIEW_MAX_INTERVAL_SECONDS = int(os.getenv("REVIEW_MAX_INTERVAL_SECONDS", str(48 * 3600)))
+REVIEW_PENDING_INTERVAL_SECONDS = int(os.getenv("REVIEW_PENDING_INTERVAL_SECONDS", str(1800)))
+# Fraction of the time since the last change to wait before the next check.
+REVIEW_BACKOFF_FACTOR = float(os.getenv("REVIEW_BACKOFF_FACTOR", "0.25"))
+# Listings changing at least this often per day are checked twice as often.
+REVIEW_VOLATILE_CHANGES_PER_DAY = float(os.getenv("REVIEW_VOLATILE_CHANGES_PER_DAY", "0.5"))
 
 
 def _normalize_space(value):
     if value is None:
         return ''
-    return re.sub(r'\s+', ' ', str(value)).strip()
+    return _WHITESPACE_RE.sub(' ', str(value)).strip()
 
 
 def _normalize_price(value):
@@ -24,11 +57,8 @@ def _normalize_price(value):
     return text
 
 
-def _extract_title_text(soup):
-    title_node = soup.select_one('title')
-    if not title_node:
-        return ''
-    return _normalize_space(title_node.get_text(' ', strip=True))
+def _extract_title_text(tree):
+    return _normalize_space(node_text(first(XP_TITLE, tree), ' '))
 
 
 def _extract_first_price_by_regex(text):
@@ -47,68 +77,44 @@ def _extract_first_price_by_regex(text):
     return ''
 
 
-def _extract_price_from_ld_json(soup):
-    for script in soup.select('script[type="application/ld+json"]'):
-        raw = (script.string or script.get_text() or '').strip()
-        if not raw:
-            continue
-        try:
-            payload = json.loads(raw)
-        except Exception:
-            continue
-
-        items = payload if isinstance(payload, list) else [payload]
-        for item in items:
-            if not isinstance(item, dict):
-                continue
-            offers = item.get('offers')
-            if isinstance(offers, dict):
-                price = offers.get('price')
-                if price is not None:
-                    return str(price)
+def _extract_price_from_ld_json(tree):
+    for item in iter_ld_json(tree):
+        offers = item.get('offers')
+        if isinstance(offers, dict):
+            price = offers.get('price')
+            if price is not None:
+                return str(price)
     return ''
 
 
-def _extract_dates_from_ld_json(soup):
+def _extract_dates_from_ld_json(tree):
     posted = ''
     updated = ''
-    for script in soup.select('script[type="application/ld+json"]'):
-        raw = (script.string or script.get_text() or '').strip()
-        if not raw:
-            continue
-        try:
-            payload = json.loads(raw)
-        except Exception:
-            continue
-
-        items = payload if isinstance(payload, list) else [payload]
-        for item in items:
-            if not isinstance(item, dict):
-                continue
-            if not posted:
-                posted = _normalize_space(item.get('datePosted') or item.get('datePublished'))
-            if not updated:
-                updated = _normalize_space(item.get('dateModified'))
-            if posted and updated:
-                return posted, updated
+    for item in iter_ld_json(tree):
+        if not posted:
+            posted = _normalize_space(item.get('datePosted') or item.get('datePublished'))
+        if not updated:
+            updated = _normalize_space(item.get('dateModified'))
+        if posted and updated:
+            return posted, updated
     return posted, updated
 
 
-def _extract_28hse_snapshot(soup):
+def _extract_28hse_snapshot(tree):
     snapshot = {
         'price_raw': '',
         'posted_date_raw': '',
         'updated_date_raw': '',
         'status_raw': 'active',
-        'title_raw': _extract_title_text(soup),
+        'title_raw': _extract_title_text(tree),
         'confidence': 'low',
     }
 
-    content_body_div = soup.select_one('.content_body .ten')
-    if content_body_div:
-        date_node = content_body_div.select_one('.propertyDate')
-        if date_node:
-            date_text = _normalize_space(date_node.get_text(' ', strip=True))
+    content_body_div = first(XP_28HSE_CONTENT, tree)
+    if content_body_div is not None:
+        date_node = first(XP_28HSE_PROPERTY_DATE, content_body_div)
+        if date_node is not None:
+            date_text = _normalize_space(node_text(date_node, ' '))
             date_parts = [part.strip() for part in date_text.split('|') if part.strip()]
             for part in date_parts:
                 if part.startswith('刊登:'):
@@ -116,21 +122,21 @@ def _extract_28hse_snapshot(soup):
                 elif part.startswith('更新:'):
                     snapshot['updated_date_raw'] = _normalize_space(part.replace('更新:', '', 1))
 
-        for pair in content_body_div.select('table.tablePair tr'):
-            key_node = pair.select_one('td.table_left')
-            value_node = pair.select_one('.pairValue')
-            if not key_node or not value_node:
+        for pair in XP_28HSE_PAIR_ROWS(content_body_div):
+            key_node = first(XP_28HSE_PAIR_NAME, pair)
+            value_node = first(XP_28HSE_PAIR_VALUE, pair)
+            if key_node is None or value_node is None:
                 continue
-            key_text = _normalize_space(key_node.get_text(' ', strip=True))
+            key_text = _normalize_space(node_text(key_node, ' '))
             if any(token in key_text for token in ['租金', '售價', '叫價']):
-                snapshot['price_raw'] = _normalize_space(value_node.get_text(' ', strip=True))
+                snapshot['price_raw'] = _normalize_space(node_text(value_node, ' '))
                 break
 
     if not snapshot['price_raw']:
-        snapshot['price_raw'] = _extract_price_from_ld_json(soup)
+        snapshot['price_raw'] = _extract_price_from_ld_json(tree)
 
     if not snapshot['posted_date_raw'] or not snapshot['updated_date_raw']:
-        ld_posted, ld_updated = _extract_dates_from_ld_json(soup)
+        ld_posted, ld_updated = _extract_dates_from_ld_json(tree)
         if not snapshot['posted_date_raw']:
             snapshot['posted_date_raw'] = ld_posted
         if not snapshot['updated_date_raw']:
@@ -143,82 +149,85 @@ def _extract_28hse_snapshot(soup):
     return snapshot
 
 
-def _extract_house730_snapshot(soup):
+def _extract_house730_snapshot(tree):
     snapshot = {
         'price_raw': '',
         'posted_date_raw': '',
         'updated_date_raw': '',
         'status_raw': 'active',
-        'title_raw': _extract_title_text(soup),
+        'title_raw': _extract_title_text(tree),
         'confidence': 'low',
     }
 
-    detail = soup.select_one('#pc-services-detail') or soup
+    detail = first(XP_HOUSE730_DETAIL, tree)
+    if detail is None:
+        detail = tree
 
     # Try CSS hints before broad text regex.
-    for node in detail.select('[class*="price" i], [data-testid*="price" i]'):
-        text = _normalize_space(node.get_text(' ', strip=True))
+    for node in XP_HOUSE730_PRICE_NODES(detail):
+        text = _normalize_space(node_text(node, ' '))
         candidate = _extract_first_price_by_regex(text)
         if candidate:
             snapshot['price_raw'] = candidate
             break
 
     if not snapshot['price_raw']:
-        snapshot['price_raw'] = _extract_first_price_by_regex(detail.get_text(' ', strip=True))
+        snapshot['price_raw'] = _extract_first_price_by_regex(node_text(detail, ' '))
 
     if snapshot['price_raw']:
         snapshot['confidence'] = 'medium'
     return snapshot
 
 
-def _extract_midland_snapshot(soup):
+def _extract_midland_snapshot(tree):
     snapshot = {
         'price_raw': '',
         'posted_date_raw': '',
         'updated_date_raw': '',
         'status_raw': 'active',
-        'title_raw': _extract_title_text(soup),
+        'title_raw': _extract_title_text(tree),
         'confidence': 'low',
     }
 
-    main = soup.select_one('main') or soup
+    main = first(XP_MIDLAND_MAIN, tree)
+    if main is None:
+        main = tree
 
     # Prioritize visible "price" blocks, then fallback to page text.
-    for node in main.select('[class*="price" i], [class*="rent" i], [data-testid*="price" i]'):
-        text = _normalize_space(node.get_text(' ', strip=True))
+    for node in XP_MIDLAND_PRICE_NODES(main):
+        text = _normalize_space(node_text(node, ' '))
         candidate = _extract_first_price_by_regex(text)
         if candidate:
             snapshot['price_raw'] = candidate
             break
 
     if not snapshot['price_raw']:
-        snapshot['price_raw'] = _extract_first_price_by_regex(main.get_text(' ', strip=True))
+        snapshot['price_raw'] = _extract_first_price_by_regex(node_text(main, ' '))
 
     if snapshot['price_raw']:
         snapshot['confidence'] = 'medium'
     return snapshot
 
 
-def extract_monitor_snapshot(source_channel, html):
-    soup = BeautifulSoup(html or '', 'lxml')
+def extract_monitor_snapshot_from_tree(source_channel, tree):
     if source_channel == '28hse':
-        snapshot = _extract_28hse_snapshot(soup)
+        snapshot = _extract_28hse_snapshot(tree)
     elif source_channel == 'house730':
-        snapshot = _extract_house730_snapshot(soup)
+        snapshot = _extract_house730_snapshot(tree)
     elif source_channel == 'midland':
-        snapshot = _extract_midland_snapshot(soup)
+        snapshot = _extract_midland_snapshot(tree)
     else:
         snapshot = {
-            'price_raw': _extract_price_from_ld_json(soup),
+            'price_raw': _extract_price_from_ld_json(tree),
             'posted_date_raw': '',
             'updated_date_raw': '',
             'status_raw': 'active',
-            'title_raw': _extract_title_text(soup),
+            'title_raw': _extract_title_text(tree),
             'confidence': 'low',
         }
 
     if not snapshot.get('posted_date_raw') or not snapshot.get('updated_date_raw'):
-        ld_posted, ld_updated = _extract_dates_from_ld_json(soup)
+        ld_posted, ld_updated = _extract_dates_from_ld_json(tree)
         snapshot['posted_date_raw'] = snapshot.get('posted_date_raw') or ld_posted
         snapshot['updated_date_raw'] = snapshot.get('updated_date_raw') or ld_updated
 
@@ -230,6 +239,10 @@ def extract_monitor_snapshot(source_channel, html):
     return snapshot
 
 
+def extract_monitor_snapshot(source_channel, html):
+    return extract_monitor_snapshot_from_tree(source_channel, parse_html(html or ''))
+
+
 def build_monitor_fingerprint(source_id, source_channel, snapshot):
     common = [
         _normalize_space(source_id),
@@ -277,6 +290,26 @@ def _apply_two_hit_confirmation(monitor, source_channel, next_fingerprint, reaso
     return False, True
 
 
+def compute_next_review_at(prop, monitor, pending, now):
+    if pending:
+        # A second hit confirms or discards the change, so come back soon.
+        return now + REVIEW_PENDING_INTERVAL_SECONDS
+
+    first_checked_at = monitor.get('first_checked_at') or now
+    quiet_since = monitor.get('last_changed_at') or first_checked_at
+    interval = max(0, now - quiet_since) * REVIEW_BACKOFF_FACTOR
+
+    age_days = max(1.0, (now - (prop.get('created_at') or first_checked_at)) / 86400)
+    if int(monitor.get('change_count', 0) or 0) / age_days >= REVIEW_VOLATILE_CHANGES_PER_DAY:
+        interval /= 2
+    if monitor.get('confidence') != 'high':
+        # Low-confidence snapshots can miss changes, so never stretch past the old flat window.
+        interval = min(interval, REVIEW_DEFAULT_INTERVAL_SECONDS)
+
+    interval = min(max(interval, REVIEW_MIN_INTERVAL_SECONDS), REVIEW_MAX_INTERVAL_SECONDS)
+    return now + interval
+
+
 def build_monitor_update(prop, snapshot, now):
     monitor = dict(prop.get('source_monitor') or {})
     source_channel = prop.get('source_channel')
@@ -345,6 +378,7 @@ def build_monitor_update(prop, snapshot, now):
     update_data = {
         'source_monitor': monitor,
         'reviewed_at': now,
+        'next_review_at': compute_next_review_at(prop, monitor, pending, now),
         'monitor_change_pending': pending,
     }
 
@@ -357,4 +391,152 @@ def build_monitor_update(prop, snapshot, now):
     elif prop.get('reextract_needed') is None:
         update_data['reextract_needed'] = False
 
-    return update_data, change_reasons
\ No newline at end of file
+    return update_data, change_reasons
+
+
+def build_not_modified_update(prop, now):
+    # 304 from the source: nothing to diff, just reschedule from the stored monitor state.
+    monitor = prop.get('source_monitor') or {}
+    return {
+        'reviewed_at': now,
+        'next_review_at': compute_next_review_at(prop, monitor, bool(prop.get('monitor_change_pending')), now),
+    }
+
+
+def _new_channel_stats():
+    return {'reviewed': 0, 'changed': 0, 'pending': 0, 'initial': 0, 'reasons': Counter()}
+
+
+def _export_stats(stats):
+    return {channel: {**channel_stats, 'reasons': dict(channel_stats['reasons'])} for channel, channel_stats in stats.items()}
+
+
+class MonitorEngine:
+    """Batches monitor updates for many props into one unordered bulk_write.
+
+    `add` computes the update for a single (prop, snapshot) pair right away so
+    callers can still log it; the `$set` is queued and written on `flush` (or once
+    `batch_size` are queued), after which its `on_written` callback runs. Per-channel
+    change statistics accumulate across flushes, and confirmed changes are appended
+    to the change feed after each write.
+    An update Mongo rejects is logged and dropped along with its change event; on
+    connection errors the unwritten updates and events are re-queued for the next flush.
+    """
+
+    def __init__(self, db, batch_size=MONITOR_ENGINE_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self._ops = []
+        self._events = []
+        self._feed_events = []
+        self._callbacks = []
+        self._stats = defaultdict(_new_channel_stats)
+        self.change_feed = PropChangeEvents(db) if db is not None else None
+        self._lock = threading.Lock()
+
+    def compute(self, pairs, now):
+        # Pure part of the engine: no I/O, used directly by the benchmark.
+        # `events` lines up with `ops`: the change event of each op, or None.
+        ops = []
+        events = []
+        stats = defaultdict(_new_channel_stats)
+        results = []
+        for prop, snapshot in pairs:
+            update_data, reasons = build_monitor_update(prop, snapshot, now)
+            ops.append(UpdateOne({ 'source_id': prop['source_id'] }, { '$set': update_data }))
+
+            channel_stats = stats[prop.get('source_channel')]
+            channel_stats['reviewed'] += 1
+            event = None
+            if update_data['monitor_change_pending']:
+                channel_stats['pending'] += 1
+            elif reasons == ['initial_monitor']:
+                channel_stats['initial'] += 1
+            elif update_data.get('reextract_needed'):
+                channel_stats['changed'] += 1
+                channel_stats['reasons'].update(reasons)
+                event = build_event('changed', prop['source_id'], prop.get('source_channel'), reasons)
+            events.append(event)
+            results.append((update_data, reasons))
+        return results, ops, events, stats
+
+    def add(self, prop, snapshot, now, on_written=None):
+        # on_written: called once this prop's update is in Mongo; never for a dropped one.
+        results, ops, events, stats = self.compute([(prop, snapshot)], now)
+        with self._lock:
+            self._ops.extend(ops)
+            self._events.extend(events)
+            self._callbacks.append(on_written)
+            self._merge_stats(stats)
+            if len(self._ops) >= self.batch_size:
+                self._flush_locked()
+        return results[0]
+
+    def process(self, pairs, now):
+        # Whole batch in one bulk_write; returns this batch's per-channel statistics.
+        _, ops, events, stats = self.compute(pairs, now)
+        with self._lock:
+            self._ops.extend(ops)
+            self._events.extend(events)
+            self._callbacks.extend([None] * len(ops))
+            self._merge_stats(stats)
+            self._flush_locked()
+        return _export_stats(stats)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _merge_stats(self, stats):
+        for channel, channel_stats in stats.items():
+            totals = self._stats[channel]
+            for key in ('reviewed', 'changed', 'pending', 'initial'):
+                totals[key] += channel_stats[key]
+            totals['reasons'].update(channel_stats['reasons'])
+
+    def _flush_locked(self):
+        ops, self._ops = self._ops, []
+        events, self._events = self._events, []
+        callbacks, self._callbacks = self._callbacks, []
+        try:
+            unwritten = self._bulk_write(ops) if ops else set()
+        except Exception:
+            # Connection-level failure: re-queue the whole batch ahead of anything queued since.
+            self._ops = ops + self._ops
+            self._events = events + self._events
+            self._callbacks = callbacks + self._callbacks
+            raise
+        for index, callback in enumerate(callbacks):
+            if callback is None or index in unwritten:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                print(f"on_written failed for monitor update {index}: {e}")
+        self._feed_events.extend(
+            event for index, event in enumerate(events)
+            if event is not None and index not in unwritten
+        )
+        feed_events, self._feed_events = self._feed_events, []
+        try:
+            self.change_feed.append(feed_events)
+        except Exception:
+            # The updates are in; only their events wait for the next flush.
+            self._feed_events = feed_events + self._feed_events
+            raise
+
+    def _bulk_write(self, ops):
+        # Returns the indexes of the ops Mongo rejected; unordered, so every other op was applied.
+        try:
+            self.db['props'].bulk_write(ops, ordered=False)
+            return set()
+        except BulkWriteError as e:
+            unwritten = set()
+            for error in (e.details or {}).get('writeErrors', []):
+                unwritten.add(error['index'])
+                print(f"Dropped monitor update {(error.get('op') or {}).get('q')}: {error.get('errmsg')}")
+            return unwritten
+
+    def stats(self):
+        with self._lock:
+            return _export_stats(self._stats)
@@ -1,21 +1,37 @@
+import os
+import functools
 import requests
 import time
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from models.prop import Prop
-from reviewers.monitor import extract_monitor_snapshot, build_monitor_update
+from reviewers.monitor import extract_monitor_snapshot_from_tree, MonitorEngine, build_not_modified_update
+from utils.http_cache import get_http_cache, HTTP_CACHE_REVIEW
+from utils.lxml_parser import parse_html, first, XP_28HSE_CONTENT, XP_28HSE_ERROR_HEADER, XP_META_REFRESH
 
 # sign_message = '有關資料可能已被移除或隱藏'
 
-def review(db, driver, prop):
-    response = requests.get(prop['source_url'], allow_redirects=False, timeout=15)
-    if response.status_code != 200:
-        Prop(db, prop).archive()
-        print(f"Archived place {prop['source_id']} due to inaccessible URL.")
-        return
+# http: decide from the fetched HTML, use the browser only for ambiguous pages.
+# browser: always confirm in the browser (previous behaviour).
+REVIEW_MODE = os.getenv("N28HSE_REVIEW_MODE", "http").strip().lower()
+
+
+def _classify_html(tree):
+    # Redirects never get here: the page is fetched with allow_redirects=False
+    # and any non-200 response is archived.
+    if first(XP_28HSE_ERROR_HEADER, tree) is not None:
+        return 'removed'
+    if first(XP_META_REFRESH, tree) is not None:
+        return 'ambiguous'
+    if first(XP_28HSE_CONTENT, tree) is not None:
+        return 'accessible'
+    return 'ambiguous'
+
+
+def _is_accessible_in_browser(driver, prop):
     driver.get(prop['source_url'])
 
-    time.sleep(1) 
+    time.sleep(1)
     current_url = driver.current_url
     still_accessible = False
     if current_url == prop['source_url'] or current_url == prop['source_url'] + "/":
@@ -27,16 +43,45 @@ def review(db, driver, prop):
             still_accessible = True
     else:
         still_accessible = False
+    return still_accessible
+
+
+def review(db, driver, prop, writer=None, engine=None):
+    cache = get_http_cache(HTTP_CACHE_REVIEW)
+    headers = cache.conditional_headers(prop['source_url']) if cache else {}
+    response = requests.get(prop['source_url'], headers=headers, allow_redirects=False, timeout=15)
+    if response.status_code == 304:
+        # Unchanged since the last fetch: skip the browser check and snapshot parsing.
+        Prop(db, prop).update(build_not_modified_update(prop, datetime.now().timestamp()), writer)
+        print(f"Place {prop['source_id']} not modified.")
+        return
+    if response.status_code != 200:
+        Prop(db, prop).archive(writer)
+        print(f"Archived place {prop['source_id']} due to inaccessible URL.")
+        return
+
+    tree = parse_html(response.text)
+    status = _classify_html(tree) if REVIEW_MODE == 'http' else 'ambiguous'
+    if status == 'ambiguous':
+        status = 'accessible' if _is_accessible_in_browser(driver, prop) else 'removed'
 
-    if not still_accessible:
-        Prop(db, prop).archive()
+    if status == 'removed':
+        Prop(db, prop).archive(writer)
         print(f"Archived place {prop['source_id']} due to inaccessible URL.")
         return
 
     now = datetime.now().timestamp()
-    snapshot = extract_monitor_snapshot(prop['source_channel'], response.text)
-    update_data, reasons = build_monitor_update(prop, snapshot, now)
-    Prop(db, prop).update(update_data)
+    snapshot = extract_monitor_snapshot_from_tree(prop['source_channel'], tree)
+    # Without a shared engine, write this prop straight away.
+    engine = engine or MonitorEngine(db, batch_size=1)
+    # Validators are kept only once the monitor update is written, so a failed
+    # write is not hidden behind a 304 on the next review.
+    if cache:
+        cache.defer_store(prop['source_url'], response)
+    update_data, reasons = engine.add(
+        prop, snapshot, now,
+        on_written=functools.partial(cache.commit, prop['source_url']) if cache else None,
+    )
 
     if update_data.get('monitor_change_pending'):
         print(f"Place {prop['source_id']} change candidate: {','.join(reasons)}")
@@ -0,0 +1,46 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from models import prop as prop_module
+from models.prop import PropBulkWriter, content_fingerprint
+from utils import html_store
+from utils.html_store import HtmlStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = HtmlStore(str(tmp_path))
+    monkeypatch.setattr(html_store, "_default_store", store)
+    monkeypatch.setattr(html_store, "HTML_STORE_ENABLED", True)
+    return store
+
+
+def listing(html):
+    return {
+        'source_id': '28hse-1',
+        'source_channel': '28hse',
+        'title': 'Flat',
+        'updated_at': 1,
+        'source_html_content': html,
+    }
+
+
+def test_fingerprint_ignores_archived_page_ref():
+    assert content_fingerprint({ **listing(None), 'source_html_ref': 'sha256:a' }) \
+        == content_fingerprint({ **listing(None), 'source_html_ref': 'sha256:b' })
+
+
+def test_fingerprint_still_tracks_listing_fields():
+    assert content_fingerprint(listing(None)) != content_fingerprint({ **listing(None), 'title': 'Other flat' })
+
+
+def test_upsert_fingerprint_ignores_html_only_changes(store, monkeypatch):
+    monkeypatch.setattr(prop_module, "PropChangeEvents", MagicMock())
+    writer = PropBulkWriter(MagicMock(), batch_size=100, flush_interval=3600)
+    writer.upsert(listing("<html><body>Flat <span>ad 1</span></body></html>"))
+    writer.upsert(listing("<html><body>Flat <span>ad 2</span></body></html>"))
+
+    first, second = (row['data'] for row in writer._rows)
+    assert first['source_html_ref'] != second['source_html_ref']
+    assert first['content_fingerprint'] == second['content_fingerprint']
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Async token bucket shared by every request of a crawl.
+
+    `rate` tokens are added per second up to `capacity`; each request takes one.
+    `acquire_blocking` serves sync crawls; a bucket is used from one side only.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._thread_lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def acquire_blocking(self):
+        with self._thread_lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                time.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimitedAsyncClient:
+    """Wraps an `httpx.AsyncClient` with a shared token bucket and per-host concurrency limits."""
+
+    def __init__(self, client, bucket, per_host_limit=4):
+        self.client = client
+        self.bucket = bucket
+        self.per_host_limit = per_host_limit
+        self._host_semaphores = {}
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url, **kwargs):
+        async with self._host_semaphore(url):
+            await self.bucket.acquire()
+            return await self.client.get(url, **kwargs)
+
+
+class RateLimitedClient:
+    """Wraps a sync `httpx.Client` with a shared token bucket, for the sequential crawls."""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def get(self, url, **kwargs):
+        self.bucket.acquire_blocking()
+        return self.client.get(url, **kwargs)
+
+
+class BlockingClient:
+    """Sync `get()` facade over a `RateLimitedAsyncClient` for code running in worker threads.
+
+    Lets the existing sync helpers (`_fetch_html_with_retries`, `extract_details_http`)
+    drive requests on the event loop's `AsyncClient` without being rewritten.
+    """
+
+    def __init__(self, async_client, loop):
+        self.async_client = async_client
+        self.loop = loop
+
+    def get(self, url, **kwargs):
+        future = asyncio.run_coroutine_threadsafe(self.async_client.get(url, **kwargs), self.loop)
+        return future.result()
@@ -0,0 +1,70 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+BLOCK_BACKOFF_BASE_SECONDS = float(os.getenv("BLOCK_BACKOFF_BASE_SECONDS", "5"))
+BLOCK_BACKOFF_MAX_SECONDS = float(os.getenv("BLOCK_BACKOFF_MAX_SECONDS", "300"))
+BLOCK_RATE_WINDOW_SECONDS = float(os.getenv("BLOCK_RATE_WINDOW_SECONDS", "300"))
+BLOCK_RATE_ESCALATE = float(os.getenv("BLOCK_RATE_ESCALATE", "0.5"))
+BLOCK_RATE_MIN_SAMPLES = int(os.getenv("BLOCK_RATE_MIN_SAMPLES", "4"))
+
+
+class AdaptiveBackoff:
+    """Shared block tracker for one source, used by every worker thread.
+
+    Each block pushes a global cooldown that doubles with consecutive blocks, so all
+    workers pause together instead of each retrying on a fixed delay. When the block
+    rate over the last BLOCK_RATE_WINDOW_SECONDS reaches BLOCK_RATE_ESCALATE, callers
+    should switch to the browser; the window expiring lets plain HTTP be probed again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._outcomes = deque()
+        self._consecutive_blocks = 0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def _trim_locked(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > BLOCK_RATE_WINDOW_SECONDS:
+            self._outcomes.popleft()
+
+    def wait(self):
+        with self._lock:
+            delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, blocked):
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append((now, blocked))
+            self._trim_locked(now)
+            if not blocked:
+                self._consecutive_blocks = 0
+                return
+            self._consecutive_blocks += 1
+            cooldown = min(
+                BLOCK_BACKOFF_MAX_SECONDS,
+                BLOCK_BACKOFF_BASE_SECONDS * 2 ** (self._consecutive_blocks - 1),
+            )
+            cooldown *= random.uniform(0.8, 1.2)
+            self._cooldown_until = max(self._cooldown_until, now + cooldown)
+        print(f"[{self.name}] blocked {self._consecutive_blocks}x in a row, backing off {cooldown:.0f}s "
+              f"(block rate {self.block_rate():.0%})")
+
+    def block_rate(self):
+        with self._lock:
+            self._trim_locked(time.monotonic())
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for _, blocked in self._outcomes if blocked) / len(self._outcomes)
+
+    def should_escalate(self):
+        with self._lock:
+            self._trim_locked(time.monotonic())
+            samples = len(self._outcomes)
+            blocked = sum(1 for _, was_blocked in self._outcomes if was_blocked)
+        return samples >= BLOCK_RATE_MIN_SAMPLES and blocked / samples >= BLOCK_RATE_ESCALATE
@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class CrawlProgress:
+    """Thread-safe per-source crawl counters plus a cooperative stop flag."""
+
+    def __init__(self, source):
+        self.source = source
+        self.state = 'pending'
+        self.error = None
+        self.pages = 0
+        self.links = 0
+        self.fetched = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        with self._lock:
+            self.state = 'running'
+            self.started_at = time.monotonic()
+
+    def page_done(self, link_count):
+        with self._lock:
+            self.pages += 1
+            self.links += link_count
+
+    def detail_done(self):
+        with self._lock:
+            self.fetched += 1
+
+    def detail_failed(self):
+        with self._lock:
+            self.failed += 1
+
+    def finish(self, error=None):
+        with self._lock:
+            self.state = 'failed' if error else ('stopped' if self._stop_event.is_set() else 'done')
+            self.error = error
+            self.finished_at = time.monotonic()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def should_stop(self):
+        return self._stop_event.is_set()
+
+    def summary(self):
+        with self._lock:
+            end = self.finished_at or time.monotonic()
+            elapsed = end - self.started_at if self.started_at else 0
+            text = (
+                f"[{self.source}] {self.state} {elapsed:.0f}s: "
+                f"{self.pages} pages, {self.links} links, {self.fetched} fetched, {self.failed} failed"
+            )
+            if self.error:
+                text += f" ({self.error})"
+            return text
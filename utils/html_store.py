@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+import zlib
+
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+HTML_STORE_ENABLED = os.getenv("HTML_STORE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+HTML_STORE_PATH = os.getenv(
+    "HTML_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_FOLDER, "html_store"),
+)
+HTML_STORE_ZSTD_LEVEL = int(os.getenv("HTML_STORE_ZSTD_LEVEL", "10"))
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+class HtmlStore:
+    """Content-addressed archive of raw detail HTML on local disk.
+
+    Pages are keyed by the sha256 of their text and written once to
+    `<root>/<aa>/<bb>/<hash>.zst` (zstd, or `.zz` zlib when zstandard is missing).
+    Props keep only the `sha256:<hash>` ref in `source_html_ref`.
+    """
+
+    def __init__(self, root=HTML_STORE_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}{ext}")
+
+    def _compress(self, raw):
+        if zstandard is not None:
+            return ".zst", zstandard.ZstdCompressor(level=HTML_STORE_ZSTD_LEVEL).compress(raw)
+        return ".zz", zlib.compress(raw, 6)
+
+    def put(self, html):
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        if not any(os.path.exists(self._path(digest, ext)) for ext in (".zst", ".zz")):
+            ext, blob = self._compress(raw)
+            path = self._path(digest, ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so a concurrent reader never sees a partial file.
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        return f"sha256:{digest}"
+
+    def get(self, ref):
+        if not ref or not ref.startswith("sha256:"):
+            return None
+        digest = ref.split(":", 1)[1]
+        path = self._path(digest, ".zst")
+        if os.path.exists(path):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            with open(path, "rb") as f:
+                return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+        path = self._path(digest, ".zz")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        return None
+
+
+def get_html_store():
+    global _default_store
+    if not HTML_STORE_ENABLED:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = HtmlStore()
+        return _default_store
+
+
+def externalize_html(data):
+    # Swaps `source_html_content` for a store ref before the prop is written.
+    # An explicit None only drops inline HTML; the archived page keeps its ref.
+    store = get_html_store()
+    if store is None or "source_html_content" not in data:
+        return data
+    html = data["source_html_content"]
+    data = {**data, "source_html_content": None}
+    if html:
+        data["source_html_ref"] = store.put(html)
+    return data
+
+
+def load_prop_html(prop):
+    # Props written before the store existed still carry the HTML inline.
+    if prop.get("source_html_content"):
+        return prop["source_html_content"]
+    store = get_html_store() or HtmlStore()
+    return store.get(prop.get("source_html_ref"))
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+HTTP_CACHE_PATH = os.getenv(
+    "HTTP_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_FOLDER, "http_cache.sqlite3"),
+)
+
+# One validator namespace per consumer: a reviewer's 304 must not hide a change
+# from the extractor, or the other way round.
+HTTP_CACHE_EXTRACT = "extract"
+HTTP_CACHE_REVIEW = "review"
+
+_default_caches = {}
+_default_cache_lock = threading.Lock()
+
+
+class HttpCache:
+    """On-disk validator cache for conditional GETs, keyed by (consumer, URL).
+
+    Stores `ETag`/`Last-Modified` with a zlib-compressed body so re-crawls can send
+    `If-None-Match`/`If-Modified-Since` and treat a 304 as "unchanged".
+    `defer_store()` holds a response's validators in memory until `commit()`, so a
+    page whose prop never reached Mongo is downloaded again next crawl.
+    """
+
+    def __init__(self, consumer, path=HTTP_CACHE_PATH):
+        self.consumer = consumer
+        self.path = path
+        self._local = threading.local()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Replaces the old URL-only `http_cache` table, whose validators were shared by every consumer.
+        conn.execute("DROP TABLE IF EXISTS http_cache")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_validators ("
+            "consumer TEXT, url TEXT, etag TEXT, last_modified TEXT, body BLOB, fetched_at REAL, "
+            "PRIMARY KEY (consumer, url))"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def conditional_headers(self, url):
+        row = self._conn().execute(
+            "SELECT etag, last_modified FROM http_validators WHERE consumer = ? AND url = ?", (self.consumer, url)
+        ).fetchone()
+        if not row:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def get_body(self, url):
+        row = self._conn().execute(
+            "SELECT body FROM http_validators WHERE consumer = ? AND url = ?", (self.consumer, url)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def store(self, url, response):
+        self._write(url, response.headers.get("etag"), response.headers.get("last-modified"), response.text)
+
+    def _write(self, url, etag, last_modified, body):
+        if not etag and not last_modified:
+            return
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_validators (consumer, url, etag, last_modified, body, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.consumer, url, etag, last_modified, zlib.compress(body.encode("utf-8")), time.time()),
+        )
+        conn.commit()
+
+    def defer_store(self, url, response):
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        with self._pending_lock:
+            self._pending[url] = (etag, last_modified, response.text)
+
+    def commit(self, url):
+        with self._pending_lock:
+            pending = self._pending.pop(url, None)
+        if pending:
+            self._write(url, *pending)
+
+    def discard(self, url):
+        with self._pending_lock:
+            self._pending.pop(url, None)
+
+    def invalidate(self, url):
+        conn = self._conn()
+        conn.execute("DELETE FROM http_validators WHERE consumer = ? AND url = ?", (self.consumer, url))
+        conn.commit()
+
+
+def get_http_cache(consumer):
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if consumer not in _default_caches:
+            _default_caches[consumer] = HttpCache(consumer)
+        return _default_caches[consumer]
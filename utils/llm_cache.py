@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER") or "artifacts"
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_FOLDER, "llm_cache.sqlite3"),
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def prompt_key(body):
+    # Identical prompts hash the same whatever the batch, custom_id or max_tokens.
+    payload = json.dumps(
+        [body.get("model"), body.get("messages"), body.get("response_format")],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_result_line(custom_id, response_body):
+    # Same shape as a batch output line, so a stage's result handler can take it as is.
+    return {
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": response_body},
+        "error": None,
+        "cached": True,
+    }
+
+
+class LlmCache:
+    """On-disk cache of chat completion bodies keyed by a hash of the prompt.
+
+    Batch builders `lookup()` a request body before adding it to a batch file and
+    `track()` the ones they do add; result ingesters hand each output line to
+    `record_result()`, which stores successful answers under the tracked prompt key.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, body BLOB, created_at REAL, hits INTEGER DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_pending (custom_id TEXT PRIMARY KEY, key TEXT, created_at REAL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, body):
+        key = prompt_key(body)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT body FROM llm_responses WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.ttl_seconds),
+        ).fetchone()
+        if not row:
+            return None
+        conn.execute("UPDATE llm_responses SET hits = hits + 1 WHERE key = ?", (key,))
+        conn.commit()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def track(self, custom_id, body):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_pending (custom_id, key, created_at) VALUES (?, ?, ?)",
+            (custom_id, prompt_key(body), time.time()),
+        )
+        conn.commit()
+
+    def record_result(self, line):
+        custom_id = line.get("custom_id")
+        if not custom_id or line.get("cached"):
+            return
+        conn = self._conn()
+        row = conn.execute("SELECT key FROM llm_pending WHERE custom_id = ?", (custom_id,)).fetchone()
+        if not row:
+            return
+        response = line.get("response") or {}
+        response_body = response.get("body") or {}
+        # Errors, refusals and truncated answers are not worth replaying.
+        choices = response_body.get("choices") or []
+        if not line.get("error") and response.get("status_code") == 200 and choices \
+                and choices[0].get("finish_reason") in (None, "stop"):
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, body, created_at) VALUES (?, ?, ?)",
+                (row[0], zlib.compress(json.dumps(response_body, ensure_ascii=False).encode("utf-8")), time.time()),
+            )
+        conn.execute("DELETE FROM llm_pending WHERE custom_id = ?", (custom_id,))
+        conn.commit()
+
+
+def get_llm_cache():
+    global _default_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LlmCache()
+        return _default_cache
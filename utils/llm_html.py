@@ -0,0 +1,181 @@
+import os
+import re
+
+from lxml import etree
+
+from utils.lxml_parser import (
+    XP_28HSE_DESCRIPTION,
+    XP_28HSE_LABELS,
+    XP_28HSE_PAIR_TABLES,
+    XP_28HSE_PROPERTY_DATE,
+    XP_28HSE_TITLE,
+    XP_HOUSE730_DESCRIPTION,
+    XP_HOUSE730_PRICE_NODES,
+    XP_HOUSE730_TITLE,
+    XP_MIDLAND_PRICE_NODES,
+    first,
+    node_text,
+    parse_html,
+)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+EXTRACT_HTML_MAX_TOKENS = int(os.getenv("EXTRACT_HTML_MAX_TOKENS", "2500"))
+EXTRACT_TOKEN_ENCODING = os.getenv("EXTRACT_TOKEN_ENCODING", "o200k_base")
+
+XP_LAYOUT_NOISE = etree.XPath(
+    './/script|.//style|.//noscript|.//svg|.//iframe|.//aside|.//footer|.//header|.//nav|.//form'
+)
+XP_MAIN_REGION = etree.XPath('(//main|//article|//*[@role="main"]|//*[@id="pc-services-detail"])[1]')
+XP_IMAGES = etree.XPath('.//img')
+XP_HEADINGS = etree.XPath('.//h1|.//h2')
+
+# Regions rendered first, in order, so the fields the prompt asks for survive the budget.
+PRIORITY_REGIONS = {
+    '28hse': [XP_28HSE_TITLE, XP_28HSE_PAIR_TABLES, XP_28HSE_PROPERTY_DATE, XP_28HSE_DESCRIPTION, XP_28HSE_LABELS],
+    'house730': [XP_HOUSE730_TITLE, XP_HOUSE730_PRICE_NODES, XP_HOUSE730_DESCRIPTION],
+    'midland': [XP_HEADINGS, XP_MIDLAND_PRICE_NODES],
+}
+MAX_NODES_PER_REGION = 5
+
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'dd', 'div', 'dl', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'li', 'main', 'ol', 'p', 'pre', 'section', 'ul',
+}
+
+_SPACE_RE = re.compile(r'[ \t\r\f\v\u00a0\u3000]+')
+_CJK_RE = re.compile(r'[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+_encoder = None
+
+
+def count_tokens(text):
+    global _encoder
+    if tiktoken is None:
+        # Rough estimate without tiktoken: one token per CJK char, four chars per token otherwise.
+        cjk = len(_CJK_RE.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+    if _encoder is None:
+        _encoder = tiktoken.get_encoding(EXTRACT_TOKEN_ENCODING)
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def _truncate_to_tokens(text, max_tokens):
+    # Keeps only complete lines, so a half row is never left dangling; '' when
+    # not even the first line fits.
+    if max_tokens <= 0:
+        return ''
+    if tiktoken is not None:
+        count_tokens('')
+        truncated = _encoder.decode(_encoder.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        truncated = text[:max(0, len(text) * max_tokens // max(1, count_tokens(text)))]
+    if truncated == text:
+        return text
+    cut = truncated.rfind('\n')
+    return truncated[:cut].strip('\n') if cut > 0 else ''
+
+
+def _render_table(table, out):
+    out.append('\n')
+    for row in table.iter('tr'):
+        cells = [node_text(cell, ' ') for cell in row if cell.tag in ('td', 'th')]
+        cells = [cell for cell in cells if cell]
+        if len(cells) == 2:
+            out.append(f"{cells[0]}: {cells[1]}\n")
+        elif cells:
+            out.append(' | '.join(cells) + '\n')
+
+
+def _render(node, out):
+    tag = node.tag if isinstance(node.tag, str) else None
+    if tag == 'table':
+        _render_table(node, out)
+    elif tag == 'img':
+        src = node.get('src') or node.get('data-src')
+        if src and not src.startswith('data:'):
+            out.append(f" [img {src}] ")
+    elif tag == 'br':
+        out.append('\n')
+    elif tag == 'a' and node.get('href', '').startswith('http') and not len(XP_IMAGES(node)):
+        text = node_text(node, ' ')
+        if text:
+            out.append(f"[{text}]({node.get('href')})")
+    elif tag is not None:
+        block = tag in BLOCK_TAGS
+        if block:
+            out.append('\n')
+        if node.text:
+            out.append(node.text)
+        for child in node:
+            _render(child, out)
+        if tag == 'dt':
+            out.append(': ')
+        if block:
+            out.append('\n')
+    if node.tail:
+        out.append(node.tail)
+
+
+def render_compact_text(node):
+    """Text of `node` with tables as `label: value` rows, images as `[img src]` and links as
+    `[text](href)`; every other attribute is dropped and whitespace collapsed."""
+    out = []
+    tail, node.tail = node.tail, None
+    _render(node, out)
+    node.tail = tail
+    lines = []
+    for line in ''.join(out).split('\n'):
+        line = _SPACE_RE.sub(' ', line).strip()
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def compact_html_for_llm(body, source_channel=None, max_tokens=EXTRACT_HTML_MAX_TOKENS):
+    """Compacts listing HTML into prompt text that fits `max_tokens`.
+
+    The source's priority regions (title, price/info table, dates, description) go
+    first, then the rest of the main region; rendering stops at the token budget
+    instead of cutting the raw HTML at a character count.
+    """
+    if not body:
+        return body
+
+    tree = parse_html(body)
+    root = tree.getroottree().getroot()
+    for node in XP_LAYOUT_NOISE(tree):
+        if node.getparent() is not None:
+            node.drop_tree()
+
+    sections = []
+    for xpath in PRIORITY_REGIONS.get(source_channel, []):
+        for node in xpath(tree)[:MAX_NODES_PER_REGION]:
+            # Skip nodes inside a region that was already rendered and dropped.
+            if node.getroottree().getroot() is not root:
+                continue
+            text = render_compact_text(node)
+            if text:
+                sections.append(text)
+            node.drop_tree()
+
+    main = first(XP_MAIN_REGION, tree)
+    sections.append(render_compact_text(main if main is not None else root))
+
+    parts = []
+    remaining = max_tokens
+    for section in sections:
+        if not section:
+            continue
+        tokens = count_tokens(section) + 1
+        if tokens > remaining:
+            truncated = _truncate_to_tokens(section, remaining - 1)
+            if truncated:
+                parts.append(truncated)
+            break
+        parts.append(section)
+        remaining -= tokens
+    return '\n'.join(parts)
@@ -0,0 +1,287 @@
+import json
+import re
+
+from lxml import etree
+from lxml import html as lxml_html
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _attr_contains_ci(attr, value):
+    return f"contains(translate(@{attr}, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{value}')"
+
+
+# Precompiled selectors, CSS equivalents noted alongside.
+XP_TEXT_NODES = etree.XPath('.//text()[not(parent::script) and not(parent::style) and not(parent::template)]')
+XP_TITLE = etree.XPath('//title')
+XP_LD_JSON = etree.XPath('//script[@type="application/ld+json"]')
+XP_JSON_SCRIPTS = etree.XPath('//script[@type="application/json" or @id="__NEXT_DATA__"]')
+
+# 28hse
+XP_28HSE_CONTENT = etree.XPath(f'//*[{_has_class("content_body")}]//*[{_has_class("ten")}]')  # .content_body .ten
+XP_28HSE_BREADCRUMB = etree.XPath(f'//ol[{_has_class("breadcrumb")}]//a//span[@itemprop="name"]')
+XP_28HSE_IMAGES = etree.XPath(f'//*[{_has_class("slider-block")}]//img')
+XP_28HSE_TITLE = etree.XPath(f'.//*[{_has_class("message")}]//*[{_has_class("header")}]')
+XP_28HSE_DESCRIPTION = etree.XPath('.//*[@id="desc_normal"]')
+XP_28HSE_LABELS = etree.XPath(f'.//*[{_has_class("labels")}]//*[{_has_class("label")}]')
+XP_28HSE_CONTACTS = etree.XPath(f'.//*[{_has_class("contactsDiv")}]')
+XP_28HSE_CONTACT_HEADER = etree.XPath(f'.//*[{_has_class("header")}]')
+XP_28HSE_CONTACT_SPANS = etree.XPath(f'.//*[{_has_class("content")}]//span[{_has_class("less_span")}]')
+XP_28HSE_PROPERTY_DATE = etree.XPath(f'.//*[{_has_class("propertyDate")}]')
+XP_28HSE_PAIR_TABLES = etree.XPath(f'.//table[{_has_class("tablePair")}]')
+XP_28HSE_PAIR_ROWS = etree.XPath(f'.//table[{_has_class("tablePair")}]//tr')
+XP_28HSE_PAIR_NAME = etree.XPath(f'.//td[{_has_class("table_left")}]')
+XP_28HSE_PAIR_VALUE = etree.XPath(f'.//*[{_has_class("pairValue")}]')
+XP_28HSE_DETAIL_ANCHORS = etree.XPath(f'//a[{_has_class("detail_page")}][@href]')
+XP_28HSE_ERROR_HEADER = etree.XPath(f'//*[{_has_class("error")}]//*[{_has_class("header")}]')  # .error .header
+XP_META_REFRESH = etree.XPath(
+    "//meta[translate(@http-equiv, 'REFSH', 'refsh')='refresh']"
+)
+
+# house730 / midland
+XP_HOUSE730_DETAIL = etree.XPath('//*[@id="pc-services-detail"]')
+XP_HOUSE730_PRICE_NODES = etree.XPath(
+    f'.//*[{_attr_contains_ci("class", "price")} or {_attr_contains_ci("data-testid", "price")}]'
+)
+XP_HOUSE730_TITLE = etree.XPath('.//h1')
+XP_HOUSE730_BREADCRUMB = etree.XPath(f'//*[{_attr_contains_ci("class", "breadcrumb")}]//a')
+XP_HOUSE730_TAGS = etree.XPath(f'.//*[{_attr_contains_ci("class", "tag")}]')
+XP_HOUSE730_AGENTS = etree.XPath(f'.//*[{_attr_contains_ci("class", "agent")}]')
+XP_HOUSE730_DESCRIPTION = etree.XPath(
+    f'.//*[{_attr_contains_ci("class", "description")} or {_attr_contains_ci("class", "desc-content")}]'
+)
+XP_OG_IMAGES = etree.XPath('//meta[@property="og:image"]/@content')
+XP_OG_DESCRIPTION = etree.XPath('//meta[@property="og:description" or @name="description"]/@content')
+XP_NOISE = etree.XPath('.//script|.//style|.//noscript|.//svg|.//iframe')
+XP_MIDLAND_MAIN = etree.XPath('//main')
+XP_MIDLAND_PRICE_NODES = etree.XPath(
+    f'.//*[{_attr_contains_ci("class", "price")} or {_attr_contains_ci("class", "rent")}'
+    f' or {_attr_contains_ci("data-testid", "price")}]'
+)
+
+_HTML_TAG_RE = re.compile('<.*?>')
+_HOUSE730_DATE_RES = {
+    'source_posted_date': re.compile(r'(?:刊登日期|刊登|放盤日期)\s*[:：]?\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2})'),
+    'source_updated_date': re.compile(r'(?:更新日期|最後更新|更新)\s*[:：]?\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2})'),
+}
+_HOUSE730_INFO_RES = {
+    '租金': re.compile(r'租金?\s*[:：]?\s*(?:HK)?\$\s*([\d,]+)'),
+    '售價': re.compile(r'售價\s*[:：]?\s*(?:HK)?\$?\s*([\d,.]+\s*萬?)'),
+    '實用面積': re.compile(r'實用(?:面積)?\s*[:：]?\s*([\d,]+)\s*呎'),
+    '建築面積': re.compile(r'建築(?:面積)?\s*[:：]?\s*([\d,]+)\s*呎'),
+    '間隔': re.compile(r'(\d+\s*房(?:\s*\d+\s*廳)?)'),
+    '樓層': re.compile(r'(高層|中層|低層|地下)'),
+}
+_LICENSE_RE = re.compile(r'(?:牌照號碼|牌照)\s*[:：]?\s*([A-Z]-?\d{6}|[A-Z]{1,2}\d{6})')
+
+
+def parse_html(html):
+    if not html or not html.strip():
+        return lxml_html.document_fromstring('<html></html>')
+    try:
+        return lxml_html.document_fromstring(html)
+    except ValueError:
+        # lxml rejects str input that carries an XML encoding declaration.
+        return lxml_html.document_fromstring(html.encode('utf-8'))
+
+
+def first(xpath, node):
+    nodes = xpath(node)
+    return nodes[0] if nodes else None
+
+
+def node_text(node, separator=''):
+    # Same result as BeautifulSoup's get_text(separator, strip=True).
+    if node is None:
+        return ''
+    return separator.join(text.strip() for text in XP_TEXT_NODES(node) if text.strip())
+
+
+def node_html(node):
+    return lxml_html.tostring(node, encoding='unicode', with_tail=False)
+
+
+def strip_noise(node):
+    # Drops scripts, styles and embedded media that only cost LLM tokens.
+    for child in XP_NOISE(node):
+        child.drop_tree()
+    return node
+
+
+def iter_ld_json(tree):
+    for script in XP_LD_JSON(tree):
+        raw = (script.text or '').strip()
+        if not raw:
+            continue
+        try:
+            payload = json.loads(raw)
+        except Exception:
+            continue
+        for item in payload if isinstance(payload, list) else [payload]:
+            if isinstance(item, dict):
+                yield item
+
+
+def _remove_html_tags(text):
+    return _HTML_TAG_RE.sub('', text)
+
+
+def extract_28hse_listing_links(tree):
+    links = []
+    seen = set()
+
+    for item in iter_ld_json(tree):
+        item_list = item.get('itemListElement')
+        if not isinstance(item_list, list):
+            continue
+        for item_entry in item_list:
+            if not isinstance(item_entry, dict):
+                continue
+            url = item_entry.get('url')
+            if isinstance(url, str) and '/property-' in url and url not in seen:
+                seen.add(url)
+                links.append(url)
+
+    if links:
+        return links
+
+    # Fallback to DOM selectors if JSON-LD is unavailable.
+    for anchor in XP_28HSE_DETAIL_ANCHORS(tree):
+        href = anchor.get('href')
+        if not href:
+            continue
+        if href.startswith('/'):
+            href = f"https://www.28hse.com{href}"
+        if '/property-' in href and href not in seen:
+            seen.add(href)
+            links.append(href)
+
+    return links
+
+
+def extract_28hse_detail(tree):
+    content_body_div = first(XP_28HSE_CONTENT, tree)
+    if content_body_div is None:
+        return None
+
+    breadcrumb_items = XP_28HSE_BREADCRUMB(tree)
+    location_parts = [node_text(item) for item in breadcrumb_items[2:]]
+
+    image_links = []
+    for image in XP_28HSE_IMAGES(tree):
+        img_src = image.get('src')
+        if img_src and img_src not in image_links:
+            image_links.append(img_src)
+
+    title = node_text(first(XP_28HSE_TITLE, content_body_div))
+    description = node_text(first(XP_28HSE_DESCRIPTION, content_body_div), "\n")
+    labels = [node_text(label) for label in XP_28HSE_LABELS(content_body_div)]
+
+    contacts_data = []
+    for contact in XP_28HSE_CONTACTS(content_body_div):
+        name = node_text(first(XP_28HSE_CONTACT_HEADER, contact))
+        license_no = None
+        for span in XP_28HSE_CONTACT_SPANS(contact):
+            span_text = node_text(span)
+            if '牌照號碼' in span_text:
+                license_no = span_text.replace('代理個人牌照號碼:', '').strip()
+        contacts_data.append({
+            "name": name,
+            "license_no": license_no,
+        })
+
+    posted_date = ""
+    updated_date = ""
+    property_dates_div = first(XP_28HSE_PROPERTY_DATE, content_body_div)
+    if property_dates_div is not None:
+        property_dates = _remove_html_tags(node_text(property_dates_div, " ")).split('|')
+        if len(property_dates) > 0:
+            posted_date = property_dates[0].replace('刊登:', '').strip()
+        if len(property_dates) > 1:
+            updated_date = property_dates[1].replace('更新:', '').strip()
+
+    info = {}
+    for pair in XP_28HSE_PAIR_ROWS(content_body_div):
+        name_node = first(XP_28HSE_PAIR_NAME, pair)
+        value_node = first(XP_28HSE_PAIR_VALUE, pair)
+        if name_node is not None and value_node is not None:
+            info[_remove_html_tags(node_text(name_node, " "))] = _remove_html_tags(node_text(value_node, " "))
+
+    return {
+        "location_parts": location_parts,
+        "title": title,
+        "description": description,
+        "labels": labels,
+        "contacts": contacts_data,
+        "source_posted_date": posted_date,
+        "source_updated_date": updated_date,
+        "info": info,
+        "image_links": image_links,
+        "source_html_content": node_html(content_body_div),
+    }
+
+
+def extract_house730_detail(tree):
+    # Same fields as extract_28hse_detail; House730 markup has no stable class
+    # names for most of them, so values are read from the detail text.
+    detail = first(XP_HOUSE730_DETAIL, tree)
+    if detail is None:
+        return None
+
+    text = node_text(detail, ' ')
+    location_parts = [node_text(item) for item in XP_HOUSE730_BREADCRUMB(tree)[1:]]
+
+    image_links = []
+    for image_url in XP_OG_IMAGES(tree):
+        if image_url and image_url not in image_links:
+            image_links.append(image_url)
+
+    description = node_text(first(XP_HOUSE730_DESCRIPTION, detail), "\n")
+    if not description:
+        og_description = XP_OG_DESCRIPTION(tree)
+        description = og_description[0].strip() if og_description else ''
+
+    labels = []
+    for tag in XP_HOUSE730_TAGS(detail):
+        label = node_text(tag)
+        if label and len(label) <= 20 and label not in labels:
+            labels.append(label)
+
+    contacts_data = []
+    seen_licenses = set()
+    for agent in XP_HOUSE730_AGENTS(detail):
+        license_match = _LICENSE_RE.search(node_text(agent, ' '))
+        if not license_match or license_match.group(1) in seen_licenses:
+            continue
+        seen_licenses.add(license_match.group(1))
+        name = node_text(agent, ' ')[:license_match.start()].strip().split(' ')[0] if license_match.start() else ''
+        contacts_data.append({
+            "name": name,
+            "license_no": license_match.group(1),
+        })
+
+    dates = {}
+    for field, pattern in _HOUSE730_DATE_RES.items():
+        match = pattern.search(text)
+        dates[field] = match.group(1) if match else ""
+
+    info = {}
+    for name, pattern in _HOUSE730_INFO_RES.items():
+        match = pattern.search(text)
+        if match:
+            info[name] = match.group(1).strip()
+
+    return {
+        "location_parts": location_parts,
+        "title": node_text(first(XP_HOUSE730_TITLE, detail)) or node_text(first(XP_TITLE, tree)),
+        "description": description,
+        "labels": labels,
+        "contacts": contacts_data,
+        "source_posted_date": dates['source_posted_date'],
+        "source_updated_date": dates['source_updated_date'],
+        "info": info,
+        "image_links": image_links,
+        "source_html_content": node_html(strip_noise(detail)),
+    }
@@ -1,13 +1,22 @@
+import functools
+import os
+import queue
 import re
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from shutil import which
 
 import undetected_chromedriver as uc
 
 _driver_lock = threading.Lock()
 
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_POOL_MAX_PAGES = int(os.getenv("BROWSER_POOL_MAX_PAGES", "50"))
 
+
+@functools.lru_cache(maxsize=1)
 def _detect_chrome_version_main():
     candidates = [
         "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
@@ -50,3 +59,125 @@ def create_uc_driver(*, options=None, version_main=None, use_subprocess=True):
             use_subprocess=use_subprocess,
             version_main=resolved_version_main,
         )
+
+
+def default_chrome_options():
+    options = uc.ChromeOptions()
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return options
+
+
+def _is_driver_healthy(driver):
+    try:
+        _ = driver.current_url
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class LazyDriver:
+    """Stands in for a uc driver and only starts Chrome on first attribute access.
+
+    Lets HTTP-first callers keep their `driver` argument without paying for a
+    browser when no page ever needs one.
+    """
+
+    def __init__(self, options_factory=default_chrome_options):
+        self._options_factory = options_factory
+        self._driver = None
+
+    @property
+    def started(self):
+        return self._driver is not None
+
+    def __getattr__(self, name):
+        if self._driver is None:
+            print("Starting browser on first use")
+            self._driver = create_uc_driver(options=self._options_factory(), use_subprocess=True)
+        return getattr(self._driver, name)
+
+    def quit(self):
+        if self._driver is not None:
+            _quit_driver(self._driver)
+            self._driver = None
+
+
+class BrowserPool:
+    """Keeps `size` warm uc drivers and lends them to worker threads.
+
+    Drivers are health-checked on checkout, replaced when their window dies and
+    recycled after `max_pages` pages to cap Chrome's memory growth.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_POOL_MAX_PAGES, options_factory=default_chrome_options):
+        self.size = size
+        self.max_pages = max_pages
+        self.options_factory = options_factory
+        self._idle = queue.Queue()
+        self._page_counts = {}
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self._create())
+
+    def _create(self):
+        driver = create_uc_driver(options=self.options_factory(), use_subprocess=True)
+        self._page_counts[id(driver)] = 0
+        return driver
+
+    def _replace(self, driver):
+        self._page_counts.pop(id(driver), None)
+        _quit_driver(driver)
+        return self._create()
+
+    def _checkout(self):
+        while True:
+            try:
+                return self._idle.get(timeout=5)
+            except queue.Empty:
+                if not self._page_counts:
+                    raise RuntimeError("Browser pool has no live drivers")
+
+    @contextmanager
+    def driver(self):
+        driver = self._checkout()
+        try:
+            if not _is_driver_healthy(driver):
+                print("Pooled driver is unhealthy, recreating driver")
+                driver = self._replace(driver)
+            yield driver
+        finally:
+            if self._closed:
+                _quit_driver(driver)
+            else:
+                self._page_counts[id(driver)] = self._page_counts.get(id(driver), 0) + 1
+                if self._page_counts[id(driver)] >= self.max_pages:
+                    print(f"Recycling pooled driver after {self.max_pages} pages")
+                    driver = self._replace(driver)
+                self._idle.put(driver)
+
+    def map(self, func, items):
+        # Calls func(driver, item) for every item, one worker thread per pooled driver.
+        def run(item):
+            with self.driver() as driver:
+                return func(driver, item)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._page_counts.pop(id(driver), None)
+            _quit_driver(driver)